@@ -1,28 +1,97 @@
-import os
-import json
-import smtplib
-import subprocess
 from google.adk.agents import Agent
+from datetime import date
 from email.message import EmailMessage
-from typing import Dict, Any, Optional
-from .generate_credit_file import create_lendo_credit_file
+from io import BytesIO
+from typing import Dict, Any, List, Optional
+from .data_provider import get_snapshot, DataSnapshot
+from .reference_data import get_reference_data
+from .tracing import span, annotate
+from .metrics import instrumented_tool
 from .instructions import (
    COMPANY_APPROVAL_OR_REJECTION_DECISION_INSTRCUTION
 )
 
-# Load your AllCompanies.json file
-current_dir = os.path.dirname(os.path.abspath(__file__))
-file_path = os.path.join(current_dir, "qawaem_data.json")
+# Note: numpy (projection/rulebook/scorecard) and python-docx (generate_credit_file) are
+# imported inside the tools that use them, to keep agent import fast.
 
-with open(file_path, "r", encoding="utf-8") as f:
-    qawaem_data = json.load(f)
-    
-def Lendo_Credit_Decision_Engine() -> Dict[str, any]:
+def _company_not_found(organization_id: Optional[int], cr_number: Optional[str]) -> Dict[str, str]:
+    return {
+        "status": "Error",
+        "message": f"No company found for organization_id={organization_id}, cr_number={cr_number}"
+    }
+
+def _select_store(organization_id: Optional[int] = None, cr_number: Optional[str] = None) -> Optional["CompanyYearStore"]:
+    """Returns the columnar store of one company, or of all companies if no filter is given (None if not found)."""
+    snapshot = get_snapshot()
+    if organization_id is None and cr_number is None:
+        return snapshot.store
+    return snapshot.company_store(organization_id, cr_number)
+
+def _cached_decisions(organization_id: Optional[int], cr_number: Optional[str], kind: str, rules_id: str, evaluate, **params) -> Dict[str, Any]:
+    """
+    Runs a decision tool, `evaluate(store, by_company)`, on one company through
+    the decision cache, or on all companies if no filter is given.
+
+    Decisions are made on the data `Lendo_Credit_Decision_Engine` serves: the
+    company database when CREDIT_DB_PATH is set (see company_db.py), the data
+    snapshot otherwise.
+    """
+    from .company_db import get_company_db
+    from .decision_cache import cached_decisions
+
+    database = get_company_db()
+    if organization_id is None and cr_number is None:
+        # One vectorized pass over the portfolio is faster than looking up every company in the cache
+        store = database.company_store() if database is not None else get_snapshot().store
+        return {"status": "Success", "data": evaluate(store, False)}
+
+    if database is not None:
+        store = database.company_store(organization_id, cr_number)
+        snapshot, company = (DataSnapshot(store), 0) if store is not None else (None, None)
+    else:
+        snapshot = get_snapshot()
+        company = snapshot.company_position(organization_id, cr_number)
+    if company is None:
+        return _company_not_found(organization_id, cr_number)
+
+    return {
+        "status": "Success",
+        "data": cached_decisions(snapshot, [company], kind, rules_id, lambda store: evaluate(store, True), **params)
+    }
+
+@instrumented_tool
+def Lendo_Credit_Decision_Engine(
+    organization_id: Optional[int] = None,
+    cr_number: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    year: str = "latest",
+    tabular: bool = False,
+    filters: Optional[List[str]] = None,
+    page: int = 1,
+    page_size: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Reads financial data from a JSON file and parses/prepares it to be used by an agent for approving or rejecting a company.
 
+    Args:
+        organization_id: Optional. Only return the records of the company with this organization id (company id / borrower id).
+        cr_number: Optional. Only return the records of the company with this commercial registration number.
+        If neither is given, the records of all companies are returned.
+        fields: Optional. Only return these fields (e.g. ["revenue", "dscr", "dpd_commercial_flag"]), or whole
+            blocks ("qawaem", "commercial", "consumer", "bms", "trends"). companyName, organization_id, cr_number and year
+            are always returned. If not given, all fields are returned.
+        year: Optional. "latest" (default) for the most recent year of each company, "all" for every year,
+            or a specific fiscal year such as "2022".
+        tabular: Optional. Return the data as {"columns": [...], "rows": [[...], ...]} (one header row and
+            one value row per record) instead of one object per record, which is much smaller.
+        filters: Optional. Only return the records matching every filter, e.g. ["dscr < 1.5"] or
+            ["dscr < 1.5", "dpd_commercial_flag = RED"]. Operators: <, <=, >, >=, =, !=. qawaem metrics,
+            trend fields and year can be compared with numbers; SIMAH values and flags only with = and !=.
+        page: Optional. Page number (from 1) when page_size is given.
+        page_size: Optional. Return at most this many records, one page at a time (e.g. to go through all companies).
+
     Returns:
-        dict: A dictionary with the overall status and detailed financial data.
+        dict: A dictionary with the overall status, the detailed financial data and its size.
 
         Example structure:
         {
@@ -34,6 +103,7 @@ def Lendo_Credit_Decision_Engine() -> Dict[str, any]:
                 "year": int - The fiscal year the financial data belongs to,
                 "netProfit": float - Net income after deducting all expenses and taxes,
                 "revenue": float - Total revenue generated during the year,
+                "operatingProfit": float - Operating profit (loss) for the year,
                 "cashFlowFromOperatingActivities": float - Net cash generated or used from operating activities,
                 "currentRatio": float - Liquidity ratio measuring the ability to cover short-term liabilities,
                 "dscr": float - Debt Service Coverage Ratio indicating ability to service debt,
@@ -43,157 +113,192 @@ def Lendo_Credit_Decision_Engine() -> Dict[str, any]:
                 "gearingRatio": float - Proportion of debt to equity capital,
                 "totalEquity": float - Shareholders' total equity at the end of the year,
        
-            }
+                "trends": {
+                    "years_available": int - Number of fiscal years with data for the company,
+                    "latest_year": int - The company's most recent fiscal year,
+                    "previous_year": int | null - The prior fiscal year, null if it has no data,
+                    "<metric>_yoy_change": float | null - Change from the prior fiscal year, for revenue, netProfit,
+                        operatingProfit, cashFlowFromOperatingActivities, totalEquity, netProfitMargin and grossProfitMargin,
+                    "<metric>_yoy_growth": float | null - The same change in % of the prior year's value,
+                    "<metric>_cagr": float | null - Compound annual growth in % from the earliest to the latest
+                        fiscal year, for revenue, netProfit, operatingProfit and totalEquity
+                }
+            },
+            "payload": {"bytes": int, "approx_tokens": int} - Size of "data" as sent back to the model,
+            "page": {"page": int, "page_size": int, "total_records": int, "total_pages": int} - Only with page_size
         }
     """
+    from .projection import (
+        select_year_rows, parse_year, parse_filters, filter_rows, page_bounds, page_info,
+        project_records, project_store_records, to_table, payload_size
+    )
+    from .company_db import get_company_db
 
-    companies_data = qawaem_data.get("data", [])
-
-    # Extract simplified data (flattened into text for prompt injection)
-    simplified_data = []
-
-    for company in companies_data:
-        company_name = company.get("companyName", "Unknown")
-        cr_number = company.get("commercialRegistrationNumber", "")
-        organization_id = company.get("organizationId", "")
-        financial_statements = company.get("financialStatement", [])
-        consumer = company.get("consumer",{})
-        commercial = company.get("commercial",{})
-        bms = company.get("bms",{});
-              
-        dpd_commercial = None
-        dpd_commercial_flag = None
-        bounced_cheque_commercial = None
-        bounced_cheque_commercial_flag = None
-        unsettled_commercial = None
-        unsettled_commercial_flag = None
-        court_cases_commercial = None
-        court_cases_commercial_flag = None
-
-         # Handle commercial rules extraction
-        if commercial and "rules" in commercial:
-            for commercial_rule_data in commercial["rules"]:
-                param_name = commercial_rule_data.get("parameterName")
-
-                if param_name == "30-dpd on existing facilities":
-                    dpd_commercial = commercial_rule_data.get("parameterValue")
-                    dpd_commercial_flag = commercial_rule_data.get("flag")
-
-                elif param_name == "Bounced Cheques":
-                    bounced_cheque_commercial = commercial_rule_data.get("parameterValue")
-                    bounced_cheque_commercial_flag = commercial_rule_data.get("flag")
-
-                elif param_name == "Unsettled Defaults":
-                    unsettled_commercial = commercial_rule_data.get("parameterValue")
-                    unsettled_commercial_flag = commercial_rule_data.get("flag")
-
-                elif param_name == "Outstanding Court Cases":
-                    court_cases_commercial = commercial_rule_data.get("parameterValue")
-                    court_cases_commercial_flag = commercial_rule_data.get("flag")
-
-            dpd_consumer = None   
-            dpd_consumer_flag = None
-            bounced_cheque_consumer = None
-            bounced_cheque_consumer_flag = None
-            unsettled_consumer = None
-            unsettled_consumer_flag = None
-            court_cases_consumer = None
-            court_cases_consumer_flag = None
-        
-        if consumer and "rules" in consumer:
-            for consumer_rule_data in consumer["rules"]:
-                param_name = consumer_rule_data.get("parameterName")
-
-                if param_name == "30-dpd on existing facilities":
-                    dpd_consumer = consumer_rule_data.get("parameterValue")
-                    dpd_consumer_flag = consumer_rule_data.get("flag")
-
-                elif param_name == "Bounced Cheques":
-                    bounced_cheque_consumer = consumer_rule_data.get("parameterValue")
-                    bounced_cheque_consumer_flag = consumer_rule_data.get("flag")
-
-                elif param_name == "Unsettled Defaults":
-                    unsettled_consumer = consumer_rule_data.get("parameterValue")
-                    unsettled_consumer_flag = consumer_rule_data.get("flag")
-
-                elif param_name == "Outstanding Court Cases":
-                    court_cases_consumer = consumer_rule_data.get("parameterValue")
-                    court_cases_consumer_flag = consumer_rule_data.get("flag")
-
-        for yearly_data in financial_statements:
-            year = yearly_data.get("year", "")
-            ratios = yearly_data.get("ratios", {})
-            spreading = ratios.get("financialSpreading", {})
-            profit_loss = yearly_data.get("profitAndLoss", {})
-            cashflow = yearly_data.get("cashflow", {})
-      
-
-            simplified_data.append({
-                "companyName": company_name,
-                "cr_number": cr_number,
-                "organization_id": organization_id,
-                "year": year,
-                "qawaem": {"netProfit": profit_loss.get("netProfit", 0),
-                "revenue": profit_loss.get("totalRevenue", 0),
-                "cashFlowFromOperatingActivities": cashflow.get("netCashFlowsFromUsedInOperatingActivities", 0),
-                "currentRatio": spreading.get("currentRatio", 0),
-                "dscr": spreading.get("dscr", 0),
-                "debtRatio": spreading.get("debtRatio", 0),
-                "netProfitMargin": spreading.get("netProfitMargin", 0),
-                "netProfitMarginGrowth":spreading.get("npmGrowth", 0),
-                "grossProfitMargin": spreading.get("grossProfitMargin", 0),
-                "grossProfitMarginGrowth":spreading.get("gpmGrowth", 0),
-                "leverageRatio": spreading.get("leverageRatio", 0),
-                "gearingRatio": spreading.get("gearingRatio", 0),
-                "totalEquity": yearly_data.get("totalEquity",0),
-                "revenueGrowth":spreading.get("revenueGrowth", 0),
-                "interestCoverage": spreading.get("interestCoverage", 0),
-                "externalDebtSales": spreading.get("externalDebtSalesRatio", 0),
-                "receivablePercentageSales": spreading.get("receivablePercentageSales", 0),
-                "daysSalesOutstanding": spreading.get("daysSalesOutstanding", 0),
-
-                },
-                "commercial":{
-                "dpd_commercial": dpd_commercial,
-                "dpd_commercial_flag": dpd_commercial_flag,
-                "bounced_cheque_commercial": bounced_cheque_commercial,
-                "bounced_cheque_commercial_flag": bounced_cheque_commercial_flag,
-                "unsettled_commercial": unsettled_commercial,
-                "unsettled_commercial_flag": unsettled_commercial_flag,
-                "court_cases_commercial": court_cases_commercial,
-                "court_cases_commercial_flag" : court_cases_commercial_flag,
-                },
-                "consumer":{
-                "dpd_consumer": dpd_consumer,
-                "dpd_consumer_flag": dpd_consumer_flag,
-                "bounced_cheque_consumer": bounced_cheque_consumer,
-                "bounced_cheque_consumer_flag": bounced_cheque_consumer_flag,
-                "unsettled_consumer": unsettled_consumer,
-                "unsettled_consumer_flag": unsettled_consumer_flag,
-                "court_cases_consumer": court_cases_consumer,
-                "court_cases_consumer_flag" : court_cases_consumer_flag
-                },
-                "bms":{
-                    "nitaqatColor": "Low Green",
-                    "yearsInBusiness": "2016-03-18",
-                    "market": "Local Market (Including GCC)", 
-                    "industry": "Information & Communication, Arts & Recreation",
-                    "typeOfCustomer": "Govt. & Semi Govt. Entities, and well-known Corporation",
-                    "customerConcentration": bms.get("customerConcentration",0),
-                    "changeInOwnership": "No",
-                    "changeInManagement": "No",
-                    "breachInFinancialCovenant": "No",
-                    "delayedAfs": "No"
-                }
-            })
-    return {
-        "status":"Success",
-        "data": simplified_data
+    try:
+        year_mode = parse_year(year)
+        parsed_filters = parse_filters(filters)
+        offset, limit = page_bounds(page, page_size)
+    except ValueError as e:
+        return {
+            "status": "Error",
+            "message": str(e)
+        }
+
+    database = get_company_db()
+    if database is not None:
+        # Indexed queries on the company-year database (see company_db.py), nothing is loaded in memory
+        with span("engine.query", year=year, filters=len(parsed_filters)):
+            if (organization_id is not None or cr_number is not None) and not database.has_company(organization_id, cr_number):
+                return _company_not_found(organization_id, cr_number)
+            records, total = database.query(organization_id, cr_number, year_mode, parsed_filters, offset, limit)
+    else:
+        # Data is loaded on first use, a single company is looked up through the snapshot indexes
+        with span("engine.select_company"):
+            store = _select_store(organization_id, cr_number)
+        if store is None:
+            return _company_not_found(organization_id, cr_number)
+
+        with span("engine.query", year=year, filters=len(parsed_filters)):
+            rows = filter_rows(store, select_year_rows(store, year_mode), parsed_filters)
+            total = len(rows)
+            rows = rows[offset:None if limit is None else offset + limit]
+
+    try:
+        with span("engine.project", tabular=tabular):
+            if database is None:
+                # Only the requested fields of the page are materialized
+                records = project_store_records(store, rows, fields)
+            else:
+                records = project_records(records, fields)
+            data = to_table(records) if tabular else records
+    except ValueError as e:
+        return {
+            "status": "Error",
+            "message": str(e)
+        }
+
+    payload = payload_size(data)
+    annotate(records=len(records), payload_bytes=payload["bytes"])
+    result = {
+        "status": "Success",
+        "data": data,
+        "payload": payload
     }
+    if page_size is not None:
+        result["page"] = page_info(page, page_size, total)
+    return result
+
+@instrumented_tool
+def Evaluate_Credit_Rulebook(organization_id: Optional[int] = None, cr_number: Optional[str] = None, all_years: bool = False) -> Dict[str, Any]:
+    """
+    Applies the RULEBOOK and the Partial Acceptance Criteria Assessment to the company data
+    returned by `Lendo_Credit_Decision_Engine`.
+
+    Args:
+        organization_id: Optional. Only evaluate the company with this organization id.
+        cr_number: Optional. Only evaluate the company with this commercial registration number.
+        all_years: Optional. Evaluate every fiscal year instead of only the most recent one.
+
+    Returns:
+        dict: {
+            "status": "Success" | "Error",
+            "data": [
+                {
+                    "companyName": str,
+                    "organization_id": int,
+                    "cr_number": str,
+                    "year": int,
+                    "rules_met": list of str - RULEBOOK rules that were met,
+                    "rules_violated": list of str - RULEBOOK rules that were violated,
+                    "rules_met_count": int,
+                    "rules_violated_count": int,
+                    "percentage_met": float - Percentage of RULEBOOK rules met,
+                    "credit_history_violated": bool - True if any Credit History rule is violated (overrides all other rules),
+                    "recommendation": str - Final recommendation
+                }
+            ]
+        }
+    """
+    from .rulebook import evaluate_rulebook, RULEBOOK_ID
+
+    return _cached_decisions(
+        organization_id, cr_number, "rulebook", RULEBOOK_ID,
+        lambda store, by_company: evaluate_rulebook(store, all_years=all_years, by_company=by_company),
+        all_years=all_years
+    )
+
+@instrumented_tool
+def Calculate_Credit_Scorecard(organization_id: Optional[int] = None, cr_number: Optional[str] = None, all_years: bool = False) -> Dict[str, Any]:
+    """
+    Computes the qualitative Scorecard (max 106 points) and grade for the company data
+    returned by `Lendo_Credit_Decision_Engine`.
+
+    Args:
+        organization_id: Optional. Only score the company with this organization id.
+        cr_number: Optional. Only score the company with this commercial registration number.
+        all_years: Optional. Score every fiscal year instead of only the most recent one.
+
+    Returns:
+        dict: {
+            "status": "Success" | "Error",
+            "data": [
+                {
+                    "companyName": str,
+                    "organization_id": int,
+                    "cr_number": str,
+                    "year": int,
+                    "criteria": list of {"criterion": str, "value": actual value from data, "score": float or None if not scored},
+                    "total_score": float - Scorecard total,
+                    "max_score": int,
+                    "grade": str - A+ | A | B | C | D | R
+                }
+            ]
+        }
+    """
+    from .scorecard import evaluate_scorecard, SCORECARD_ID
+
+    # Years in business depend on the date, so cached scorecards are only reused the same day
+    as_of = date.today()
+    return _cached_decisions(
+        organization_id, cr_number, "scorecard", SCORECARD_ID,
+        lambda store, by_company: evaluate_scorecard(store, all_years=all_years, as_of=as_of, by_company=by_company),
+        all_years=all_years, as_of=as_of.isoformat()
+    )
+
+def _credit_file_name(summary_data: Dict[str, Any]) -> str:
+    return f"Lendo Credit File - {summary_data.get('crNumber', 'N/A')}.docx"
+
+def _build_credit_file_email(company_id: Any, to_email: str, subject: str, body: str, summary_data: Dict[str, Any]) -> EmailMessage:
+    """Builds the credit decision email with the company's credit file attached."""
+    # Step 1: Generate the credit file in memory (python-docx is only loaded here)
+    from .generate_credit_file import create_lendo_credit_file
+
+    file_name = _credit_file_name(summary_data)
+
+    credit_file = create_lendo_credit_file(company_id, summary_data, BytesIO())
+
+    with span("email.mime", attachments=1):
+        # Step 2: Create email message
+        msg = EmailMessage()
+        msg["From"] = "imran.shafqat@lendo.sa"
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.set_content(body)
+
+        # Step 3: Attach the Word file straight from the buffer, without copying it
+        msg.add_attachment(
+            credit_file.getbuffer(),
+            maintype="application",
+            subtype="vnd.openxmlformats-officedocument.wordprocessingml.document",
+            filename=file_name
+        )
+    return msg
 
+@instrumented_tool
 def Send_Email(input: Dict[str, Any]) -> Dict[str, str]:
     """
-    Sends an email using MailHog SMTP.
+    Queues an email with the credit file attached. It is sent in the background
+    (retrying temporary SMTP errors), use `Get_Email_Status` to follow it.
 
     Args:
         input: {
@@ -204,74 +309,161 @@ def Send_Email(input: Dict[str, Any]) -> Dict[str, str]:
         }
 
     Returns:
-        dict: {"status": "Success" | "Error", "message": str}
+        dict: {"status": "Success" | "Error", "message": str, "tracking_id": str - ID to look up the delivery status}
     """
     try:
         to_email = input.get("to")
         subject = input.get("subject", "Credit Analysis Result")
         summary_data = input.get("summary_data")
+        company_id = input.get("companyId")
 
         if not to_email:
             return {"status": "Error", "message": "Missing 'to' email address."}
 
-        if summary_data:
-            body = build_credit_summary_email_body(summary_data)
+        body = build_credit_summary_email_body(summary_data) if summary_data else None
 
         if not body:
             return {"status": "Error", "message": "Missing email body or summary data."}
 
-        # Step 1: Generate credit file directly
-        file_name = f"Lendo Credit File - {summary_data.get('crNumber', 'N/A')}.docx"
+        # Also warms the reference data cache for the credit file generation
+        if get_reference_data().get_optional("credit_file", company_id) is None:
+            return {"status": "Error", "message": f"No credit file data found for companyId={company_id}"}
 
-        create_lendo_credit_file(input.get("companyId"), summary_data, file_name)
+        # Step 5: The credit file is built and sent by the email queue (on pooled SMTP sessions:
+        # SendGrid, or SMTP_HOST/SMTP_PORT for a local MailHog)
+        from .email_queue import get_email_queue
 
-        # Step 2: Locate the generated file
-        if not os.path.exists(file_name):
-            return {"status": "Error", "message": f"File '{file_name}' not found after generation."}
+        tracking_id = get_email_queue().submit(
+            lambda: _build_credit_file_email(company_id, to_email, subject, body, summary_data),
+            to=to_email,
+            subject=subject
+        )
 
-        # Step 3: Create email message
-        msg = EmailMessage()
-        msg["From"] = "imran.shafqat@lendo.sa"
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.set_content(body)
+        return {"status": "Success", "message": f"Email to {to_email} queued for delivery", "tracking_id": tracking_id}
+
+    except Exception as e:
+        return {"status": "Error", "message": str(e)}
+
+@instrumented_tool
+def Get_Email_Status(tracking_id: str) -> Dict[str, Any]:
+    """
+    Looks up the delivery status of an email queued by `Send_Email`.
+
+    Args:
+        tracking_id: The tracking_id returned by `Send_Email`.
+
+    Returns:
+        dict: {
+            "status": "Success" | "Error",
+            "data": {
+                "tracking_id": str,
+                "to": str,
+                "subject": str,
+                "status": str - queued | sending | retrying | sent | failed,
+                "attempts": int - Delivery attempts so far,
+                "error": str or None - Last delivery error,
+                "refused": dict - Recipients the server refused, with its reply (the email fails if all were refused),
+                "next_attempt_at": float or None - Time of the next attempt (epoch seconds) when retrying,
+                "retry_in": float or None - Seconds until the next attempt when retrying
+            }
+        }
+    """
+    from .email_queue import get_email_queue
+
+    email = get_email_queue().status(tracking_id)
+    if email is None:
+        return {"status": "Error", "message": f"No email found for tracking_id={tracking_id}"}
+
+    return {"status": "Success", "data": email}
+
+def _build_credit_digest_email(to_email: str, subject: str, body: str, companies: List[Dict[str, Any]], zip_files: bool) -> EmailMessage:
+    """Builds one email with the credit files of several companies, attached one by one or in a single zip."""
+    import zipfile
+    from .generate_credit_file import create_lendo_credit_file
+
+    msg = EmailMessage()
+    msg["From"] = "imran.shafqat@lendo.sa"
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(body)
+
+    if zip_files:
+        # A DOCX is itself a zip and its writer seeks, which a zip entry can't: render each into a buffer first.
+        # The DOCX parts are already deflated, so the outer zip only stores them.
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zip_file:
+            for company in companies:
+                credit_file = create_lendo_credit_file(company["companyId"], company["summary_data"], BytesIO())
+                zip_file.writestr(_credit_file_name(company["summary_data"]), credit_file.getbuffer())
+        msg.add_attachment(archive.getbuffer(), maintype="application", subtype="zip", filename="Lendo Credit Files.zip")
+        return msg
+
+    for company in companies:
+        credit_file = create_lendo_credit_file(company["companyId"], company["summary_data"], BytesIO())
+        msg.add_attachment(
+            credit_file.getbuffer(),
+            maintype="application",
+            subtype="vnd.openxmlformats-officedocument.wordprocessingml.document",
+            filename=_credit_file_name(company["summary_data"])
+        )
+    return msg
+
+@instrumented_tool
+def Send_Digest_Email(input: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Queues ONE email for several companies: a summary table of every company in the body
+    and all their credit files attached (optionally in one zip file). Use it instead of
+    `Send_Email` when the results of more than one company are to be emailed.
+
+    Args:
+        input: {
+            "to": str (email address to send email to),
+            "subject": str (email subject),
+            "companies": list of {
+                "companyId": number (like 1742, 4560, 2140 OR 1901),
+                "summary_data": dict (same fields as for `Send_Email`)
+            },
+            "zip": bool (optional - attach all credit files in one zip file)
+        }
+
+    Returns:
+        dict: {"status": "Success" | "Error", "message": str, "tracking_id": str - ID to look up the delivery status}
+    """
+    try:
+        to_email = input.get("to")
+        subject = input.get("subject", "Credit Analysis Results")
+        companies = input.get("companies") or []
+        zip_files = bool(input.get("zip", False))
+
+        if not to_email:
+            return {"status": "Error", "message": "Missing 'to' email address."}
+
+        if not companies or not all(company.get("summary_data") for company in companies):
+            return {"status": "Error", "message": "Missing companies or their summary data."}
+
+        missing = [
+            company.get("companyId") for company in companies
+            if get_reference_data().get_optional("credit_file", company.get("companyId")) is None
+        ]
+        if missing:
+            return {"status": "Error", "message": f"No credit file data found for companyId={', '.join(map(str, missing))}"}
+
+        body = build_credit_digest_email_body([company["summary_data"] for company in companies])
+
+        from .email_queue import get_email_queue
+
+        tracking_id = get_email_queue().submit(
+            lambda: _build_credit_digest_email(to_email, subject, body, companies, zip_files),
+            to=to_email,
+            subject=subject
+        )
+
+        return {
+            "status": "Success",
+            "message": f"Digest of {len(companies)} companies to {to_email} queued for delivery",
+            "tracking_id": tracking_id
+        }
 
-        # Step 4: Attach the Word file
-        with open(file_name, "rb") as f:
-            file_data = f.read()
-            msg.add_attachment(
-                file_data,
-                maintype="application",
-                subtype="vnd.openxmlformats-officedocument.wordprocessingml.document",
-                filename=file_name
-            )
-
-        # Step 5: Send email with local mailhog docker
-        # with smtplib.SMTP("localhost", 1025) as smtp:
-        #    smtp.send_message(msg)
-
-        # Step 5: Send email with sendgrid
-        SMTP_SERVER = "smtp.sendgrid.net"
-        SMTP_PORT = 587
-        SMTP_USERNAME = "apikey"  # literally the word 'apikey'
-        SMTP_PASSWORD = os.getenv("EMAIL_API_KEY")
-
-        # Error handling if the api key is missing
-        if not SMTP_PASSWORD:
-            raise EnvironmentError("❌ EMAIL_API_KEY environment variable is missing or not set.")
-        else:
-            print("✅ EMAIL_API_KEY loaded successfully.")
-        
-        # Send email now
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as smtp:
-            smtp.starttls()  # upgrade the connection to secure
-            smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
-            smtp.send_message(msg)
-
-        return {"status": "Success", "message": f"Email sent to {to_email}"}
-
-    except subprocess.CalledProcessError as e:
-        return {"status": "Error", "message": f"Failed to run generate-credit-file.py: {e}"}
     except Exception as e:
         return {"status": "Error", "message": str(e)}
 
@@ -316,6 +508,50 @@ Regards,
 ADK AGENT
 """
 
+# Columns of the digest summary table: (header, summary_data field)
+DIGEST_COLUMNS = [
+    ("Company", "companyName"),
+    ("CR#", "crNumber"),
+    ("Score", "simahScore"),
+    ("Risk Rating", "riskRating"),
+    ("DPD", "dpd"),
+    ("Revenue", "revenue"),
+    ("NPM", "netProfitMargin"),
+    ("DSCR", "dscr"),
+    ("Bounced Cheques", "bouncedCheques"),
+    ("Final Recommendation", "finalRecommendation"),
+]
+
+def build_credit_digest_email_body(summaries: List[Dict[str, Any]]) -> str:
+    """
+    Builds the body of a digest email: one summary table row per company.
+
+    Args:
+        summaries: summary_data of every company (see `build_credit_summary_email_body`).
+
+    Returns:
+        str: Email body as plain text
+    """
+    rows = [[header for header, _ in DIGEST_COLUMNS]]
+    rows += [[str(summary.get(field, "N/A")) for _, field in DIGEST_COLUMNS] for summary in summaries]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(DIGEST_COLUMNS))]
+
+    lines = [" | ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "-+-".join("-" * width for width in widths))
+    table = "\n".join(lines)
+
+    return f"""Dear CreditDecision@lendo.sa,
+
+Please find the credit files of {len(summaries)} companies. Below is a summary:
+
+{table}
+
+Attached: Credit Files
+
+Regards,
+ADK AGENT
+"""
+
 # Agent config
 financial_analysis_agent = Agent(
     name="CreditPolicyAgent",
@@ -323,7 +559,11 @@ financial_analysis_agent = Agent(
     instruction=COMPANY_APPROVAL_OR_REJECTION_DECISION_INSTRCUTION,
     tools=[
         Lendo_Credit_Decision_Engine, # Register the main decisioning tool
-        Send_Email # Register the email sending tool
+        Evaluate_Credit_Rulebook, # Register the RULEBOOK evaluation tool
+        Calculate_Credit_Scorecard, # Register the scorecard tool
+        Send_Email, # Register the email sending tool
+        Send_Digest_Email, # Register the multi-company email tool
+        Get_Email_Status # Register the email delivery status tool
     ]
     )
 
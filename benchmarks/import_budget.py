@@ -0,0 +1,119 @@
+"""
+Checks the import time budget of the agent package with `python -X importtime`.
+
+Usage (from anywhere):
+    python benchmarks/import_budget.py [--budget-ms 25]
+
+The budget covers the time the agent package's own modules and everything they
+pull in add on top of the ADK framework import, which `adk web` pays anyway.
+Importing the agent must also not load the DOCX/numpy stacks or the data files.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(PACKAGE_DIR)
+
+DEFAULT_BUDGET_MS = 25.0
+
+# Fresh interpreter runs per measurement, the fastest one is kept
+DEFAULT_RUNS = 3
+
+# Modules that must not be imported by `import <package>.agent`
+LAZY_MODULES = ("docx", "lxml", "numpy")
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# The framework is imported first, so that only what the package adds on top
+# of it is reported after the marker.
+PACKAGE_MARKER = "--- agent package ---"
+
+IMPORT_SCRIPT = f"""
+import importlib, sys
+from google.adk.agents import Agent
+Agent.model_fields
+sys.stderr.write("{PACKAGE_MARKER}\\n")
+agent = importlib.import_module("{PACKAGE_NAME}.agent")
+data_provider = importlib.import_module("{PACKAGE_NAME}.data_provider")
+print("DATA_LOADED=" + str(data_provider._snapshot is not None))
+"""
+
+
+def run_importtime() -> tuple:
+    """
+    Imports the agent with `python -X importtime` in a fresh interpreter.
+
+    Returns:
+        tuple: (framework import time in ms, package import time in ms,
+            set of modules imported by the package, data loaded flag)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=os.path.dirname(PACKAGE_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    totals_us = [0, 0]
+    imported = set()
+    section = 0
+    for line in completed.stderr.splitlines():
+        if line == PACKAGE_MARKER:
+            section = 1
+            continue
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            if section == 1:
+                imported.add(match.group(4))
+            # Top level imports already include the time of their children
+            if len(match.group(3)) == 1:
+                totals_us[section] += int(match.group(2))
+
+    return totals_us[0] / 1000, totals_us[1] / 1000, imported, "DATA_LOADED=True" in completed.stdout
+
+
+def measure_import(runs: int = DEFAULT_RUNS) -> dict:
+    """Measures the import time the agent package adds on top of the ADK framework."""
+    framework_ms, package_ms, imported, data_loaded = min(
+        (run_importtime() for _ in range(runs)), key=lambda run: run[1]
+    )
+
+    return {
+        "total_ms": framework_ms + package_ms,
+        "framework_ms": framework_ms,
+        "package_ms": package_ms,
+        "lazy_modules_imported": sorted(m for m in LAZY_MODULES if m in imported),
+        "data_loaded": data_loaded,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args()
+
+    result = measure_import(args.runs)
+    print(f"import {PACKAGE_NAME}.agent: {result['total_ms']:.1f} ms total, "
+          f"{result['framework_ms']:.1f} ms framework, {result['package_ms']:.1f} ms package "
+          f"(budget {args.budget_ms:.1f} ms)")
+
+    failures = []
+    if result["package_ms"] > args.budget_ms:
+        failures.append(f"package import took {result['package_ms']:.1f} ms")
+    if result["lazy_modules_imported"]:
+        failures.append(f"imported lazy modules: {', '.join(result['lazy_modules_imported'])}")
+    if result["data_loaded"]:
+        failures.append("data was loaded at import time")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
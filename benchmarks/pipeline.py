@@ -0,0 +1,386 @@
+"""
+Benchmarks the credit decision pipeline at several portfolio sizes.
+
+Usage (from anywhere):
+    python benchmarks/pipeline.py [--sizes 4,1000,10000,100000] [--samples 20]
+                                  [--output results.json] [--compare previous.json]
+
+For every size a seeded synthetic data set of that many borrowers is generated
+(by synthetic_data.py, kept in --data-root for later runs) and measured in a
+fresh interpreter, so that peak RSS is per size:
+
+- snapshot_build: parsing, profile assembly and flattening into the columnar store
+- engine_*: `Lendo_Credit_Decision_Engine` for all companies (records / tabular) and one company
+- rulebook_all / scorecard_all: the decision tools for all companies (never cached)
+- decisions_cold / decisions_warm: the rulebook and scorecard of --samples single
+  companies through the decision cache, emptied first / already filled
+- credit_file: `create_lendo_credit_file` for --samples borrowers, in memory
+- email_body / digest_body: `build_credit_summary_email_body` per sample, and
+  `build_credit_digest_email_body` over every borrower
+- mime: `_build_credit_file_email` (credit file + MIME assembly) per sample
+- smtp_send: sending the sample messages on the pooled SMTP sessions
+- send_email_queued: `Send_Email` per sample until the email queue is drained
+
+SMTP goes to a local stand-in started by the benchmark (or to --smtp-host/--smtp-port,
+e.g. a MailHog), never to SendGrid.
+
+Each stage reports its wall time, the memory it allocated (tracemalloc peak and
+bytes still held by its result, measured in a second, traced run) and the
+process peak RSS after it. Results are written as JSON so that runs of
+different commits can be compared with --compare.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = os.path.basename(PACKAGE_DIR)
+
+DEFAULT_SIZES = [4, 1_000, 10_000, 100_000]
+
+# Borrowers the per-borrower stages (credit file, email, SMTP) run on
+DEFAULT_SAMPLES = 20
+
+DEFAULT_DATA_ROOT = os.path.join(tempfile.gettempdir(), f"{PACKAGE_NAME}-benchmark-data")
+DEFAULT_RESULTS_DIR = os.path.join(PACKAGE_DIR, "benchmarks", "results")
+
+# Written last when preparing a data set, so an interrupted preparation is redone
+COMPLETE_MARKER = ".complete"
+
+
+# --- Data sets ---
+
+def prepare_dataset(size: int, seed: int = 0, data_root: str = DEFAULT_DATA_ROOT) -> str:
+    """Returns a data directory with `size` synthetic borrowers (see synthetic_data.py), generating it if needed."""
+    from synthetic_data import write_dataset
+
+    data_dir = os.path.join(data_root, f"{size}-seed{seed}")
+    if not os.path.exists(os.path.join(data_dir, COMPLETE_MARKER)):
+        write_dataset(data_dir, size, seed, progress_every=100_000)
+        open(os.path.join(data_dir, COMPLETE_MARKER), "w").close()
+    return data_dir
+
+
+# --- Local SMTP stand-in ---
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP to accept messages, and throws them away."""
+
+    def setup(self) -> None:
+        super().setup()
+        # Replies are tiny, don't let Nagle's algorithm delay them
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        self._reply("220 localhost benchmark SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-localhost\r\n250 8BITMIME")
+            elif command.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                self.server.messages += 1
+                self._reply("250 OK")
+            elif command.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET, NOOP
+                self._reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in on an ephemeral port, counting the messages it accepted."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _SMTPSinkHandler)
+        self.messages = 0
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+
+# --- Measurements ---
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(run: Callable[[], Any], trace: bool = True, reset: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """
+    Measures one stage: wall time of an untraced run, then allocations of a traced run.
+
+    Args:
+        run: The stage.
+        trace: Also run it under tracemalloc.
+        reset: Called before each run, e.g. to clear caches.
+    """
+    if reset:
+        reset()
+    start = time.perf_counter()
+    run()
+    result = {"wall_s": time.perf_counter() - start, "peak_rss_mb": _peak_rss_mb()}
+
+    if trace:
+        if reset:
+            reset()
+        tracemalloc.start()
+        try:
+            kept = run()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del kept
+        result["alloc_peak_bytes"] = peak
+        result["alloc_retained_bytes"] = current
+    return result
+
+
+def _summary_data(record: Dict[str, Any], rulebook: Dict[str, Any], scorecard: Dict[str, Any]) -> Dict[str, Any]:
+    recommended = not rulebook["credit_history_violated"] and rulebook["recommendation"].startswith("RECOMMENDED")
+    qawaem = record["qawaem"]
+    return {
+        "companyName": record["companyName"],
+        "crNumber": record["cr_number"],
+        "simahScore": scorecard["total_score"],
+        "dpd": record["commercial"]["dpd_commercial_flag"],
+        "revenue": qawaem["revenue"],
+        "netProfitMargin": qawaem["netProfitMargin"],
+        "dscr": qawaem["dscr"],
+        "bouncedCheques": record["commercial"]["bounced_cheque_commercial"],
+        "riskRating": scorecard["grade"],
+        "finalRecommendation": "✅ Recommend for financing" if recommended else "❌ Not Recommend for financing",
+        "finalDecision": "Approved" if recommended else "Rejected",
+    }
+
+
+def run_size(size: int, samples: int, trace: bool) -> Dict[str, Any]:
+    """Runs every stage on the data set the environment points at (CREDIT_DATA_DIR). Runs in the child process."""
+    sys.path.insert(0, os.path.dirname(PACKAGE_DIR))
+    agent = importlib.import_module(f"{PACKAGE_NAME}.agent")
+    data_provider = importlib.import_module(f"{PACKAGE_NAME}.data_provider")
+    reference_data = importlib.import_module(f"{PACKAGE_NAME}.reference_data")
+    generate_credit_file = importlib.import_module(f"{PACKAGE_NAME}.generate_credit_file")
+    smtp_pool = importlib.import_module(f"{PACKAGE_NAME}.smtp_pool")
+    email_queue = importlib.import_module(f"{PACKAGE_NAME}.email_queue")
+
+    stages = {}
+
+    def build():
+        data_provider._snapshot = data_provider.build_snapshot()
+        return data_provider._snapshot
+
+    stages["snapshot_build"] = measure(build, trace, reset=reference_data.get_reference_data().clear)
+    store = data_provider.get_snapshot().store
+    first_id = store.organization_id[0]
+
+    stages["engine_all_latest"] = measure(lambda: agent.Lendo_Credit_Decision_Engine(), trace)
+    stages["engine_all_tabular"] = measure(lambda: agent.Lendo_Credit_Decision_Engine(tabular=True), trace)
+    stages["engine_single"] = measure(lambda: agent.Lendo_Credit_Decision_Engine(organization_id=first_id), trace)
+    stages["rulebook_all"] = measure(lambda: agent.Evaluate_Credit_Rulebook(), trace)
+    stages["scorecard_all"] = measure(lambda: agent.Calculate_Credit_Scorecard(), trace)
+
+    decision_cache = importlib.import_module(f"{PACKAGE_NAME}.decision_cache").get_decision_cache()
+    sample_ids = list(store.organization_id[:samples])
+
+    def single_decisions():
+        return [
+            (agent.Evaluate_Credit_Rulebook(organization_id=company_id), agent.Calculate_Credit_Scorecard(organization_id=company_id))
+            for company_id in sample_ids
+        ]
+
+    stages["decisions_cold"] = measure(single_decisions, trace, reset=decision_cache.clear)
+    stages["decisions_warm"] = measure(single_decisions, trace)
+
+    records = agent.Lendo_Credit_Decision_Engine()["data"]
+    rulebook = agent.Evaluate_Credit_Rulebook()["data"]
+    scorecard = agent.Calculate_Credit_Scorecard()["data"]
+    summaries = [_summary_data(*row) for row in zip(records, rulebook, scorecard)]
+    sample = [(record["organization_id"], summary) for record, summary in zip(records, summaries)][:samples]
+
+    def per_sample(stage: Callable[[Any, Dict[str, Any]], Any]) -> Callable[[], List[Any]]:
+        return lambda: [stage(company_id, summary) for company_id, summary in sample]
+
+    stages["credit_file"] = measure(per_sample(
+        lambda company_id, summary: generate_credit_file.create_lendo_credit_file(company_id, summary, BytesIO())
+    ), trace)
+    stages["email_body"] = measure(per_sample(lambda _, summary: agent.build_credit_summary_email_body(summary)), trace)
+    stages["digest_body"] = measure(lambda: agent.build_credit_digest_email_body(summaries), trace)
+
+    def build_message(company_id, summary):
+        body = agent.build_credit_summary_email_body(summary)
+        return agent._build_credit_file_email(company_id, "benchmark@localhost", "Benchmark", body, summary)
+
+    stages["mime"] = measure(per_sample(build_message), trace)
+
+    messages = per_sample(build_message)()
+    pool = smtp_pool.get_smtp_pool()
+    stages["smtp_send"] = measure(lambda: [pool.send_message(message) for message in messages], trace)
+
+    def send_queued():
+        tracking_ids = [
+            agent.Send_Email({"companyId": company_id, "to": "benchmark@localhost", "subject": "Benchmark", "summary_data": summary})
+            for company_id, summary in sample
+        ]
+        email_queue.get_email_queue().wait()
+        return tracking_ids
+
+    stages["send_email_queued"] = measure(send_queued, trace)
+
+    stages["decisions_cold"]["calls"] = stages["decisions_warm"]["calls"] = len(sample_ids)
+    for stage in ("credit_file", "email_body", "mime", "smtp_send", "send_email_queued"):
+        stages[stage]["calls"] = len(sample)
+
+    return {
+        "borrowers": int(store.company_count),
+        "company_years": len(store),
+        "engine_payload": agent.Lendo_Credit_Decision_Engine()["payload"],
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+        "smtp": pool.stats(),
+    }
+
+
+def run_size_in_child(size: int, data_dir: str, samples: int, trace: bool, smtp_host: Optional[str], smtp_port: Optional[int]) -> Dict[str, Any]:
+    """Runs one size in a fresh interpreter and returns its results."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--sizes", str(size), "--samples", str(samples)]
+    if not trace:
+        command.append("--no-tracemalloc")
+    if smtp_host:
+        command += ["--smtp-host", smtp_host, "--smtp-port", str(smtp_port or 1025)]
+
+    with tempfile.TemporaryDirectory(prefix="credit-benchmark-cache-") as cache_dir:
+        env = dict(
+            os.environ,
+            CREDIT_DATA_DIR=data_dir,
+            DECISION_CACHE_ENABLED="1",
+            DECISION_CACHE_PATH=os.path.join(cache_dir, "decisions.sqlite3"),
+            DATA_RELOAD_CHECK_INTERVAL="1000000",
+            METRICS_PORT="0",
+        )
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark of {size} borrowers failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def child_main(args: argparse.Namespace) -> int:
+    if args.smtp_host:
+        host, port = args.smtp_host, args.smtp_port or 1025
+    else:
+        sink = SMTPSink().start()
+        host, port = sink.server_address
+
+    # Must be set before the package is imported, smtp_pool reads them at import
+    os.environ.update(SMTP_HOST=host, SMTP_PORT=str(port), SMTP_STARTTLS="0", SMTP_USERNAME="")
+
+    result = run_size(args.sizes[0], args.samples, not args.no_tracemalloc)
+    print(json.dumps(result))
+    return 0
+
+
+# --- Reporting ---
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    """Prints one line per size and stage, with the wall time change against `previous` when given."""
+    for size, size_results in results["sizes"].items():
+        print(f"{size} borrowers ({size_results['company_years']} company-years, peak RSS {size_results['peak_rss_mb']:.0f} MB)")
+        previous_stages = ((previous or {}).get("sizes", {}).get(size) or {}).get("stages", {})
+        for stage, measured in size_results["stages"].items():
+            line = f"  {stage:<20} {measured['wall_s'] * 1000:>10.1f} ms"
+            if "alloc_peak_bytes" in measured:
+                line += f"  {measured['alloc_peak_bytes'] / 1024 / 1024:>9.1f} MB allocated"
+            before = previous_stages.get(stage)
+            if before and before["wall_s"] > 0:
+                line += f"  {(measured['wall_s'] / before['wall_s'] - 1) * 100:>+7.1f}% vs {previous.get('commit')}"
+            print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=DEFAULT_SIZES)
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data sets")
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT, help="Where generated data sets are kept between runs")
+    parser.add_argument("--output", help="Results JSON file (default: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="Results JSON file of an earlier run to compare against")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip the traced runs measuring allocations")
+    parser.add_argument("--smtp-host", help="Use this SMTP server (e.g. MailHog) instead of the built-in stand-in")
+    parser.add_argument("--smtp-port", type=int)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child_main(args)
+
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "samples": args.samples,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        data_dir = prepare_dataset(size, args.seed, args.data_root)
+        results["sizes"][str(size)] = run_size_in_child(
+            size, data_dir, args.samples, not args.no_tracemalloc, args.smtp_host, args.smtp_port
+        )
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"pipeline-{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    print_results(results, previous)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
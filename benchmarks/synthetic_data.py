@@ -0,0 +1,488 @@
+"""
+Generates a synthetic data set for load testing: `qawaem_data.json` plus the
+matching per-BR `bms/`, `simah-commerical/`, `simah-consumer/` and
+`credit-file-data/` files, in the layout of the package folder.
+
+Usage (from anywhere):
+    python benchmarks/synthetic_data.py --borrowers 100000 --output /tmp/credit-data [--seed 42]
+
+Then serve it with `CREDIT_DATA_DIR=/tmp/credit-data adk web`.
+
+Borrowers are written one at a time as they are generated, so memory stays
+flat however many are requested. Every borrower is generated from its own
+random stream derived from (seed, index): the same seed always gives the same
+data set, and the first N borrowers of a bigger data set equal a data set of N.
+
+Values follow the shape of the real payloads (newest year first, ratios in the
+same units: margins and growth in %, debt/receivable ratios as fractions) and
+are drawn so that rule hit rates look like a real portfolio: most borrowers have
+two or more years of data, about a third show 30+ dpd at one of the SIMAH
+bureaus, and weaker borrowers (a hidden risk score) have thinner margins, more
+debt and more SIMAH flags.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterator, List
+
+# Organization ids are BASE_ORGANIZATION_ID + index, far from the real ones
+BASE_ORGANIZATION_ID = 1_000_000
+
+# Fiscal year of the newest statement
+LATEST_YEAR = 2023
+
+# Number of fiscal years per borrower -> probability
+YEARS_OF_DATA = {1: 0.1, 2: 0.35, 3: 0.45, 4: 0.1}
+
+# Probability that the oldest of several years was filed without figures (all zero), as seen in real payloads
+EMPTY_OLDEST_YEAR = 0.3
+
+# Revenue of the newest year: lognormal around the median (SAR)
+REVENUE_MEDIAN = 15_000_000
+REVENUE_SIGMA = 1.1
+
+# SIMAH parameters: (parameter name, its rule bands as in real reports, probability of a non-zero value at average risk)
+SIMAH_PARAMETERS = [
+    ("30-dpd on existing facilities", [{"ruleName": "0", "flag": "GREEN"}, {"ruleName": ">0", "flag": "RED"}], 0.2),
+    ("Bounced Cheques", [{"ruleName": ">5", "flag": "RED"}, {"ruleName": "1-5", "flag": "AMBER"}, {"ruleName": "0", "flag": "GREEN"}], 0.12),
+    ("Unsettled Defaults", [{"ruleName": ">0", "flag": "RED"}, {"ruleName": "0", "flag": "GREEN"}], 0.06),
+    ("Outstanding Court Cases", [{"ruleName": ">0", "flag": "RED"}, {"ruleName": "0", "flag": "GREEN"}], 0.05),
+]
+
+# Probability that a bureau report lacks one of the parameters
+MISSING_SIMAH_PARAMETER = 0.03
+
+NITAQAT_COLORS = {
+    "بلاتيني": 0.08,
+    "Platinum": 0.04,
+    "High Green": 0.22,
+    "Medium Green": 0.2,
+    "Low Green": 0.25,
+    "Yellow": 0.09,
+    "Very Small Red": 0.07,
+    "Red": 0.05,
+}
+
+# ISIC sections as they appear in bms files
+SECTORS = [
+    "Agriculture, Forestry and Fishing",
+    "Mining and quarrying",
+    "Manufacturing",
+    "Electricity, gas, steam and air conditioning supply",
+    "Water supply; sewerage, waste management and remediation activities",
+    "Construction",
+    "Wholesale and retail trade; repair of motor vehicles and motorcycles",
+    "Transportation and storage",
+    "Accommodation and food service activities",
+    "Information and Communication",
+    "Financial and insurance activities",
+    "Real estate activities",
+    "Professional, scientific and technical activities",
+    "Administrative and support service activities",
+    "Education",
+    "Human health and social work activities",
+    "Arts, entertainment and recreation",
+    "Other service activities",
+]
+
+LEGAL_TYPES = {"LLC": 0.7, "Sole Proprietorship": 0.15, "Joint Stock Company": 0.1, "Partnership": 0.05}
+CITIES = {"الرياض": ("RUH", 0.4), "جدة": ("JED", 0.3), "الدمام": ("DMM", 0.15), "مكة المكرمة": ("MKH", 0.08), "المدينة المنورة": ("MED", 0.07)}
+PRODUCT_TYPES = {"Invoice Financing": 0.6, "Purchase Order Financing": 0.25, "Working Capital Financing": 0.15}
+SALES_BANDS = [(3e6, "0-3m"), (11e6, "3-11m"), (25e6, "11-25m"), (40e6, "25-40m"), (100e6, "40-100m"), (math.inf, "100m+")]
+EMPLOYEE_BANDS = "ABCDEFGHIJKLMNOPQRSTU"
+
+NAME_WORDS = ["الحلول", "المتقدمة", "الخليج", "النخبة", "الأفق", "الرواد", "المستقبل", "الشرق", "الوطنية", "البناء", "التقنية", "الإمداد", "الواحة", "السهم"]
+NAME_ACTIVITIES = ["للتجارة", "للمقاولات", "للخدمات", "للصناعة", "للتقنية", "للاستثمار", "للنقل", "للأغذية"]
+PERSON_NAMES = ["AHMED", "MOHAMMED", "OMAR", "KHALID", "FAHAD", "SARA", "NOURA", "ABDULLAH", "FAISAL", "HESSA"]
+FAMILY_NAMES = ["ALQAHTANI", "ALOTAIBI", "ALGHAMDI", "ALHARBI", "ALZAHRANI", "ALSHEHRI", "ALDOSARI", "ALBILADI"]
+
+# qawaem payload envelope around "data"
+QAWAEM_ENVELOPE = {"message": "Fetch All Statements for Agent", "status": "SUCCESS"}
+FILE_ENVELOPE = {"message": "Data fetched successfully", "status": "SUCCESS"}
+
+# Per-BR folders of a data set, by the key of the generated borrower they hold
+PER_BR_DIRS = {
+    "bms": "bms",
+    "simah_commercial": "simah-commerical",
+    "simah_consumer": "simah-consumer",
+    "credit_file": "credit-file-data",
+}
+
+
+def _weighted(rng: random.Random, choices: Dict[Any, float]) -> Any:
+    return rng.choices(list(choices), weights=list(choices.values()))[0]
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def _growth(current: float, previous: float) -> float:
+    """Change in % as in financialSpreading, 0 when there is no previous value."""
+    return round((current / previous - 1) * 100, 2) if previous else 0
+
+
+def _company_name(rng: random.Random) -> str:
+    return "شركة " + " ".join(rng.sample(NAME_WORDS, rng.randint(1, 2))) + " " + rng.choice(NAME_ACTIVITIES)
+
+
+def _fiscal_year(rng: random.Random, year: int, revenue: float, risk: float) -> Dict[str, float]:
+    """Draws the raw figures of one fiscal year."""
+    gross_margin = _clamp(rng.gauss(0.3, 0.12), 0.02, 0.85)
+    operating_margin = _clamp(rng.gauss(0.1 - 0.12 * risk, 0.08), -0.4, gross_margin - 0.01)
+    total_assets = revenue * rng.uniform(0.4, 1.6)
+    debt_ratio = _clamp(rng.gauss(0.45 + 0.35 * risk, 0.15), 0.05, 1.3)
+    liabilities = total_assets * debt_ratio
+    borrowings = liabilities * rng.uniform(0.2, 0.75)
+    finance_costs = borrowings * rng.uniform(0.05, 0.1)
+    operating_profit = revenue * operating_margin
+    depreciation = total_assets * rng.uniform(0.01, 0.05)
+    profit_before_zakat = operating_profit - finance_costs
+    zakat = max(profit_before_zakat, 0) * 0.025
+    receivables = revenue * _clamp(rng.gauss(0.22 + 0.15 * risk, 0.1), 0.01, 0.9)
+
+    return {
+        "year": year,
+        "revenue": revenue,
+        "grossProfit": revenue * gross_margin,
+        "operatingProfit": operating_profit,
+        "financeCosts": finance_costs,
+        "zakat": zakat,
+        "netProfit": profit_before_zakat - zakat,
+        "depreciation": depreciation,
+        "totalAssets": total_assets,
+        "currentAssets": total_assets * rng.uniform(0.4, 0.85),
+        "liabilities": liabilities,
+        "currentLiabilities": liabilities * rng.uniform(0.45, 0.9),
+        "borrowings": borrowings,
+        "simahFundedLoans": borrowings * rng.uniform(0.2, 1.0),
+        "receivables": receivables,
+        "inventories": revenue * rng.uniform(0, 0.2),
+        "cash": total_assets * rng.uniform(0.02, 0.15),
+        "workingCapitalChange": revenue * rng.gauss(-0.02, 0.06),
+        "debtRepayments": borrowings * rng.uniform(0.15, 0.5),
+    }
+
+
+def _financial_statement(figures: Dict[str, float], previous: Dict[str, float]) -> Dict[str, Any]:
+    """Builds one financialStatement entry (the sections and fields the agent reads, and their neighbours)."""
+    revenue = figures["revenue"]
+    equity = figures["totalAssets"] - figures["liabilities"]
+    net_profit = figures["netProfit"]
+    operating_cash_flow = net_profit + figures["depreciation"] + figures["workingCapitalChange"]
+    debt_service = figures["financeCosts"] + figures["debtRepayments"]
+    gpm = figures["grossProfit"] / revenue if revenue else 0
+    npm = net_profit / revenue if revenue else 0
+    previous_gpm = previous["grossProfit"] / previous["revenue"] if previous and previous["revenue"] else 0
+    previous_npm = previous["netProfit"] / previous["revenue"] if previous and previous["revenue"] else 0
+
+    def r(value: float, digits: int = 2) -> float:
+        return round(value, digits)
+
+    return {
+        "year": figures["year"],
+        "currentAssets": {
+            "cashAndBankBalance": round(figures["cash"]),
+            "tradeAndOtherReceivables": round(figures["receivables"]),
+            "inventories": round(figures["inventories"]),
+            "totalCurrentAssets": round(figures["currentAssets"]),
+        },
+        "nonCurrentAssets": {"totalNonCurrentAssets": round(figures["totalAssets"] - figures["currentAssets"])},
+        "totalAssets": round(figures["totalAssets"]),
+        "currentLiabilities": {
+            "debtSecuritiesTermLoansBorrowingsAndSukuks": round(figures["debtRepayments"]),
+            "totalCurrentLiabilities": round(figures["currentLiabilities"]),
+        },
+        "nonCurrentLiabilities": {
+            "nonCurrentLiabilities": round(figures["liabilities"] - figures["currentLiabilities"]),
+            "liabilities": round(figures["liabilities"]),
+        },
+        "equity": {"totalEquity": round(equity)},
+        "totalEquity": round(equity),
+        "profitAndLoss": {
+            "totalRevenue": round(revenue),
+            "costOfSales": round(revenue - figures["grossProfit"]),
+            "grossProfitLoss": round(figures["grossProfit"]),
+            "operatingProfitLoss": round(figures["operatingProfit"]),
+            "financeCosts": round(figures["financeCosts"]),
+            "zakatExpenseContinuingOperations": round(figures["zakat"]),
+            "netProfit": round(net_profit),
+            "ebit": round(figures["operatingProfit"]),
+            "gpm": r(gpm, 4),
+            "opm": r(figures["operatingProfit"] / revenue if revenue else 0, 4),
+            "npm": r(npm, 4),
+        },
+        "cashflow": {
+            "totalAdjustmentsForDepreciationAndAmortisationExpense": round(figures["depreciation"]),
+            "totalAdjustmentsForWorkingCapitalChanges": round(figures["workingCapitalChange"]),
+            "netCashFlowsFromUsedInOperatingActivities": round(operating_cash_flow),
+            "interestPaidClassifiedOperatingActivities": round(figures["financeCosts"]),
+        },
+        "ratios": {
+            "financialSpreading": {
+                "currentRatio": r(figures["currentAssets"] / figures["currentLiabilities"]) if figures["currentLiabilities"] else 0,
+                "cashFlowFromOperatingActivities": round(operating_cash_flow),
+                "receivablePercentageSales": r(figures["receivables"] / revenue, 3) if revenue else 0,
+                "workingCapitalNet": round(figures["currentAssets"] - figures["currentLiabilities"]),
+                "debtRatio": r(figures["liabilities"] / figures["totalAssets"], 4) if figures["totalAssets"] else 0,
+                "simahCommercialFundedLoans": r(figures["simahFundedLoans"] / 1000),
+                "externalDebtSalesRatio": r(figures["simahFundedLoans"] / revenue, 4) if revenue else 0,
+                "leverageRatio": r(figures["liabilities"] / equity, 4) if equity else 0,
+                "interestCoverage": r(figures["operatingProfit"] / figures["financeCosts"], 4) if figures["financeCosts"] else 0,
+                "gearingRatio": r(figures["borrowings"] / equity, 4) if equity else 0,
+                "debtService": round(debt_service),
+                "daysSalesOutstanding": r(figures["receivables"] / revenue * 365) if revenue else 0,
+                "grossProfitMargin": r(gpm * 100),
+                "operatingProfitMargin": r(figures["operatingProfit"] / revenue * 100) if revenue else 0,
+                "netProfitMargin": r(npm * 100),
+                "revenueGrowth": _growth(revenue, previous["revenue"]) if previous else 0,
+                "gpmGrowth": _growth(gpm, previous_gpm) if previous else 0,
+                "npmGrowth": _growth(npm, previous_npm) if previous else 0,
+                "dscr": r((figures["operatingProfit"] + figures["depreciation"]) / debt_service) if debt_service else 0,
+            }
+        },
+    }
+
+
+def _empty_statement(year: int) -> Dict[str, Any]:
+    """A fiscal year filed without figures."""
+    return {
+        "year": year,
+        "totalAssets": 0,
+        "totalEquity": 0,
+        "profitAndLoss": {"totalRevenue": 0, "operatingProfitLoss": 0, "netProfit": 0},
+        "cashflow": {"netCashFlowsFromUsedInOperatingActivities": 0},
+        "ratios": {"financialSpreading": {}},
+    }
+
+
+def _simah_rules(rng: random.Random, risk: float) -> List[Dict[str, Any]]:
+    rules = []
+    for name, bands, probability in SIMAH_PARAMETERS:
+        if rng.random() < MISSING_SIMAH_PARAMETER:
+            continue
+        value = 0
+        if rng.random() < probability * (0.4 + 1.2 * risk):
+            value = rng.randint(1, 8) if name == "Bounced Cheques" else rng.randint(1, 40)
+        if name == "Bounced Cheques":
+            flag = "RED" if value > 5 else "AMBER" if value > 0 else "GREEN"
+        else:
+            flag = "RED" if value > 0 else "GREEN"
+        rules.append({"parameterName": name, "parameterValue": str(value), "flag": flag, "rules": bands})
+    return rules
+
+
+def _amount_label(amount: float) -> str:
+    return f"{amount / 1e6:g}mn"
+
+
+def generate_borrower(index: int, seed: int = 0, base_organization_id: int = BASE_ORGANIZATION_ID) -> Dict[str, Any]:
+    """
+    Generates every source record of one borrower.
+
+    Returns:
+        dict: {"organizationId", "qawaem": qawaem company, "bms", "simah_commercial",
+        "simah_consumer", "credit_file": the per-BR file contents}
+    """
+    rng = random.Random(f"{seed}-{index}")
+    organization_id = base_organization_id + index
+    cr_number = str(1_010_000_000 + index)
+    cr_entity_number = str(7_000_000_000 + index)
+    name = _company_name(rng)
+
+    # Hidden credit quality: 0 strong .. 1 weak
+    risk = rng.betavariate(2, 3)
+
+    years = _weighted(rng, YEARS_OF_DATA)
+    revenue = max(rng.lognormvariate(math.log(REVENUE_MEDIAN), REVENUE_SIGMA), 300_000)
+    figures = []
+    for year in range(LATEST_YEAR, LATEST_YEAR - years, -1):
+        figures.append(_fiscal_year(rng, year, revenue, risk))
+        # Revenue of the year before, from this year's growth
+        revenue /= 1 + _clamp(rng.gauss(0.1 - 0.1 * risk, 0.25), -0.6, 2.0)
+
+    statements = [
+        _financial_statement(current, figures[i + 1] if i + 1 < len(figures) else None)
+        for i, current in enumerate(figures)
+    ]
+    if years > 1 and rng.random() < EMPTY_OLDEST_YEAR:
+        statements[-1] = _empty_statement(figures[-1]["year"])
+
+    commercial = _simah_rules(rng, risk)
+    consumer = _simah_rules(rng, risk)
+
+    qawaem = {
+        "qawaemRequestId": index + 1,
+        "organizationId": organization_id,
+        "companyName": name,
+        "commercialRegistrationNumber": cr_number,
+        "statementSummary": [
+            {
+                "year": statement["year"],
+                "qawaemRequestId": 0,
+                "statementSummary": {
+                    "revenue": statement["profitAndLoss"]["totalRevenue"],
+                    "netIncome": statement["profitAndLoss"]["netProfit"],
+                    "totalAssets": statement["totalAssets"],
+                    "totalLiabilities": statement["totalAssets"] - statement["totalEquity"],
+                },
+            }
+            for statement in statements
+        ],
+        "consumer": {"rules": consumer},
+        "commercial": {"rules": commercial},
+        "financialStatement": statements,
+    }
+
+    nitaqat_color = _weighted(rng, NITAQAT_COLORS)
+    cr_issue_date = f"{rng.randint(1985, LATEST_YEAR - 1)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    sectors = rng.sample(SECTORS, rng.randint(1, 4))
+    legal_type = _weighted(rng, LEGAL_TYPES)
+    city = rng.choices(list(CITIES), weights=[weight for _, weight in CITIES.values()])[0]
+    product_type = _weighted(rng, PRODUCT_TYPES)
+    financing_amount = rng.choice([0.5, 1, 1.5, 2, 3, 3.5, 5, 7.5, 10, 15]) * 1_000_000
+    latest = figures[0]
+    owners = [
+        {
+            "partyId": index * 10 + i,
+            "organizationId": organization_id,
+            "partyNameEnglish": f"{rng.choice(PERSON_NAMES)} {rng.choice(FAMILY_NAMES)}",
+            "partyType": "OWNER",
+            "identityId": str(rng.randint(1_000_000_000, 1_099_999_999)),
+            "sharesCount": 1,
+            "nationalityId": "SAU",
+        }
+        for i in range(rng.randint(1, 4))
+    ]
+
+    bms = dict(FILE_ENVELOPE, data={
+        "summaryDetails": {
+            "crNumber": cr_number,
+            "city": city,
+            "cityCode": CITIES[city][0],
+            "industryType": ",".join(sectors),
+        },
+        "userInput": {
+            "financingProgram": "Lendo SME Financing",
+            "companyOrTradingName": name,
+            "annualSales": next(label for limit, label in SALES_BANDS if latest["revenue"] < limit),
+            "productType": product_type,
+            "requiredFinancingAmount": financing_amount,
+        },
+        "smeLegalInformation": {
+            "companyArabicName": name,
+            "crNumber": cr_number,
+            "crStatus": "active",
+            "crEntityNumber": cr_entity_number,
+            "crIssueDateGregorian": cr_issue_date,
+            "legalType": legal_type,
+            "primarySectorDetails": {"primarySector": sectors[0], "industryId": str(SECTORS.index(sectors[0]) + 1)},
+        },
+        "financialInformation": {
+            "organizationId": organization_id,
+            "annualRevenue": round(latest["revenue"]),
+            "annualNetProfit": round(latest["netProfit"]),
+            "isAudited": True,
+        },
+        "otherInformation": {
+            "zakatCertType": "Certified" if rng.random() < 0.85 else "Certificate has expired",
+            "nitaqatColor": nitaqat_color,
+            "employeeBand": rng.choice(EMPLOYEE_BANDS),
+        },
+        "allParties": {"parties": owners},
+        "contactAddressInformation": {"organizationId": organization_id, "city": city, "cityCode": CITIES[city][0]},
+    })
+
+    credit_file = {
+        "BR": organization_id,
+        "userInput_productType": product_type,
+        "userInput_requiredFinancingAmount": _amount_label(financing_amount),
+        "smeLegalInformation_companyArabicName": name,
+        "smeLegalInformation_crNumber": cr_number,
+        "smeLegalInformation_crEntityNumber": cr_entity_number,
+        "smeLegalInformation_legalType": legal_type,
+        "smeLegalInformation_crIssueDateGregorian": cr_issue_date[:4],
+        "contactAddressInformation_city": city,
+        "summaryDetails_industryType": ",".join(sectors[:2]),
+        "otherInformation_nitaqatColor": nitaqat_color,
+        "conditions-covenant_securityDescription": "\n".join(
+            f"• Personal Order Note from {owner['partyNameEnglish']}\n  with the value of SAR {financing_amount / len(owners):,.0f}/-"
+            for owner in owners
+        ),
+        "conditions-covenant_conditionsCovenantDescription": (
+            "Precedent Conditions\n• RAM to be provided.\n\n"
+            "Conditions\n• A bank standing order must be provided for each loan disbursement.\n\n"
+            f"Internal Conditions\n• Max tenor is up to {rng.choice([60, 90, 120, 180])} days."
+        ),
+        "conditions-covenant_internalConditionsDescription": "",
+        "approved-buyer": [
+            {"buyerEnglishName": word[0] + "*" * rng.randint(2, 20) + word[-1], "averageCap": rng.choice([10.0, 25.0, 50.0, 100.0])}
+            for word in rng.sample(NAME_WORDS, rng.randint(0, 5))
+        ],
+    }
+
+    return {
+        "organizationId": organization_id,
+        "qawaem": qawaem,
+        "bms": bms,
+        "simah_commercial": dict(FILE_ENVELOPE, data=commercial),
+        "simah_consumer": dict(FILE_ENVELOPE, data=consumer),
+        "credit_file": credit_file,
+    }
+
+
+def iter_borrowers(count: int, seed: int = 0, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yields generated borrowers start .. start + count - 1, one at a time."""
+    for index in range(start, start + count):
+        yield generate_borrower(index, seed)
+
+
+def write_dataset(output_dir: str, count: int, seed: int = 0, progress_every: int = 0) -> str:
+    """
+    Writes a data set of `count` borrowers to `output_dir`, streaming one borrower at a time.
+
+    Returns:
+        str: The output directory.
+    """
+    for folder in PER_BR_DIRS.values():
+        os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+
+    # The payload is written to a temporary name first, so a reader never sees half a file
+    qawaem_path = os.path.join(output_dir, "qawaem_data.json")
+    with open(qawaem_path + ".tmp", "w", encoding="utf-8") as qawaem_file:
+        envelope = json.dumps(QAWAEM_ENVELOPE, ensure_ascii=False)[:-1]
+        qawaem_file.write(envelope + ', "data": [\n')
+
+        started = time.monotonic()
+        for i, borrower in enumerate(iter_borrowers(count, seed)):
+            qawaem_file.write(("," if i else "") + json.dumps(borrower["qawaem"], ensure_ascii=False) + "\n")
+            for key, folder in PER_BR_DIRS.items():
+                with open(os.path.join(output_dir, folder, f"BR{borrower['organizationId']}.json"), "w", encoding="utf-8") as f:
+                    json.dump(borrower[key], f, ensure_ascii=False)
+            if progress_every and (i + 1) % progress_every == 0:
+                print(f"{i + 1} borrowers ({time.monotonic() - started:.0f} s)", file=sys.stderr)
+
+        qawaem_file.write("]}\n")
+    os.replace(qawaem_path + ".tmp", qawaem_path)
+    return output_dir
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--borrowers", type=int, required=True)
+    parser.add_argument("--output", required=True, help="Data directory to write (created if missing)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--progress-every", type=int, default=10_000, help="Report progress every N borrowers (0: never)")
+    args = parser.parse_args()
+
+    write_dataset(args.output, args.borrowers, args.seed, args.progress_every)
+    print(f"Wrote {args.borrowers} borrowers to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
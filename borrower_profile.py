@@ -0,0 +1,133 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Iterable, Iterator, Tuple
+from .reference_data import get_reference_data
+
+# Threads loading the per-BR files; the loads are I/O bound, so more threads than cores pays off
+BORROWER_PROFILE_WORKERS = int(os.getenv("BORROWER_PROFILE_WORKERS", "16"))
+
+# Maximum borrowers whose files are being loaded at the same time while streaming companies
+BORROWER_PROFILE_WINDOW = int(os.getenv("BORROWER_PROFILE_WINDOW", "256"))
+
+# Per-BR files a profile is assembled from (kinds of reference_data.REFERENCE_DIRS)
+PROFILE_SOURCES = ["bms", "simah_commercial", "simah_consumer", "credit_file"]
+
+# bms block field -> paths into bms/BR*.json (the first one set wins), and the
+# key of the same value in credit-file-data/BR*.json, used when there is no bms file
+BMS_PROFILE_FIELDS = {
+    "nitaqatColor": ([("otherInformation", "nitaqatColor")], "otherInformation_nitaqatColor"),
+    "yearsInBusiness": ([("smeLegalInformation", "crIssueDateGregorian")], "smeLegalInformation_crIssueDateGregorian"),
+    "industry": (
+        [("smeLegalInformation", "primarySectorDetails", "primarySector"), ("summaryDetails", "industryType")],
+        "summaryDetails_industryType",
+    ),
+    "legalType": ([("smeLegalInformation", "legalType")], "smeLegalInformation_legalType"),
+    "city": ([("contactAddressInformation", "city"), ("summaryDetails", "city")], "contactAddressInformation_city"),
+}
+
+# SIMAH file kind -> bureau block of a qawaem company
+SIMAH_SOURCES = {"simah_commercial": "commercial", "simah_consumer": "consumer"}
+
+
+def _lookup(data: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _clean(value: Any) -> Any:
+    return value.strip() if isinstance(value, str) else value
+
+
+def build_profile(sources: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds a borrower profile from its parsed per-BR files.
+
+    Args:
+        sources: Parsed file per kind of PROFILE_SOURCES, None for a missing file.
+
+    Returns:
+        dict: {"bms": {field: value}} with the BMS_PROFILE_FIELDS found in the
+        files, plus {"rules": [...]} under "commercial" / "consumer" for every
+        SIMAH file present.
+    """
+    bms_data = (sources.get("bms") or {}).get("data") or {}
+    credit_file = sources.get("credit_file") or {}
+
+    bms = {}
+    for field, (paths, credit_file_key) in BMS_PROFILE_FIELDS.items():
+        value = next((_clean(v) for v in (_lookup(bms_data, path) for path in paths) if v not in (None, "")), None)
+        if value is None:
+            value = _clean(credit_file.get(credit_file_key)) or None
+        if value is not None:
+            bms[field] = value
+
+    profile = {"bms": bms}
+    for kind, bureau in SIMAH_SOURCES.items():
+        simah = sources.get(kind)
+        if simah and isinstance(simah.get("data"), list):
+            profile[bureau] = {"rules": simah["data"]}
+    return profile
+
+
+def merge_profile(company: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merges a profile into a projected qawaem company: profile bms fields
+    override the company's, and the SIMAH files replace the embedded rules.
+    """
+    company["bms"] = {**(company.get("bms") or {}), **profile["bms"]}
+    for bureau in SIMAH_SOURCES.values():
+        if bureau in profile:
+            company[bureau] = profile[bureau]
+    return company
+
+
+def _submit_loads(pool: ThreadPoolExecutor, br: Any) -> Dict[str, Future]:
+    reference_data = get_reference_data()
+    # Whole-portfolio loads only fill free cache slots, they don't evict the files in use
+    return {kind: pool.submit(reference_data.get_optional, kind, br, None, False) for kind in PROFILE_SOURCES}
+
+
+def _collect(futures: Dict[str, Future]) -> Dict[str, Any]:
+    return {kind: future.result() for kind, future in futures.items()}
+
+
+def assemble_profiles(brs: Iterable[Any], workers: int = BORROWER_PROFILE_WORKERS) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads the per-BR files of many borrowers concurrently and builds their profiles.
+
+    Returns:
+        dict: BR id (as a string) -> profile, see `build_profile`.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="borrower-profile") as pool:
+        loads = {str(br).strip(): _submit_loads(pool, br) for br in brs}
+        return {br: build_profile(_collect(futures)) for br, futures in loads.items()}
+
+
+def iter_profiled_companies(
+    companies: Iterable[Dict[str, Any]],
+    workers: int = BORROWER_PROFILE_WORKERS,
+    window: int = BORROWER_PROFILE_WINDOW,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields projected qawaem companies, in order, with their borrower profile merged in.
+
+    The files of up to `window` companies ahead are loaded on the thread pool
+    while the caller keeps parsing and flattening, so assembling thousands of
+    profiles is bound by I/O parallelism rather than by serial file reads.
+    """
+    pending: "deque[Tuple[Dict[str, Any], Dict[str, Future]]]" = deque()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="borrower-profile") as pool:
+        for company in companies:
+            pending.append((company, _submit_loads(pool, company.get("organizationId"))))
+            if len(pending) >= window:
+                company, futures = pending.popleft()
+                yield merge_profile(company, build_profile(_collect(futures)))
+
+        while pending:
+            company, futures = pending.popleft()
+            yield merge_profile(company, build_profile(_collect(futures)))
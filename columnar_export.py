@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+from typing import Dict, Any, List, Optional
+from .columnar_store import CompanyYearStore, QAWAEM_FIELDS
+from .simah_extraction import SIMAH_SLOTS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Version of the exported layout, bumped on incompatible changes
+EXPORT_FORMAT_VERSION = 1
+
+# Export formats: "npy" (one .npy per column, no extra dependency), "arrow" (Arrow IPC file) and
+# "parquet" (for external tools; compressed, so it is read by decoding rather than memory-mapped)
+EXPORT_FORMATS = ["npy", "arrow", "parquet"]
+
+# Row-aligned columns of an export, besides one float64 column per qawaem metric
+ID_COLUMNS = ["organization_id", "cr_number", "companyName"]
+FLAG_COLUMNS = [f"{field}_flag" for field in SIMAH_SLOTS]
+
+MANIFEST_FILE = "manifest.json"
+
+
+def export_columns(store: CompanyYearStore) -> Dict[str, np.ndarray]:
+    """
+    Returns the row-aligned columns exported for a store: ids as fixed-width
+    unicode, year and the qawaem metrics as float64 (NaN when missing),
+    is_latest, company_index and the SIMAH flag codes (int8, 0 is no flag).
+
+    Every column has a fixed-width dtype, so it can be memory-mapped.
+    """
+    columns = {
+        field: np.array([str(value) for value in store.column(field)], dtype=str) for field in ID_COLUMNS
+    }
+    columns["year"] = store.year
+    columns["is_latest"] = store.latest_year_mask()
+    columns["company_index"] = store.company_index
+    for field in QAWAEM_FIELDS:
+        columns[field] = store.qawaem[field]
+    for field in SIMAH_SLOTS:
+        columns[f"{field}_flag"] = store.simah_flags[field][store.company_index]
+    return columns
+
+
+def _write_npy(columns: Dict[str, np.ndarray], directory: str, manifest: Dict[str, Any]) -> None:
+    os.makedirs(directory)
+    for name, values in columns.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values), allow_pickle=False)
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def _arrow_table(columns: Dict[str, np.ndarray], manifest: Dict[str, Any]) -> Any:
+    if pa is None:
+        raise RuntimeError("The arrow and parquet formats need pyarrow (pip install pyarrow), use the npy format instead")
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    return table.replace_schema_metadata({"manifest": json.dumps(manifest, ensure_ascii=False)})
+
+
+def export_store(store: CompanyYearStore, path: str, export_format: str = "npy", source: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Exports the metrics of a store to a columnar file (arrow, parquet) or
+    directory (npy). It is written next to `path` and moved into place once
+    complete.
+
+    Args:
+        source: Fingerprint of the data it was exported from, kept in the manifest.
+
+    Returns:
+        dict: The manifest of the export.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}', use one of {', '.join(EXPORT_FORMATS)}")
+
+    columns = export_columns(store)
+    manifest = {
+        "version": EXPORT_FORMAT_VERSION,
+        "format": export_format,
+        "rows": len(store),
+        "companies": store.company_count,
+        "columns": {name: values.dtype.str for name, values in columns.items()},
+        "created_at": time.time(),
+        "source": source or [],
+    }
+
+    temporary_path = f"{path}.tmp"
+    if os.path.isdir(temporary_path):
+        shutil.rmtree(temporary_path)
+    elif os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    if export_format == "npy":
+        _write_npy(columns, temporary_path, manifest)
+    elif export_format == "arrow":
+        table = _arrow_table(columns, manifest)
+        with pa.OSFile(temporary_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(_arrow_table(columns, manifest), temporary_path)
+
+    # A directory can't replace another one atomically, the old export is removed first
+    if os.path.isdir(path) and export_format == "npy":
+        shutil.rmtree(path)
+    os.replace(temporary_path, path)
+    return manifest
+
+
+class MappedMetrics:
+    """
+    Borrower metrics read from an export: row-aligned column arrays that are
+    memory-mapped, so opening is independent of the portfolio size and worker
+    processes reading the same export share its pages.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], manifest: Dict[str, Any]):
+        self.columns = columns
+        self.manifest = manifest
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def latest_rows(self) -> np.ndarray:
+        """Returns the rows of the most recent year of every company."""
+        return np.flatnonzero(self.columns["is_latest"])
+
+    @classmethod
+    def open(cls, path: str) -> "MappedMetrics":
+        """
+        Opens an npy or arrow export. Columns are mapped, not read: pages are only
+        loaded when touched.
+
+        Raises:
+            ValueError: For a parquet file or an export of another format version.
+        """
+        if os.path.isdir(path):
+            with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+                manifest = json.load(f)
+            cls._check_version(manifest)
+            columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in manifest["columns"]}
+            return cls(columns, manifest)
+
+        if path.endswith(".parquet"):
+            raise ValueError("Parquet exports can't be memory-mapped, export with --format npy or arrow")
+        if pa is None:
+            raise RuntimeError("Reading arrow exports needs pyarrow (pip install pyarrow)")
+
+        # Arrow IPC files are read zero-copy from the mapping; fixed-width columns become numpy views
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        manifest = json.loads(table.schema.metadata[b"manifest"])
+        cls._check_version(manifest)
+        columns = {}
+        for name in manifest["columns"]:
+            column = table.column(name).combine_chunks()
+            if pa.types.is_string(column.type) or pa.types.is_large_string(column.type) or pa.types.is_boolean(column.type):
+                columns[name] = column.to_numpy(zero_copy_only=False)
+            else:
+                columns[name] = column.to_numpy(zero_copy_only=True)
+        return cls(columns, manifest)
+
+    @staticmethod
+    def _check_version(manifest: Dict[str, Any]) -> None:
+        if manifest.get("version") != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Export format version {manifest.get('version')} is not supported, export it again")
+
+
+def open_metrics(path: str) -> MappedMetrics:
+    """Opens a metrics export (see `MappedMetrics.open`)."""
+    return MappedMetrics.open(path)
+
+
+# Export the current data (run as `python -m <package>.columnar_export` from the parent folder)
+if __name__ == "__main__":
+    from .data_provider import build_snapshot
+
+    parser = argparse.ArgumentParser(description="Export the borrower metrics to a memory-mappable columnar file.")
+    parser.add_argument("--output", required=True, help="Export path: a directory for npy, a file for arrow/parquet")
+    parser.add_argument("--format", default="npy", choices=EXPORT_FORMATS, help="Export format (default: npy)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = build_snapshot()
+    manifest = export_store(snapshot.store, args.output, args.format, source=list(snapshot.fingerprint))
+    print(f"Exported {manifest['rows']} company-year rows of {manifest['companies']} companies "
+          f"to '{args.output}' in {time.perf_counter() - start:.1f} s.")
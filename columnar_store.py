@@ -0,0 +1,687 @@
+import sys
+import json
+import hashlib
+import numpy as np
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from .simah_extraction import SIMAH_FIELDS, FLAG_NAMES, SimahColumns, record_simah
+
+# qawaem metrics of a company-year, in the order of the flattened record
+QAWAEM_FIELDS = [
+    "netProfit",
+    "revenue",
+    "operatingProfit",
+    "cashFlowFromOperatingActivities",
+    "currentRatio",
+    "dscr",
+    "debtRatio",
+    "netProfitMargin",
+    "netProfitMarginGrowth",
+    "grossProfitMargin",
+    "grossProfitMarginGrowth",
+    "leverageRatio",
+    "gearingRatio",
+    "totalEquity",
+    "revenueGrowth",
+    "interestCoverage",
+    "externalDebtSales",
+    "receivablePercentageSales",
+    "daysSalesOutstanding",
+]
+
+# Metrics with year-over-year trend features: the change from the prior fiscal year and the growth in %
+TREND_FIELDS = [
+    "revenue",
+    "netProfit",
+    "operatingProfit",
+    "cashFlowFromOperatingActivities",
+    "totalEquity",
+    "netProfitMargin",
+    "grossProfitMargin",
+]
+
+# Amounts with a compound annual growth rate (in %) from the earliest to the latest fiscal year
+CAGR_FIELDS = ["revenue", "netProfit", "operatingProfit", "totalEquity"]
+
+# Decimals trend features are rounded to
+TREND_DECIMALS = 4
+
+# Fields of the "trends" block of a flattened record
+TREND_RECORD_FIELDS = (
+    ["years_available", "latest_year", "previous_year"]
+    + [f"{field}_yoy_change" for field in TREND_FIELDS]
+    + [f"{field}_yoy_growth" for field in TREND_FIELDS]
+    + [f"{field}_cagr" for field in CAGR_FIELDS]
+)
+
+
+def _to_float(value: Any) -> float:
+    """Converts a record value to float, mapping missing/invalid values to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def compute_trends(row_start: np.ndarray, company_index: np.ndarray, year: np.ndarray, qawaem: Dict[str, np.ndarray]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Computes the trend features of every company in one vectorized pass over
+    its company-years, whatever order its statements came in.
+
+    The prior fiscal year of a row is the company's row for year - 1 (none if
+    that year is missing); growth is the change relative to the prior value's
+    magnitude. A year whose qawaem metrics are all zero or missing is not
+    reported data: it has no prior year, is nobody's prior year, is not
+    counted in "year_count" and is neither the earliest nor the latest year
+    (unless the company has no reported year at all). Pointers are offsets
+    from the company's first row, so they survive `take_companies` /
+    `replace_companies` unchanged.
+
+    Returns:
+        tuple: (per company columns: "year_count", "latest_offset" (-1 without
+        a known year), "cagr" per CAGR_FIELDS; per row columns:
+        "previous_offset" (-1 without a prior year), "is_latest", and
+        "yoy_change" / "yoy_growth" per TREND_FIELDS)
+    """
+    company_count, rows = len(row_start), len(year)
+    known = ~np.isnan(year)
+    # A year whose qawaem metrics are all zero or missing is a placeholder, not reported data
+    has_data = np.zeros(rows, dtype=bool)
+    for values in qawaem.values():
+        has_data |= ~np.isnan(values) & (values != 0)
+    reported = known & has_data
+
+    def sort_years(usable: np.ndarray) -> Tuple[np.ndarray, ...]:
+        # Rows sorted by company, then year; unusable rows come first, so they never precede a usable year
+        order = np.lexsort((np.where(usable, year, -np.inf), company_index))
+        sorted_company, sorted_year, sorted_usable = company_index[order], year[order], usable[order]
+        follows = np.zeros(rows, dtype=bool)
+        follows[1:] = (sorted_company[1:] == sorted_company[:-1]) & sorted_usable[:-1]
+        preceding_year = np.full(rows, np.nan)
+        preceding_year[1:] = sorted_year[:-1]
+        return order, sorted_company, sorted_year, sorted_usable, follows, preceding_year
+
+    # Prior years and the year count only look at reported years
+    order, sorted_company, sorted_year, sorted_reported, follows, preceding_year = sort_years(reported)
+    follows_prior_year = follows & sorted_reported & (sorted_year - preceding_year == 1)
+    previous = np.full(rows, -1, dtype=np.int64)
+    previous[order[follows_prior_year]] = order[np.flatnonzero(follows_prior_year) - 1]
+    distinct_year = sorted_reported & ~(follows & (sorted_year == preceding_year))
+    year_count = np.bincount(sorted_company[distinct_year], minlength=company_count)
+
+    # The earliest and latest years are reported years; a company without any falls back to its known years
+    has_reported = np.bincount(company_index[reported], minlength=company_count) > 0
+    usable = reported | (known & ~has_reported[company_index])
+    order, sorted_company, _, sorted_usable, follows, _ = sort_years(usable)
+    first_usable = sorted_usable & ~follows
+    last_of_company = np.ones(rows, dtype=bool)
+    last_of_company[:-1] = sorted_company[1:] != sorted_company[:-1]
+    last_usable = last_of_company & sorted_usable
+
+    first = np.full(company_count, -1, dtype=np.int64)
+    first[sorted_company[first_usable]] = order[first_usable]
+    latest = np.full(company_count, -1, dtype=np.int64)
+    latest[sorted_company[last_usable]] = order[last_usable]
+
+    has_latest = latest >= 0
+    latest_year = np.where(has_latest, year[np.maximum(latest, 0)], np.nan)
+    span = latest_year - np.where(first >= 0, year[np.maximum(first, 0)], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoy_change, yoy_growth = {}, {}
+        has_previous = previous >= 0
+        for field in TREND_FIELDS:
+            values = qawaem[field]
+            prior = np.where(has_previous, values[np.maximum(previous, 0)], np.nan)
+            change = values - prior
+            yoy_change[field] = np.round(change, TREND_DECIMALS)
+            yoy_growth[field] = np.round(np.where(prior != 0, change / np.abs(prior) * 100, np.nan), TREND_DECIMALS)
+
+        cagr = {}
+        for field in CAGR_FIELDS:
+            values = qawaem[field]
+            start = np.where(first >= 0, values[np.maximum(first, 0)], np.nan)
+            end = np.where(has_latest, values[np.maximum(latest, 0)], np.nan)
+            valid = (span > 0) & (start > 0) & (end > 0)
+            cagr[field] = np.round(np.where(valid, ((end / start) ** (1 / span) - 1) * 100, np.nan), TREND_DECIMALS)
+
+    return (
+        {
+            "year_count": year_count.astype(np.int32),
+            "latest_offset": np.where(has_latest, latest - row_start, -1).astype(np.int32),
+            "cagr": cagr,
+        },
+        {
+            "previous_offset": np.where(has_previous, previous - row_start[company_index], -1).astype(np.int32),
+            "is_latest": usable & (year == latest_year[company_index]),
+            "yoy_change": yoy_change,
+            "yoy_growth": yoy_growth,
+        },
+    )
+
+
+# splitmix64 constants, used to mix the bits of the numeric columns into row hashes
+_MIX_SHIFTS = (np.uint64(30), np.uint64(27), np.uint64(31))
+_MIX_MULTIPLIERS = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+_MIX_INCREMENT = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer of a uint64 array (wraps around on overflow)."""
+    values = values ^ (values >> _MIX_SHIFTS[0])
+    values = values * _MIX_MULTIPLIERS[0]
+    values = values ^ (values >> _MIX_SHIFTS[1])
+    values = values * _MIX_MULTIPLIERS[1]
+    return values ^ (values >> _MIX_SHIFTS[2])
+
+
+def _float_bits(values: np.ndarray) -> np.ndarray:
+    """Bit patterns of a float64 array, with a single NaN and 0.0 for -0.0."""
+    return (np.where(np.isnan(values), np.nan, values) + 0.0).view(np.uint64)
+
+
+def identity_hash(first: Dict[str, Any], simah_values: List[Any], simah_codes: List[int]) -> bytes:
+    """Stable 64-bit hash of the company-level fields of a company's records (ids, name, SIMAH, bms)."""
+    payload = json.dumps(
+        [first.get("organization_id"), first.get("companyName"), first.get("cr_number"),
+         simah_values, simah_codes, first.get("bms", {})],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+
+
+def compute_digests(row_start: np.ndarray, row_stop: np.ndarray, company_index: np.ndarray, year: np.ndarray,
+                    qawaem: Dict[str, np.ndarray], identity: np.ndarray) -> np.ndarray:
+    """
+    Computes a content digest of every company: the hash of its company-level
+    fields (`identity`, one uint64 per company) and a hash of its rows' year and
+    qawaem metrics, mixed column by column in one vectorized pass and summed
+    per company with each row's offset, so reordering years changes it too.
+
+    Returns:
+        np.ndarray: (companies, 2) uint64, see `CompanyYearStore.company_digest`.
+    """
+    hashes = _mix64(_float_bits(year))
+    for field in QAWAEM_FIELDS:
+        hashes = _mix64(hashes * _MIX_MULTIPLIERS[0] + _float_bits(qawaem[field]))
+    offsets = (np.arange(len(year)) - row_start[company_index]).astype(np.uint64)
+    hashes = _mix64(hashes ^ _mix64((offsets + np.uint64(1)) * _MIX_INCREMENT))
+
+    counts = (row_stop - row_start).astype(np.uint64)
+    rows_hash = np.add.reduceat(hashes, row_start) if len(year) else np.zeros(0, dtype=np.uint64)
+    return np.stack([identity, _mix64(rows_hash ^ _mix64(counts))], axis=1)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _to_json_number(value: float) -> Any:
+    """Converts a stored float back to the JSON number it was read from."""
+    if np.isnan(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class CompanyYearRow:
+    """
+    Read-only view of one company-year of a `CompanyYearStore`.
+
+    Metrics are read straight from the store's columns, e.g. `row.dscr`,
+    `row.companyName` or `row["dpd_commercial_flag"]`.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "CompanyYearStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __getattr__(self, field: str) -> Any:
+        try:
+            return self._store.value(self._row, field)
+        except KeyError:
+            raise AttributeError(field) from None
+
+    def __getitem__(self, field: str) -> Any:
+        return self._store.value(self._row, field)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the company-year as a flattened record dict."""
+        return self._store.to_record(self._row)
+
+    def __repr__(self) -> str:
+        return f"CompanyYearRow(organization_id={self.organization_id!r}, year={self.year!r})"
+
+
+class CompanyYearStore:
+    """
+    Compact columnar store of flattened company-year records.
+
+    Per company-year (row) it keeps one typed array per metric: float64 for the
+    qawaem metrics and the fiscal year, and the row's company position.
+    Per company it keeps the interned name / CR / organization id, the SIMAH
+    values and int8 flag codes, and one shared `bms` block, instead of
+    repeating them in every year's record.
+
+    Trend features (see `compute_trends`) and every company's content digest
+    (see `compute_digests`) are computed once when the store is built from
+    records, and carried along when companies are taken or replaced.
+    """
+
+    def __init__(self, companies: Dict[str, Any], rows: Dict[str, np.ndarray]):
+        # Per company columns, indexed by company position
+        self.organization_id = companies["organization_id"]
+        self.company_name = companies["company_name"]
+        self.cr_number = companies["cr_number"]
+        self.simah_values = companies["simah_values"]
+        self.simah_flags = companies["simah_flags"]
+        self.bms = companies["bms"]
+        self.row_start = companies["row_start"]
+        self.row_stop = companies["row_stop"]
+        self.year_count = companies["year_count"]
+        self.latest_offset = companies["latest_offset"]
+        self.cagr = companies["cagr"]
+        self.digest = companies["digest"]
+
+        # Per company-year columns, indexed by row
+        self.company_index = rows["company_index"]
+        self.year = rows["year"]
+        self.qawaem = rows["qawaem"]
+        self.previous_offset = rows["previous_offset"]
+        self.is_latest = rows["is_latest"]
+        self.yoy_change = rows["yoy_change"]
+        self.yoy_growth = rows["yoy_growth"]
+
+        # Per company bms columns, built on first use
+        self._bms_columns = {}
+
+    @classmethod
+    def from_companies(cls, companies_records: Iterable[List[Dict[str, Any]]]) -> "CompanyYearStore":
+        """
+        Builds a store from flattened records grouped per company, as returned
+        by `flatten_company` for each company.
+        """
+        organization_ids, company_names, cr_numbers, bms_blocks, identities = [], [], [], [], []
+        simah = SimahColumns()
+        row_start, row_stop = [], []
+        company_index, years = [], []
+        qawaem = {field: [] for field in QAWAEM_FIELDS}
+
+        for company_records in companies_records:
+            if not company_records:
+                continue
+
+            first = company_records[0]
+            position = len(organization_ids)
+            organization_ids.append(_intern(first.get("organization_id")))
+            company_names.append(_intern(first.get("companyName")))
+            cr_numbers.append(_intern(first.get("cr_number")))
+            bms_blocks.append(first.get("bms", {}))
+
+            values, codes = record_simah(first)
+            simah.append([_intern(value) for value in values], codes)
+            identities.append(identity_hash(first, values, codes))
+
+            row_start.append(len(years))
+            for record in company_records:
+                company_index.append(position)
+                years.append(_to_float(record.get("year")))
+                record_qawaem = record.get("qawaem", {})
+                for field in QAWAEM_FIELDS:
+                    qawaem[field].append(_to_float(record_qawaem.get(field)))
+            row_stop.append(len(years))
+
+        simah_values, simah_flags = simah.arrays()
+        companies = {
+            "organization_id": np.array(organization_ids, dtype=object),
+            "company_name": np.array(company_names, dtype=object),
+            "cr_number": np.array(cr_numbers, dtype=object),
+            "simah_values": simah_values,
+            "simah_flags": simah_flags,
+            "bms": bms_blocks,
+            "row_start": np.array(row_start, dtype=np.int64),
+            "row_stop": np.array(row_stop, dtype=np.int64),
+        }
+        rows = {
+            "company_index": np.array(company_index, dtype=np.int32),
+            "year": np.array(years, dtype=np.float64),
+            "qawaem": {field: np.array(values, dtype=np.float64) for field, values in qawaem.items()},
+        }
+        company_trends, row_trends = compute_trends(companies["row_start"], rows["company_index"], rows["year"], rows["qawaem"])
+        companies.update(company_trends)
+        rows.update(row_trends)
+        companies["digest"] = compute_digests(
+            companies["row_start"], companies["row_stop"], rows["company_index"], rows["year"], rows["qawaem"],
+            np.frombuffer(b"".join(identities), dtype=np.uint64),
+        )
+        return cls(companies, rows)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "CompanyYearStore":
+        """Builds a store from a flat list of records, grouping consecutive records of the same company."""
+        groups = []
+        for record in records:
+            if groups and groups[-1][0].get("organization_id") == record.get("organization_id"):
+                groups[-1].append(record)
+            else:
+                groups.append([record])
+        return cls.from_companies(groups)
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    @property
+    def company_count(self) -> int:
+        return len(self.organization_id)
+
+    def company_rows(self, company: int) -> np.ndarray:
+        """Returns the row indexes of the company at the given position."""
+        return np.arange(self.row_start[company], self.row_stop[company])
+
+    def company_digest(self, company: int) -> str:
+        """Returns the content digest of the company at a store position (computed at load, see `compute_digests`)."""
+        return self.digest[company].tobytes().hex()
+
+    def take_companies(self, companies: List[int]) -> "CompanyYearStore":
+        """Returns a new store with only the given company positions (and all their years)."""
+        companies = np.asarray(companies, dtype=np.int64)
+        rows = np.concatenate([self.company_rows(c) for c in companies]) if len(companies) else np.zeros(0, dtype=np.int64)
+        counts = self.row_stop[companies] - self.row_start[companies]
+        row_stop = np.cumsum(counts)
+
+        return CompanyYearStore(
+            {
+                "organization_id": self.organization_id[companies],
+                "company_name": self.company_name[companies],
+                "cr_number": self.cr_number[companies],
+                "simah_values": {field: values[companies] for field, values in self.simah_values.items()},
+                "simah_flags": {field: codes[companies] for field, codes in self.simah_flags.items()},
+                "bms": [self.bms[c] for c in companies],
+                "row_start": row_stop - counts,
+                "row_stop": row_stop,
+                "year_count": self.year_count[companies],
+                "latest_offset": self.latest_offset[companies],
+                "cagr": {field: values[companies] for field, values in self.cagr.items()},
+                "digest": self.digest[companies],
+            },
+            {
+                "company_index": np.repeat(np.arange(len(companies), dtype=np.int32), counts),
+                "year": self.year[rows],
+                "qawaem": {field: values[rows] for field, values in self.qawaem.items()},
+                "previous_offset": self.previous_offset[rows],
+                "is_latest": self.is_latest[rows],
+                "yoy_change": {field: values[rows] for field, values in self.yoy_change.items()},
+                "yoy_growth": {field: values[rows] for field, values in self.yoy_growth.items()},
+            },
+        )
+
+    def replace_companies(self, replacements: List[Tuple[Optional[int], "CompanyYearStore"]]) -> "CompanyYearStore":
+        """
+        Returns a new store with companies replaced or added: each replacement is
+        (position, store of that single company), with position None to append.
+
+        Every other company keeps its position, so position-based indexes stay
+        valid; only the row offsets of the companies after a replaced one shift.
+        Columns are spliced with one array copy each, no record is re-flattened.
+        """
+        replaced = sorted((company, store) for company, store in replacements if company is not None)
+        appended = [store for company, store in replacements if company is None]
+        stores = [store for _, store in replaced] + appended
+
+        # (start, stop) of the company positions and rows each replacement takes the place of
+        company_cuts = [(company, company + 1) for company, _ in replaced] + [(self.company_count, self.company_count)] * len(appended)
+        row_cuts = [(int(self.row_start[company]), int(self.row_stop[company])) for company, _ in replaced]
+        row_cuts += [(len(self), len(self))] * len(appended)
+        positions = [company for company, _ in replaced] + list(range(self.company_count, self.company_count + len(appended)))
+
+        def splice(values: Any, cuts: List[Tuple[int, int]], news: List[Any]) -> Any:
+            pieces, previous = [], 0
+            for (start, stop), new in zip(cuts, news):
+                pieces += [values[previous:start], new]
+                previous = stop
+            pieces.append(values[previous:])
+            if isinstance(values, list):
+                return [item for piece in pieces for item in piece]
+            return np.concatenate(pieces)
+
+        def companies(values: Any, news: List[Any]) -> Any:
+            return splice(values, company_cuts, news)
+
+        def rows(values: np.ndarray, news: List[np.ndarray]) -> np.ndarray:
+            return splice(values, row_cuts, news)
+
+        counts = companies(self.row_stop - self.row_start, [store.row_stop - store.row_start for store in stores])
+        row_stop = np.cumsum(counts)
+
+        return CompanyYearStore(
+            {
+                "organization_id": companies(self.organization_id, [store.organization_id for store in stores]),
+                "company_name": companies(self.company_name, [store.company_name for store in stores]),
+                "cr_number": companies(self.cr_number, [store.cr_number for store in stores]),
+                "simah_values": {
+                    field: companies(values, [store.simah_values[field] for store in stores])
+                    for field, values in self.simah_values.items()
+                },
+                "simah_flags": {
+                    field: companies(codes, [store.simah_flags[field] for store in stores])
+                    for field, codes in self.simah_flags.items()
+                },
+                "bms": companies(self.bms, [store.bms for store in stores]),
+                "row_start": row_stop - counts,
+                "row_stop": row_stop,
+                "year_count": companies(self.year_count, [store.year_count for store in stores]),
+                "latest_offset": companies(self.latest_offset, [store.latest_offset for store in stores]),
+                "cagr": {field: companies(values, [store.cagr[field] for store in stores]) for field, values in self.cagr.items()},
+                "digest": companies(self.digest, [store.digest for store in stores]),
+            },
+            {
+                "company_index": rows(
+                    self.company_index,
+                    [np.full(len(store), position, dtype=np.int32) for position, store in zip(positions, stores)]
+                ),
+                "year": rows(self.year, [store.year for store in stores]),
+                "qawaem": {
+                    field: rows(values, [store.qawaem[field] for store in stores]) for field, values in self.qawaem.items()
+                },
+                "previous_offset": rows(self.previous_offset, [store.previous_offset for store in stores]),
+                "is_latest": rows(self.is_latest, [store.is_latest for store in stores]),
+                "yoy_change": {
+                    field: rows(values, [store.yoy_change[field] for store in stores]) for field, values in self.yoy_change.items()
+                },
+                "yoy_growth": {
+                    field: rows(values, [store.yoy_growth[field] for store in stores]) for field, values in self.yoy_growth.items()
+                },
+            },
+        )
+
+    def group_by_company(self, rows: np.ndarray, results: List[Any]) -> List[List[Any]]:
+        """Groups per-row results into one list per company position (empty for a company without results)."""
+        grouped = [[] for _ in range(self.company_count)]
+        for row, result in zip(rows, results):
+            grouped[self.company_index[row]].append(result)
+        return grouped
+
+    def latest_year_mask(self) -> np.ndarray:
+        """Returns a boolean mask selecting the most recent year of every company (computed at load)."""
+        return self.is_latest
+
+    def latest_year_rows(self) -> np.ndarray:
+        """Returns the row of the most recent year of every company, -1 for a company without a known year."""
+        return np.where(self.latest_offset >= 0, self.row_start + self.latest_offset, -1)
+
+    # --- Trend features ---
+
+    def trend_column(self, field: str) -> np.ndarray:
+        """
+        Returns a row-aligned float column of a TREND_RECORD_FIELDS feature
+        (NaN where it can't be computed).
+
+        Raises:
+            KeyError: If `field` is not a trend feature.
+        """
+        if field == "years_available":
+            return self.year_count[self.company_index].astype(np.float64)
+        if field == "latest_year":
+            latest = self.latest_year_rows()
+            return np.where(latest >= 0, self.year[np.maximum(latest, 0)], np.nan)[self.company_index]
+        if field == "previous_year":
+            return np.where(self.previous_offset >= 0, self.year - 1, np.nan)
+        for suffix, columns in (("_yoy_change", self.yoy_change), ("_yoy_growth", self.yoy_growth)):
+            if field.endswith(suffix) and field[:-len(suffix)] in columns:
+                return columns[field[:-len(suffix)]]
+        if field.endswith("_cagr") and field[:-len("_cagr")] in self.cagr:
+            return self.cagr[field[:-len("_cagr")]][self.company_index]
+        raise KeyError(field)
+
+    def trend_record(self, row: int) -> Dict[str, Any]:
+        """Returns the "trends" block of a row's flattened record."""
+        company = self.company_index[row]
+        latest = self.latest_offset[company]
+        trends = {
+            "years_available": int(self.year_count[company]),
+            "latest_year": _to_json_number(self.year[self.row_start[company] + latest]) if latest >= 0 else None,
+            "previous_year": _to_json_number(self.year[row] - 1) if self.previous_offset[row] >= 0 else None,
+        }
+        for field in TREND_FIELDS:
+            trends[f"{field}_yoy_change"] = _to_json_number(self.yoy_change[field][row])
+        for field in TREND_FIELDS:
+            trends[f"{field}_yoy_growth"] = _to_json_number(self.yoy_growth[field][row])
+        for field in CAGR_FIELDS:
+            trends[f"{field}_cagr"] = _to_json_number(self.cagr[field][company])
+        return trends
+
+    # --- Column access (row aligned) ---
+
+    def flag_is(self, field: str, flag: str) -> np.ndarray:
+        """Returns a row-aligned boolean column: True where the SIMAH flag of `field` equals `flag`."""
+        return (self.simah_flags[field] == FLAG_NAMES.index(flag))[self.company_index]
+
+    def bms_company_column(self, field: str) -> np.ndarray:
+        """Returns a per company object column of a bms field (cached)."""
+        column = self._bms_columns.get(field)
+        if column is None:
+            column = np.array([bms.get(field) for bms in self.bms], dtype=object)
+            self._bms_columns[field] = column
+        return column
+
+    def bms_column(self, field: str) -> np.ndarray:
+        """Returns a row-aligned object column of a bms field."""
+        return self.bms_company_column(field)[self.company_index]
+
+    def column(self, field: str) -> np.ndarray:
+        """Returns a row-aligned column by name (qawaem metric, SIMAH value/flag or company field)."""
+        if field in self.qawaem:
+            return self.qawaem[field]
+        if field == "year":
+            return self.year
+        if field in ("organization_id", "companyName", "cr_number"):
+            return self._company_column(field)[self.company_index]
+        if field in TREND_RECORD_FIELDS:
+            return self.trend_column(field)
+        if field.endswith("_flag") and field[:-len("_flag")] in self.simah_flags:
+            codes = self.simah_flags[field[:-len("_flag")]][self.company_index]
+            return np.array(FLAG_NAMES, dtype=object)[codes]
+        if field in self.simah_values:
+            return self.simah_values[field][self.company_index]
+        return self.bms_column(field)
+
+    def _company_column(self, field: str) -> np.ndarray:
+        return {
+            "organization_id": self.organization_id,
+            "companyName": self.company_name,
+            "cr_number": self.cr_number,
+        }[field]
+
+    # --- Row access ---
+
+    def value(self, row: int, field: str) -> Any:
+        """Returns one field of one row, decoded to its record value."""
+        company = self.company_index[row]
+        if field in self.qawaem:
+            return _to_json_number(self.qawaem[field][row])
+        if field == "year":
+            return _to_json_number(self.year[row])
+        if field in ("organization_id", "companyName", "cr_number"):
+            return self._company_column(field)[company]
+        if field in TREND_RECORD_FIELDS:
+            return self.trend_record(row)[field]
+        if field.endswith("_flag") and field[:-len("_flag")] in self.simah_flags:
+            return FLAG_NAMES[self.simah_flags[field[:-len("_flag")]][company]]
+        if field in self.simah_values:
+            return self.simah_values[field][company]
+        if field in self.bms[company]:
+            return self.bms[company][field]
+        raise KeyError(field)
+
+    def row(self, row: int) -> CompanyYearRow:
+        return CompanyYearRow(self, row)
+
+    def rows(self) -> Iterable[CompanyYearRow]:
+        for row in range(len(self)):
+            yield CompanyYearRow(self, row)
+
+    def to_record(self, row: int) -> Dict[str, Any]:
+        """Materializes one row as a flattened record dict (the `Lendo_Credit_Decision_Engine` shape)."""
+        company = self.company_index[row]
+        record = {
+            "companyName": self.company_name[company],
+            "cr_number": self.cr_number[company],
+            "organization_id": self.organization_id[company],
+            "year": _to_json_number(self.year[row]),
+            "qawaem": {field: _to_json_number(self.qawaem[field][row]) for field in QAWAEM_FIELDS},
+        }
+        for bureau, fields in SIMAH_FIELDS.items():
+            block = {}
+            for field in fields:
+                block[field] = self.simah_values[field][company]
+                block[f"{field}_flag"] = FLAG_NAMES[self.simah_flags[field][company]]
+            record[bureau] = block
+        record["bms"] = dict(self.bms[company])
+        record["trends"] = self.trend_record(row)
+        return record
+
+    def to_records(self, rows: Optional[Iterable[int]] = None, selection: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Materializes the given rows (default: all) as flattened record dicts.
+
+        Args:
+            selection: Only materialize these fields per record block (e.g.
+                {"qawaem": ["dscr"], "bms": ["industry"]}), plus the identity
+                fields; blocks without fields are left out. None materializes everything.
+        """
+        if rows is None:
+            rows = range(len(self))
+        if selection is None:
+            return [self.to_record(row) for row in rows]
+
+        rows = np.asarray(rows, dtype=np.int64)
+        records = [
+            {"companyName": company_name, "organization_id": organization_id, "cr_number": cr_number, "year": year}
+            for company_name, organization_id, cr_number, year in zip(
+                self.company_name[self.company_index[rows]],
+                self.organization_id[self.company_index[rows]],
+                self.cr_number[self.company_index[rows]],
+                map(_to_json_number, self.year[rows]),
+            )
+        ]
+        for block, fields in selection.items():
+            if not fields:
+                continue
+            columns = {field: self._block_column(block, field)[rows] for field in dict.fromkeys(fields)}
+            for field, column in columns.items():
+                if column.dtype != object:
+                    columns[field] = list(map(_to_json_number, column))
+            for position, record in enumerate(records):
+                record[block] = {field: column[position] for field, column in columns.items()}
+        return records
+
+    def _block_column(self, block: str, field: str) -> np.ndarray:
+        """Returns a row-aligned column of a field of a flattened record block."""
+        if block == "qawaem":
+            return self.qawaem[field]
+        if block == "trends":
+            return self.trend_column(field)
+        if block == "bms":
+            return self.bms_column(field)
+        return self.column(field)
@@ -0,0 +1,342 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from .qawaem_loader import iter_qawaem_companies, flatten_company
+from .tracing import span, annotate, StageTimer
+
+if TYPE_CHECKING:
+    # numpy is only imported once data is loaded, to keep agent import fast
+    from .columnar_store import CompanyYearStore
+
+logger = logging.getLogger(__name__)
+
+# Location of your AllCompanies.json file and the per-BR source data
+# (set CREDIT_DATA_DIR to serve another data set, e.g. generated load test data)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("CREDIT_DATA_DIR", current_dir)
+QAWAEM_FILE_PATH = os.path.join(DATA_DIR, "qawaem_data.json")
+BMS_DIR = os.path.join(DATA_DIR, "bms")
+SIMAH_COMMERCIAL_DIR = os.path.join(DATA_DIR, "simah-commerical")
+SIMAH_CONSUMER_DIR = os.path.join(DATA_DIR, "simah-consumer")
+CREDIT_FILE_DATA_DIR = os.path.join(DATA_DIR, "credit-file-data")
+
+# Append-only log of upserted fiscal years (see incremental_ingest.py), applied on top of qawaem_data.json.
+# Appends are applied to the loaded snapshot company by company, so it isn't one of the SOURCE_PATHS.
+QAWAEM_DELTAS_PATH = os.getenv("QAWAEM_DELTAS_PATH", os.path.join(DATA_DIR, "qawaem_deltas.jsonl"))
+
+# Every source a snapshot is derived from; a change to any of them triggers a reload
+SOURCE_PATHS = [QAWAEM_FILE_PATH, BMS_DIR, SIMAH_COMMERCIAL_DIR, SIMAH_CONSUMER_DIR, CREDIT_FILE_DATA_DIR]
+
+# Parse qawaem_data.json one company at a time (set QAWAEM_STREAMING=0 to json.load the whole file)
+QAWAEM_STREAMING = os.getenv("QAWAEM_STREAMING", "1") != "0"
+
+# Minimum seconds between two checks of the sources for changes (0 checks on every access)
+DATA_RELOAD_CHECK_INTERVAL = float(os.getenv("DATA_RELOAD_CHECK_INTERVAL", "5"))
+
+# Detect changes by content hash instead of mtime/size (slower, but immune to copies preserving mtime)
+DATA_RELOAD_USE_HASH = os.getenv("DATA_RELOAD_USE_HASH", "0") == "1"
+
+
+class DataSnapshot:
+    """
+    Flattened company-year records of every company, held in a columnar store
+    and indexed by organization id and CR number so a single-company lookup
+    doesn't walk the whole portfolio.
+    """
+
+    def __init__(self, store: "CompanyYearStore", fingerprint: Tuple = (), deltas_offset: int = 0):
+        self.store = store
+        self.company_by_organization_id = {str(org_id): i for i, org_id in enumerate(store.organization_id)}
+        self.company_by_cr_number = {str(cr_number): i for i, cr_number in enumerate(store.cr_number)}
+        self.fingerprint = fingerprint
+        # Bytes of the deltas file (see incremental_ingest.py) applied to this snapshot
+        self.deltas_offset = deltas_offset
+        self.loaded_at = time.time()
+
+    def company_position(self, organization_id: Optional[Any] = None, cr_number: Optional[Any] = None) -> Optional[int]:
+        """
+        Returns the store position of a company by organization id and/or CR
+        number, or None if unknown. When both are given they must identify the
+        same company, otherwise None is returned too.
+        """
+        by_organization_id = by_cr_number = None
+        if organization_id is not None:
+            by_organization_id = self.company_by_organization_id.get(str(organization_id).strip())
+            if by_organization_id is None or cr_number is None:
+                return by_organization_id
+        by_cr_number = self.company_by_cr_number.get(str(cr_number).strip())
+        if organization_id is not None and by_cr_number != by_organization_id:
+            return None
+        return by_cr_number
+
+    def all_records(self) -> List[Dict[str, Any]]:
+        """Returns the records of every company."""
+        return self.store.to_records()
+
+    def company_records(self, organization_id: Optional[Any] = None, cr_number: Optional[Any] = None) -> Optional[List[Dict[str, Any]]]:
+        """Returns the records of one company by organization id or CR number, or None if unknown."""
+        company = self.company_position(organization_id, cr_number)
+        if company is None:
+            return None
+        return self.store.to_records(self.store.company_rows(company))
+
+    def company_store(self, organization_id: Optional[Any] = None, cr_number: Optional[Any] = None) -> Optional["CompanyYearStore"]:
+        """Returns a store with only one company's records, or None if unknown."""
+        company = self.company_position(organization_id, cr_number)
+        if company is None:
+            return None
+        return self.store.take_companies([company])
+
+    def with_companies(self, companies_records: List[List[Dict[str, Any]]]) -> "DataSnapshot":
+        """
+        Returns a new snapshot in which the given companies' records are replaced
+        (or added, for unknown organization ids), one records list per company.
+        The indexes of every other company are carried over.
+        """
+        from .columnar_store import CompanyYearStore
+
+        positions = [
+            self.company_position(organization_id=company_records[0].get("organization_id"))
+            for company_records in companies_records
+        ]
+        store = self.store.replace_companies([
+            (company, CompanyYearStore.from_companies([company_records]))
+            for company, company_records in zip(positions, companies_records)
+        ])
+
+        snapshot = DataSnapshot.__new__(DataSnapshot)
+        snapshot.store = store
+        snapshot.company_by_organization_id = dict(self.company_by_organization_id)
+        snapshot.company_by_cr_number = dict(self.company_by_cr_number)
+        snapshot.fingerprint = self.fingerprint
+        snapshot.deltas_offset = self.deltas_offset
+        snapshot.loaded_at = time.time()
+
+        appended = self.store.company_count
+        for company in positions:
+            if company is None:
+                company, appended = appended, appended + 1
+            else:
+                old_cr_number = str(self.store.cr_number[company])
+                if snapshot.company_by_cr_number.get(old_cr_number) == company:
+                    del snapshot.company_by_cr_number[old_cr_number]
+            snapshot.company_by_organization_id[str(store.organization_id[company])] = company
+            snapshot.company_by_cr_number[str(store.cr_number[company])] = company
+        return snapshot
+
+    def company_digest(self, company: int) -> str:
+        """
+        Returns the content digest of all records of the company at a store
+        position, computed with the store when the data is loaded.
+        """
+        return self.store.company_digest(company)
+
+
+def _file_fingerprint(path: str, use_hash: bool) -> Tuple:
+    stat = os.stat(path)
+    if not use_hash:
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return (path, digest.hexdigest())
+
+
+def source_fingerprint(paths: List[str] = SOURCE_PATHS, use_hash: bool = DATA_RELOAD_USE_HASH) -> Tuple:
+    """
+    Returns a fingerprint of the source files: (path, mtime, size) per file, or
+    (path, sha256) per file when use_hash is True. Directories contribute every
+    JSON file they contain, so added and removed files are detected too.
+    """
+    fingerprint = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                files = sorted(entry.path for entry in entries if entry.name.endswith(".json"))
+            fingerprint.extend(_file_fingerprint(file, use_hash) for file in files)
+        elif os.path.exists(path):
+            fingerprint.append(_file_fingerprint(path, use_hash))
+    return tuple(fingerprint)
+
+
+def build_snapshot(file_path: str = QAWAEM_FILE_PATH, streaming: bool = QAWAEM_STREAMING) -> DataSnapshot:
+    """
+    Parses the qawaem payload, merges each borrower's profile into it, and
+    flattens and indexes every company, with the upserted deltas applied.
+    """
+    from .columnar_store import CompanyYearStore
+    from .borrower_profile import iter_profiled_companies
+    from .incremental_ingest import load_deltas, iter_with_deltas
+
+    # Fingerprint before reading, so a change made during the build is picked up by the next check
+    fingerprint = source_fingerprint()
+    deltas, deltas_offset = load_deltas(QAWAEM_DELTAS_PATH)
+
+    with span("data.build_snapshot", streaming=streaming):
+        # Records are flattened one company at a time and go straight into the columnar store.
+        # The bms / SIMAH files of the companies ahead are loaded concurrently in the meantime.
+        # Parsing, profile loading and flattening interleave, so they are timed as stages of this span.
+        stages = StageTimer()
+        parsed = stages.iterate("data.parse", iter_qawaem_companies(file_path, streaming=streaming))
+        companies = stages.iterate("data.profile", iter_profiled_companies(parsed))
+        store = CompanyYearStore.from_companies(
+            iter_with_deltas(stages.iterate("data.flatten", (flatten_company(company) for company in companies)), deltas)
+        )
+        stages.record()
+
+    return DataSnapshot(store, fingerprint, deltas_offset)
+
+
+_snapshot: Optional[DataSnapshot] = None
+_snapshot_lock = threading.Lock()
+# Serializes swapping in a new snapshot, so a rebuild and an applied delta never overwrite each other
+_swap_lock = threading.Lock()
+_reload_thread: Optional[threading.Thread] = None
+# Guards the change check state below; held only to start a check, never during one
+_check_lock = threading.Lock()
+_check_thread: Optional[threading.Thread] = None
+_last_check = 0.0
+
+
+def _rebuild_snapshot() -> None:
+    """Builds a new snapshot and swaps it in. Readers keep the old one until the swap."""
+    global _snapshot
+
+    try:
+        snapshot = build_snapshot()
+    except Exception:
+        logger.exception("Reloading the data snapshot failed, keeping the current one")
+        return
+
+    # Rebinding the module global is atomic: a reader sees either the old or the new snapshot, never a partial one
+    with _swap_lock:
+        _snapshot = snapshot
+    logger.info("Data snapshot reloaded (%d companies)", snapshot.store.company_count)
+
+
+def reload_snapshot(wait: bool = False) -> None:
+    """
+    Rebuilds the snapshot in a background thread, unless a rebuild is already running.
+
+    Args:
+        wait: Block until the rebuild is finished.
+    """
+    global _reload_thread
+
+    with _snapshot_lock:
+        if _reload_thread is None or not _reload_thread.is_alive():
+            _reload_thread = threading.Thread(target=_rebuild_snapshot, name="data-snapshot-reload", daemon=True)
+            _reload_thread.start()
+        reload_thread = _reload_thread
+
+    if wait:
+        reload_thread.join()
+
+
+def apply_new_deltas() -> bool:
+    """
+    Applies the deltas appended to QAWAEM_DELTAS_PATH since the current
+    snapshot was built: only the changed companies are re-flattened and
+    re-indexed, every other one is carried over. If the deltas file shrank
+    (it was rotated or rewritten), the snapshot is rebuilt instead.
+
+    Returns:
+        bool: True if the snapshot changed.
+    """
+    global _snapshot
+
+    from .incremental_ingest import read_deltas, profile_deltas, group_deltas, apply_company_deltas
+
+    with _swap_lock:
+        snapshot = _snapshot
+        if snapshot is None:
+            return False
+        try:
+            size = os.path.getsize(QAWAEM_DELTAS_PATH)
+        except OSError:
+            size = 0
+        if size == snapshot.deltas_offset:
+            return False
+        if size < snapshot.deltas_offset:
+            reload_snapshot()
+            return False
+
+        with span("data.apply_deltas"):
+            companies, offset = read_deltas(QAWAEM_DELTAS_PATH, snapshot.deltas_offset)
+            changed = []
+            for organization_id, deltas in group_deltas(profile_deltas(companies)).items():
+                records = apply_company_deltas(snapshot.company_records(organization_id=organization_id) or [], deltas)
+                if records:
+                    changed.append(records)
+            updated = snapshot.with_companies(changed) if changed else snapshot
+            updated.deltas_offset = offset
+            annotate(companies=len(changed))
+
+        # Same swap as a rebuild: readers see the old or the new snapshot
+        _snapshot = updated
+    logger.info("Applied %d upserted companies to the data snapshot", len(changed))
+    return bool(changed)
+
+
+def _run_change_check(snapshot: DataSnapshot) -> None:
+    """Compares the sources with the snapshot's fingerprint, then reloads or applies new deltas."""
+    try:
+        changed = source_fingerprint() != snapshot.fingerprint
+    except OSError:
+        # Sources are being replaced right now, check again next time
+        return
+
+    try:
+        if changed:
+            reload_snapshot()
+        else:
+            apply_new_deltas()
+    except Exception:
+        logger.exception("Applying data source changes failed, keeping the current snapshot")
+
+
+def _check_for_changes(snapshot: DataSnapshot) -> None:
+    """
+    Starts a background check of the sources for changes (see
+    `_run_change_check`), at most every DATA_RELOAD_CHECK_INTERVAL seconds
+    and never two at once. The caller never waits on the scan.
+    """
+    global _last_check, _check_thread
+
+    with _check_lock:
+        now = time.monotonic()
+        if now - _last_check < DATA_RELOAD_CHECK_INTERVAL:
+            return
+        if _check_thread is not None and _check_thread.is_alive():
+            return
+        _last_check = now
+        _check_thread = threading.Thread(target=_run_change_check, args=(snapshot,), name="data-change-check", daemon=True)
+        _check_thread.start()
+
+
+def get_snapshot() -> DataSnapshot:
+    """
+    Returns the current data snapshot.
+
+    qawaem_data.json is loaded on first use so that importing the agent does no
+    I/O. After that the sources are checked for changes in the background (at
+    most every DATA_RELOAD_CHECK_INTERVAL seconds) and a changed snapshot is
+    rebuilt and swapped in atomically; until then the current one is served.
+    Upserted deltas (see incremental_ingest.py) are applied to the changed
+    companies only.
+    """
+    global _snapshot
+
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = build_snapshot()
+
+    snapshot = _snapshot
+    _check_for_changes(snapshot)
+    return snapshot
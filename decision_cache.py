@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Callable, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .columnar_store import CompanyYearStore
+    from .data_provider import DataSnapshot
+
+logger = logging.getLogger(__name__)
+
+# On-disk location of the cache (set DECISION_CACHE_ENABLED=0 to disable it)
+DECISION_CACHE_PATH = os.getenv(
+    "DECISION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "credit_decision_cache.sqlite3")
+)
+DECISION_CACHE_ENABLED = os.getenv("DECISION_CACHE_ENABLED", "1") != "0"
+
+# Maximum number of cached company decisions of each kind (rulebook, scorecard), the least recently used ones are evicted beyond it
+DECISION_CACHE_MAX_ENTRIES = int(os.getenv("DECISION_CACHE_MAX_ENTRIES", "10000"))
+
+# Layout version of the cache file; a file of another version is emptied when opened
+DECISION_CACHE_SCHEMA_VERSION = 2
+
+
+def decision_key(kind: str, rules_id: str, data_digest: str, **params: Any) -> str:
+    """
+    Returns the cache key of one company's decision.
+
+    Args:
+        kind: What was computed, e.g. "rulebook" or "scorecard".
+        rules_id: Version ID of the rules, e.g. RULEBOOK_ID.
+        data_digest: Content hash of the company's records.
+        params: Any other input the result depends on (e.g. all_years).
+    """
+    payload = json.dumps([kind, rules_id, data_digest, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """
+    Size-bounded LRU cache of JSON results in a SQLite file.
+
+    Every read refreshes the entry's last use time; once more than
+    `max_entries` of a kind are stored, its least recently used ones are
+    deleted, so one kind never evicts another. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = DECISION_CACHE_PATH, max_entries: int = DECISION_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+
+        # Entries of an older layout were keyed on other digests and could never be hit again
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != DECISION_CACHE_SCHEMA_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS decisions")
+            self._connection.execute(f"PRAGMA user_version = {DECISION_CACHE_SCHEMA_VERSION}")
+        # kind: what was computed (evicted per kind); company: organization id, see `forget_companies`
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL, kind TEXT NOT NULL, company TEXT)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS decisions_kind_last_used ON decisions (kind, last_used)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS decisions_company ON decisions (company)")
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Returns the cached values of the given keys (missing keys are left out)."""
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit of bound parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM decisions WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+
+            if found:
+                now = time.time()
+                self._connection.execute("BEGIN")
+                self._connection.executemany(
+                    "UPDATE decisions SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._connection.execute("COMMIT")
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, kind: str, items: Dict[str, Any], companies: Optional[Dict[str, str]] = None) -> None:
+        """
+        Stores the given values and evicts the least recently used entries of
+        their kind beyond `max_entries`.
+
+        Args:
+            kind: What the values are, e.g. "rulebook".
+            items: Value of each key.
+            companies: Organization id of each key, see `forget_companies`.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        companies = companies or {}
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO decisions (key, value, last_used, kind, company) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, json.dumps(value, ensure_ascii=False), now, kind, companies.get(key))
+                    for key, value in items.items()
+                ],
+            )
+            stored = self._connection.execute("SELECT COUNT(*) FROM decisions WHERE kind = ?", (kind,)).fetchone()[0]
+            if stored > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM decisions WHERE key IN "
+                    "(SELECT key FROM decisions WHERE kind = ? ORDER BY last_used LIMIT ?)",
+                    (kind, stored - self.max_entries),
+                )
+            self._connection.execute("COMMIT")
+
+    def forget_companies(self, organization_ids: List[str]) -> int:
+        """
+        Deletes the cached decisions of the given companies, e.g. after an upsert.
+        They could no longer be hit (their data digest changed), this just frees their entries.
+
+        Returns:
+            int: The number of entries deleted.
+        """
+        deleted = 0
+        with self._lock:
+            for start in range(0, len(organization_ids), 500):
+                chunk = [str(organization_id) for organization_id in organization_ids[start:start + 500]]
+                placeholders = ",".join("?" * len(chunk))
+                deleted += self._connection.execute(f"DELETE FROM decisions WHERE company IN ({placeholders})", chunk).rowcount
+        return deleted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM decisions")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_kind = dict(self._connection.execute("SELECT kind, COUNT(*) FROM decisions GROUP BY kind").fetchall())
+        return {
+            "path": self.path,
+            "entries": sum(per_kind.values()),
+            "entries_per_kind": per_kind,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_cache: Optional[DecisionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_decision_cache() -> Optional[DecisionCache]:
+    """Returns the shared decision cache, opened on first use (None if disabled or it can't be opened)."""
+    global _cache, DECISION_CACHE_ENABLED
+
+    if _cache is None and DECISION_CACHE_ENABLED:
+        with _cache_lock:
+            if _cache is None and DECISION_CACHE_ENABLED:
+                try:
+                    _cache = DecisionCache()
+                except (OSError, sqlite3.Error):
+                    logger.exception("Opening the decision cache failed, decisions won't be cached")
+                    DECISION_CACHE_ENABLED = False
+    return _cache
+
+
+def cached_decisions(
+    snapshot: "DataSnapshot",
+    companies: List[int],
+    kind: str,
+    rules_id: str,
+    evaluate: Callable[["CompanyYearStore"], List[List[Dict[str, Any]]]],
+    **params: Any
+) -> List[Dict[str, Any]]:
+    """
+    Returns the decisions of the given companies, evaluating only those that are not cached.
+
+    Decisions are cached per company, keyed on its content digest (computed
+    with the snapshot's store), the rules version ID and `params`, so a change
+    to either the data or the rules is a cache miss and never serves a stale
+    decision. Meant for a few companies at a time: the whole portfolio is
+    faster to evaluate than to look up.
+
+    Args:
+        snapshot: The data snapshot the companies belong to.
+        companies: Store positions of the companies, in the order results are returned.
+        kind: What `evaluate` computes, e.g. "rulebook".
+        rules_id: Version ID of the rules `evaluate` applies.
+        evaluate: Computes the results of a store of companies, one list
+            (of zero or more results) per company of that store.
+        params: Other inputs `evaluate` depends on; part of the key.
+
+    Returns:
+        list: The results of every company, in order.
+    """
+    cache = get_decision_cache()
+    if cache is None:
+        return [result for results in evaluate(snapshot.store.take_companies(companies)) for result in results]
+
+    keys = [decision_key(kind, rules_id, snapshot.company_digest(company), **params) for company in companies]
+    try:
+        cached = cache.get_many(keys)
+    except sqlite3.Error:
+        logger.exception("Reading the decision cache failed")
+        cached = {}
+
+    missing = [company for company, key in zip(companies, keys) if key not in cached]
+    if missing:
+        per_company = dict(zip(missing, evaluate(snapshot.store.take_companies(missing))))
+
+        computed, computed_companies = {}, {}
+        for company, key in zip(companies, keys):
+            if key not in cached:
+                computed[key] = per_company[company]
+                computed_companies[key] = str(snapshot.store.organization_id[company]).strip()
+        try:
+            cache.put_many(kind, computed, computed_companies)
+        except sqlite3.Error:
+            logger.exception("Writing the decision cache failed")
+        cached.update(computed)
+
+    return [result for key in keys for result in cached[key]]
@@ -0,0 +1,301 @@
+import os
+import time
+import uuid
+import heapq
+import socket
+import smtplib
+import logging
+import threading
+from collections import OrderedDict
+from email.message import EmailMessage
+from email.utils import getaddresses
+from typing import Dict, Any, Callable, List, Optional
+from .tracing import span, annotate, capture_context
+
+logger = logging.getLogger(__name__)
+
+# Number of worker threads delivering emails
+EMAIL_QUEUE_WORKERS = int(os.getenv("EMAIL_QUEUE_WORKERS", "2"))
+
+# Delivery attempts per email before it is marked as failed
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+
+# Seconds before the first retry, doubled on every further retry up to EMAIL_RETRY_MAX_DELAY
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "2"))
+EMAIL_RETRY_MAX_DELAY = float(os.getenv("EMAIL_RETRY_MAX_DELAY", "300"))
+
+# Maximum emails sent per second over all workers, to stay within the provider's rate limit (0: no limit)
+EMAIL_RATE_LIMIT = float(os.getenv("EMAIL_RATE_LIMIT", "0"))
+
+# Number of finished emails whose status is kept for lookups
+EMAIL_STATUS_HISTORY = int(os.getenv("EMAIL_STATUS_HISTORY", "1000"))
+
+QUEUED = "queued"
+SENDING = "sending"
+RETRYING = "retrying"
+SENT = "sent"
+FAILED = "failed"
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Returns True for SMTP errors worth retrying: dropped connections, timeouts and 4xx replies."""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, socket.gaierror))
+
+
+def message_recipients(message: EmailMessage) -> List[str]:
+    """Returns the addresses a message is sent to (To, Cc and Bcc)."""
+    return [address for _, address in getaddresses([
+        str(value) for field in ("To", "Cc", "Bcc") for value in message.get_all(field, [])
+    ]) if address]
+
+
+def describe_refused(refused: Dict[str, Any]) -> Dict[str, str]:
+    """Formats the refused recipients returned or raised by smtplib as {address: "<code> <reply>"}."""
+    described = {}
+    for address, (code, reply) in refused.items():
+        if isinstance(reply, bytes):
+            reply = reply.decode("utf-8", "replace")
+        described[address] = f"{code} {reply}"
+    return described
+
+
+class EmailQueue:
+    """
+    Background delivery queue for outbound emails.
+
+    `submit` returns a tracking ID right away; worker threads build and send the
+    message and retry transient SMTP errors with exponential backoff. The status
+    of every email can be looked up by its tracking ID. Recipients the server
+    refused are reported in the status; an email none of whose recipients were
+    accepted has failed.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[EmailMessage], Any],
+        workers: int = EMAIL_QUEUE_WORKERS,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        backoff: float = EMAIL_RETRY_BACKOFF,
+        max_delay: float = EMAIL_RETRY_MAX_DELAY,
+        rate_limit: float = EMAIL_RATE_LIMIT,
+        history: int = EMAIL_STATUS_HISTORY,
+    ):
+        # Sends a message, returning the refused recipients like `SMTP.send_message`
+        self.send = send
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.min_interval = 1.0 / rate_limit if rate_limit > 0 else 0.0
+        self.history = history
+
+        # Emails by tracking ID, oldest first; each holds its status and, until sent, its message builder
+        self._emails: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._builders: Dict[str, Callable[[], EmailMessage]] = {}
+        self._messages: Dict[str, EmailMessage] = {}
+        # Trace context of the submitting call, so delivery spans on the workers join its trace
+        self._contexts: Dict[str, Any] = {}
+
+        # Due emails as (due time, sequence, tracking ID)
+        self._due: List[tuple] = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._next_send_at = 0.0
+        self._rate_lock = threading.Lock()
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    def submit(self, build: Callable[[], EmailMessage], to: str, subject: str) -> str:
+        """
+        Queues an email for delivery.
+
+        Args:
+            build: Builds the message; called on a worker, so slow work like
+                rendering attachments doesn't block the caller.
+            to: Recipient, reported in the status.
+            subject: Subject, reported in the status.
+
+        Returns:
+            str: The tracking ID of the email.
+        """
+        tracking_id = uuid.uuid4().hex
+        now = time.time()
+        with self._condition:
+            self._emails[tracking_id] = {
+                "tracking_id": tracking_id,
+                "to": to,
+                "subject": subject,
+                "status": QUEUED,
+                "attempts": 0,
+                "error": None,
+                "refused": {},
+                "next_attempt_at": None,
+                "queued_at": now,
+                "updated_at": now,
+            }
+            self._builders[tracking_id] = build
+            self._contexts[tracking_id] = capture_context()
+            self._schedule(tracking_id, time.monotonic())
+            self._prune()
+            self._start_workers()
+        return tracking_id
+
+    def status(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the delivery status of an email, or None if the tracking ID is
+        unknown. `retry_in` is the time left until `next_attempt_at` (epoch
+        seconds) while the email waits for a retry.
+        """
+        with self._condition:
+            email = self._emails.get(tracking_id)
+            if not email:
+                return None
+            email = dict(email, refused=dict(email["refused"]))
+        next_attempt_at = email["next_attempt_at"]
+        email["retry_in"] = None if next_attempt_at is None else max(0.0, next_attempt_at - time.time())
+        return email
+
+    def pending(self) -> int:
+        """Returns the number of emails not yet sent or failed."""
+        with self._condition:
+            return len(self._builders) + len(self._messages)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every queued email is sent or failed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._builders or self._messages:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            pending = len(self._builders) + len(self._messages)
+            due = len(self._due)
+        return {"pending": pending, "due": due, "sent": self.sent, "failed": self.failed, "retries": self.retries}
+
+    # --- Workers ---
+
+    def _schedule(self, tracking_id: str, due: float) -> None:
+        self._sequence += 1
+        heapq.heappush(self._due, (due, self._sequence, tracking_id))
+        self._condition.notify_all()
+
+    def _prune(self) -> None:
+        """Forgets the oldest finished emails beyond `history`."""
+        finished = len(self._emails) - len(self._builders) - len(self._messages)
+        for tracking_id in list(self._emails):
+            if finished <= self.history:
+                break
+            if self._emails[tracking_id]["status"] in (SENT, FAILED):
+                del self._emails[tracking_id]
+                finished -= 1
+
+    def _start_workers(self) -> None:
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for index in range(len(self._threads), self.workers):
+            thread = threading.Thread(target=self._work, name=f"email-queue-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _update(self, tracking_id: str, **fields: Any) -> None:
+        self._emails[tracking_id].update(fields, updated_at=time.time())
+
+    def _next_due(self) -> str:
+        """Waits for the next email that is due and returns its tracking ID."""
+        with self._condition:
+            while True:
+                if self._due:
+                    delay = self._due[0][0] - time.monotonic()
+                    if delay <= 0:
+                        tracking_id = heapq.heappop(self._due)[2]
+                        self._update(
+                            tracking_id, status=SENDING, attempts=self._emails[tracking_id]["attempts"] + 1, next_attempt_at=None
+                        )
+                        return tracking_id
+                    self._condition.wait(delay)
+                else:
+                    self._condition.wait()
+
+    def _throttle(self) -> None:
+        if not self.min_interval:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_send_at)
+            self._next_send_at = send_at + self.min_interval
+        time.sleep(send_at - now)
+
+    def _work(self) -> None:
+        while True:
+            tracking_id = self._next_due()
+            error = None
+            refused = {}
+            attempt = self._emails[tracking_id]["attempts"]
+            with span("email.deliver", parent=self._contexts.get(tracking_id), tracking_id=tracking_id, attempt=attempt):
+                try:
+                    message = self._messages.get(tracking_id)
+                    if message is None:
+                        with span("email.build"):
+                            message = self._builders[tracking_id]()
+                        self._messages[tracking_id] = message
+                    self._throttle()
+                    refused = self.send(message) or {}
+                    # smtplib raises this itself when every recipient is refused, but not every sender does
+                    if refused and set(message_recipients(message)) <= set(refused):
+                        raise smtplib.SMTPRecipientsRefused(refused)
+                except Exception as e:
+                    error = e
+                    if isinstance(e, smtplib.SMTPRecipientsRefused):
+                        refused = e.recipients
+                    annotate(error=str(e))
+
+            with self._condition:
+                attempts = self._emails[tracking_id]["attempts"]
+                refused = describe_refused(refused)
+                if error is None:
+                    self.sent += 1
+                    self._update(tracking_id, status=SENT, error=None, refused=refused, next_attempt_at=None)
+                    if refused:
+                        logger.warning("Email %s was sent, but the server refused %s", tracking_id, ", ".join(refused))
+                elif is_transient_error(error) and attempts < self.max_attempts:
+                    delay = min(self.backoff * 2 ** (attempts - 1), self.max_delay)
+                    self.retries += 1
+                    self._update(tracking_id, status=RETRYING, error=str(error), refused=refused, next_attempt_at=time.time() + delay)
+                    self._schedule(tracking_id, time.monotonic() + delay)
+                    logger.warning("Sending email %s failed (%s), retrying in %.1f s", tracking_id, error, delay)
+                    continue
+                else:
+                    self.failed += 1
+                    self._update(tracking_id, status=FAILED, error=str(error), refused=refused, next_attempt_at=None)
+                    logger.error("Sending email %s failed: %s", tracking_id, error)
+
+                self._builders.pop(tracking_id, None)
+                self._messages.pop(tracking_id, None)
+                self._contexts.pop(tracking_id, None)
+                self._condition.notify_all()
+
+
+_queue: Optional[EmailQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_email_queue() -> EmailQueue:
+    """Returns the shared email queue, delivering through the pooled SMTP sessions."""
+    global _queue
+
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                from .smtp_pool import get_smtp_pool
+
+                _queue = EmailQueue(lambda message: get_smtp_pool().send_message(message))
+    return _queue
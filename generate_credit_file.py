@@ -6,43 +6,98 @@ from docx.oxml.ns import qn
 from docx.shared import RGBColor
 from docx.oxml import parse_xml
 from docx.oxml.ns import nsdecls
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from xml.sax.saxutils import escape
+from copy import copy, deepcopy
+from io import BytesIO
 import logging
 import os
-import json
+import re
+import sys
+import zipfile
+import threading
 from datetime import datetime
 
-def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_filename="Lendo Credit File - ADK AGENT.docx"):
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Pre-styled credit file with {{placeholders}}, built from the procedural layout if the file doesn't exist
+CREDIT_FILE_TEMPLATE_PATH = os.getenv(
+    "CREDIT_FILE_TEMPLATE_PATH", os.path.join(current_dir, "templates", "lendo_credit_file.docx")
+)
+
+# "template" fills in the template, "procedural" builds the whole document with python-docx
+CREDIT_FILE_RENDERER = os.getenv("CREDIT_FILE_RENDERER", "template")
+
+# Header cell background, parsed once and copied into every header cell
+HEADER_SHADING = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
+
+# Values rendered as one paragraph per line
+MULTILINE_VALUES = ("covenants", "security")
+
+# Placeholders of the approved buyers row, repeated once per buyer
+BUYER_PLACEHOLDERS = {"name": "buyerName", "cap": "buyerCap"}
+
+PLACEHOLDER = re.compile(r"\{\{([\w\-]+)\}\}")
+
+
+def _shade(cell):
+    cell._tc.get_or_add_tcPr().append(deepcopy(HEADER_SHADING))
+
+
+def load_credit_file_data(companyId) -> Dict[str, Any]:
+    """Returns the credit file BMS data (credit-file-data/BR{companyId}.json) of a company, through the shared reference data cache."""
+    from .reference_data import get_reference_data
+
+    return get_reference_data().get("credit_file", companyId)
+
+
+def credit_file_values(credit_file_bms_data: Dict[str, Any], summary_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
     """
-    Creates a DOCX file mimicking the structure, content, and basic styles
-    of the "Lendo Credit File - ADK AGENT.docx" file.
+    Collects every dynamic value of the credit file.
 
-    Args:
-        output_filename (str): The name of the DOCX file to create.
+    Returns:
+        tuple: (values by name, approved buyers as {"name", "cap"} dicts)
     """
-    # logging.basicConfig(
-    #     level=logging.DEBUG,
-    #     filename='adk_agent_generate_file.log',  # This file will be created in the current working directory
-    #     filemode='a',                            # 'w' to overwrite each run; use 'a' to append
-    #     format='%(asctime)s - %(levelname)s - %(message)s'
-    # )
-    # logger = logging.getLogger(__name__)
-    #logger.info(f"*******************************************************************")
+    values = {
+        "finalDecision": summary_data.get('finalDecision', 'Not Recommend for financing (default)'),
+        "productType": credit_file_bms_data.get('userInput_productType', 'Invoice Financing'),
+        "limit": credit_file_bms_data.get('userInput_requiredFinancingAmount', '3.5mn'),
+        "internalRiskRating": f"{summary_data.get('riskRating', 'N/A')} ({summary_data.get('simahScore', 'N/A')})",
+        "covenants": credit_file_bms_data.get('conditions-covenant_conditionsCovenantDescription', ""),
+        "security": credit_file_bms_data.get('conditions-covenant_securityDescription', ""),
+        "creditFileDate": datetime.today().strftime('%d-%m-%Y'),
+        "entityName": credit_file_bms_data.get('smeLegalInformation_companyArabicName', ''),
+        "br": credit_file_bms_data.get('BR', ''),
+        "crNumber": credit_file_bms_data.get('smeLegalInformation_crNumber', ''),
+        "crEntityNumber": credit_file_bms_data.get('smeLegalInformation_crEntityNumber', ''),
+        "legalType": credit_file_bms_data.get('smeLegalInformation_legalType', ''),
+        "productTypeName": credit_file_bms_data.get('userInput_productType', ''),
+        "incorporationDate": credit_file_bms_data.get('smeLegalInformation_crIssueDateGregorian', ''),
+        "businessAddress": credit_file_bms_data.get('contactAddressInformation_city', ''),
+        "industry": credit_file_bms_data.get('summaryDetails_industryType', ''),
+        "nitaqatColor": credit_file_bms_data.get('otherInformation_nitaqatColor', ''),
+        "requestedLimit": credit_file_bms_data.get('userInput_requiredFinancingAmount', ''),
+    }
 
-    #logger.info(f"Summary data: {summary_data}")
-    #logger.info(f"output_filename: {output_filename}")
+    approved_buyers = [
+        {"name": buyer.get('buyerEnglishName', ''), "cap": f"{buyer.get('averageCap', '')}%"}
+        for buyer in credit_file_bms_data.get('approved-buyer', [])
+    ]
 
-    # Loan Credit File specific BMS Data
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    credit_file_bms_file_path = os.path.join(current_dir, "credit-file-data", f"BR{companyId}.json")
-    #logger.info(f"credit_file_bms_file_path: {credit_file_bms_file_path}")
+    return values, approved_buyers
 
-    with open(credit_file_bms_file_path, "r", encoding="utf-8") as f:
-        credit_file_bms_data = json.load(f)
 
-    #logger.info(f"credit_file_bms_data: {credit_file_bms_data}")
-    #logger.info(f"credit_file_bms_data.BR: {credit_file_bms_data.get('BR')}")
+def build_credit_file_document(values: Dict[str, Any], approved_buyers: List[Dict[str, str]]) -> Document:
+    """
+    Builds the credit file procedurally with python-docx, mimicking the structure,
+    content, and basic styles of the "Lendo Credit File - ADK AGENT.docx" file.
 
+    Args:
+        values: Dynamic values, as returned by `credit_file_values`.
+        approved_buyers: Rows of the approved buyers table.
+    """
     # Start creating document file
     document = Document()
 
@@ -78,12 +133,11 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         #cell.paragraphs[0].runs[0].bold = True
         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
         # Set background color to header cells
-        shading_elm_1 = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading_elm_1)
+        _shade(cell)
 
     # Data Row
     data_cells = table.rows[1].cells
-    data_cells[0].text = summary_data.get('finalDecision', 'Not Recommend for financing (default)')
+    data_cells[0].text = values['finalDecision']
     #data_cells[0].text = 'Approved as Requested'
     data_cells[1].text = 'AI Credit Risk Officer'
     data_cells[2].text = 'Google ADK agent developed by Emmad, Imran, Saad, Shafeeque, Sumayyah, Hamza'
@@ -116,17 +170,16 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
         cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
         # Set background color to header cells
-        shading_elm_1 = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading_elm_1)
+        _shade(cell)
 
     # Data Row 1 (A, Invoice Discounting)
     data_cells = table.rows[1].cells
     data_cells[0].text = 'A'
-    data_cells[1].text = credit_file_bms_data.get('userInput_productType', 'Invoice Financing')
-    data_cells[2].text = credit_file_bms_data.get('userInput_requiredFinancingAmount', '3.5mn')
+    data_cells[1].text = values['productType']
+    data_cells[2].text = values['limit']
     data_cells[3].text = '100%'
     #data_cells[4].text = 'C'
-    data_cells[4].text = f"{summary_data.get('riskRating', 'N/A')} ({summary_data.get('simahScore', 'N/A')})"
+    data_cells[4].text = values['internalRiskRating']
 
     #data_cells[6].text = 'B'
     data_cells[5].text = '18%'
@@ -141,7 +194,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     data_cells = table.rows[2].cells
     data_cells[0].text = 'Total'
     data_cells[1].text = '' # Merged cell originally, but `python-docx` handles width well
-    data_cells[2].text = credit_file_bms_data.get('userInput_requiredFinancingAmount', '3.5mn')
+    data_cells[2].text = values['limit']
     data_cells[3].text = ''
     #data_cells[4].text = ''
     data_cells[4].text = ''
@@ -168,8 +221,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
 
     # Format left cell
     cell1.text = "Covenants/conditions"
-    shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    cell1._tc.get_or_add_tcPr().append(shading)
+    _shade(cell1)
     #cell1.paragraphs[0].runs[0].bold = True
     cell1.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
 
@@ -189,7 +241,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     # Clear the default empty paragraph in cell2
     cell2._element.clear_content()
 
-    for line in credit_file_bms_data.get('conditions-covenant_conditionsCovenantDescription', "").splitlines():
+    for line in values['covenants'].splitlines():
         cell2.add_paragraph(line)
 
     # Row 2
@@ -197,8 +249,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     cell2 = table.rows[1].cells[1]
 
     cell1.text = "Security"
-    shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    cell1._tc.get_or_add_tcPr().append(shading)
+    _shade(cell1)
     #cell1.paragraphs[0].runs[0].bold = True
     cell1.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
 
@@ -216,7 +267,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     # Clear the default empty paragraph in cell2
     cell2._element.clear_content()
 
-    for line in credit_file_bms_data.get('conditions-covenant_securityDescription', "").splitlines():
+    for line in values['security'].splitlines():
         cell2.add_paragraph(line)
 
     document.add_paragraph()  # One blank line
@@ -235,8 +286,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         #cell.paragraphs[0].runs[0].bold = True
         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
         # Set background color to header cells
-        shading_elm_1 = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading_elm_1)
+        _shade(cell)
 
     # # Data Rows
     # data = [
@@ -252,13 +302,11 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     #         cells[j].text = text
     #         cells[j].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
 
-    approved_buyers = credit_file_bms_data.get('approved-buyer', [])
-
     # Dynamically add rows for each buyer
     for i, buyer in enumerate(approved_buyers):
         cells = table.add_row().cells
-        cells[0].text = buyer.get('buyerEnglishName', '')
-        cells[1].text = f'{buyer.get('averageCap', '')}%'
+        cells[0].text = buyer['name']
+        cells[1].text = buyer['cap']
         cells[2].text = "--"  # Tenor is not available in the JSON
 
         for cell in cells:
@@ -283,16 +331,15 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     #merged_paragraph.runs[0].bold = True
     merged_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
     # Set background color to header cells
-    shading_elm_1 = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    merged_cell._tc.get_or_add_tcPr().append(shading_elm_1)
+    _shade(merged_cell)
 
     # Headers for 'Deal Deets'
     deal_deets_headers = [
-        'Credit File Date', datetime.today().strftime('%d-%m-%Y'), 'Next Review Date', '31-06-2026', 'Last Review Date', 'New',
-        'Entity Name', credit_file_bms_data.get('smeLegalInformation_companyArabicName', ''), 'BR#', credit_file_bms_data.get('BR', ''), 'CR# ', credit_file_bms_data.get('smeLegalInformation_crNumber', ''),
-        'Assessment', 'NewBiz / Full Review', 'Entity#', credit_file_bms_data.get('smeLegalInformation_crEntityNumber', ''), 'Legal Structure', credit_file_bms_data.get('smeLegalInformation_legalType', ''),
-        'Type of Product', credit_file_bms_data.get('userInput_productType', ''), 'Incorporation Date ', credit_file_bms_data.get('smeLegalInformation_crIssueDateGregorian', ''), 'Business Address ', credit_file_bms_data.get('contactAddressInformation_city', ''),
-        'Industry / Sector', credit_file_bms_data.get('summaryDetails_industryType', ''), 'Zakat', 'Not valid', 'Nitaqat ', credit_file_bms_data.get('otherInformation_nitaqatColor', ''),
+        'Credit File Date', values['creditFileDate'], 'Next Review Date', '31-06-2026', 'Last Review Date', 'New',
+        'Entity Name', values['entityName'], 'BR#', values['br'], 'CR# ', values['crNumber'],
+        'Assessment', 'NewBiz / Full Review', 'Entity#', values['crEntityNumber'], 'Legal Structure', values['legalType'],
+        'Type of Product', values['productTypeName'], 'Incorporation Date ', values['incorporationDate'], 'Business Address ', values['businessAddress'],
+        'Industry / Sector', values['industry'], 'Zakat', 'Not valid', 'Nitaqat ', values['nitaqatColor'],
         '# of branches', '3', 'RAM', 'High Risk', 'PEPs Sanctions', 'No',
         'Deal Source', 'RM', 'Relationship with Lendo (mos)', 'New', 'Watchlist Status', 'NewBiz'
     ]
@@ -306,15 +353,13 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
             if j % 2 == 0:
                 #cells[j].paragraphs[0].runs[0].bold = True
                 # Set background color to header cells
-                shading_elm_1 = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-                cells[j]._tc.get_or_add_tcPr().append(shading_elm_1)
+                _shade(cells[j])
             cells[j].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
 
     # set text for last row first column
     cells = table.rows[8].cells
     cells[0].text = "Client Request"
-    shading_elm_1 = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    cells[0]._tc.get_or_add_tcPr().append(shading_elm_1)
+    _shade(cells[0])
 
     # Merge the last row's 5 cells to make a single row
     last_row = table.rows[8]
@@ -323,7 +368,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         merged_cell = merged_cell.merge(last_row.cells[i])
 
     # Set last row merged column text
-    merged_cell.text = f"Client asks limit of {credit_file_bms_data.get('userInput_requiredFinancingAmount', '')}."
+    merged_cell.text = f"Client asks limit of {values['requestedLimit']}."
     merged_paragraph = merged_cell.paragraphs[0]
     #merged_paragraph.runs[0].bold = True
     merged_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
@@ -345,8 +390,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     title_para.alignment = WD_ALIGN_PARAGRAPH.LEFT
 
     # Set background color for header cell
-    shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    title_cell._tc.get_or_add_tcPr().append(shading)
+    _shade(title_cell)
 
     # Data rows
     positives = [
@@ -385,8 +429,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     title_para.alignment = WD_ALIGN_PARAGRAPH.LEFT
 
     # Set background color for header cell
-    shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    title_cell._tc.get_or_add_tcPr().append(shading)
+    _shade(title_cell)
 
     # Data rows
     positives = [
@@ -424,8 +467,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     outer_cell.text = "SHAREHOLDERS / MANAGEMENTS"
     outer_cell.paragraphs[0].runs[0].bold = True
     # Set background color for header cell
-    shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    outer_cell._tc.get_or_add_tcPr().append(shading)
+    _shade(outer_cell)
 
     # === INNER TABLE ===
     outer_cell = outer_table.cell(1, 0)
@@ -446,8 +488,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         cell.text = title
         cell.paragraphs[0].runs[0].bold = True
         # Set background color for header cell
-        shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading)
+        _shade(cell)
 
     # Shareholder Data Rows
     shareholders = [
@@ -465,8 +506,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
     row.cells[0].text = "Authorized Person(s)"
     row.cells[0].paragraphs[0].runs[0].bold = True
     # Set background color for header cell
-    shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-    row.cells[0]._tc.get_or_add_tcPr().append(shading)
+    _shade(row.cells[0])
 
     row.cells[1].merge(row.cells[4])
     row.cells[1].text = "Anwar Mohammed Alhashari"
@@ -485,8 +525,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         cell.text = title
         cell.paragraphs[0].runs[0].bold = True
         # Set background color for header cell
-        shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading)
+        _shade(cell)
 
     # Management Data
     row = inner_table.add_row()
@@ -511,8 +550,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         #cell.paragraphs[0].runs[0].bold = True
         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
         # Set background color for header cell
-        shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading)
+        _shade(cell)
 
     # Data Row
     data_cells = table.rows[1].cells
@@ -538,8 +576,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         cell.paragraphs[0].runs[0].bold = True
         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
         # Set background color for header cell
-        shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading)
+        _shade(cell)
 
     # Data Row
     data_cells = table.rows[1].cells
@@ -567,8 +604,7 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         cell.paragraphs[0].runs[0].bold = True
         cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.LEFT
         # Set background color for header cell
-        shading = parse_xml(r'<w:shd {} w:fill="DEEBF6"/>'.format(nsdecls('w')))
-        cell._tc.get_or_add_tcPr().append(shading)
+        _shade(cell)
 
     # Data Rows
     data = [
@@ -844,16 +880,184 @@ def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output_fil
         cells[2].text = ''
 
 
-    # Save the document
-    try:
-        document.save(output_filename)
-        print(f"Document '{output_filename}' created successfully.")
-    except Exception as e:
-        print(f"Error saving document: {e}")
+    return document
+
+
+class CreditFileTemplate:
+    """
+    A credit file template, ready to render without python-docx.
+
+    The template is a .docx file whose word/document.xml holds a `{{name}}`
+    placeholder for every value of `credit_file_values`, and one approved buyers
+    row with `{{buyerName}}` / `{{buyerCap}}`. Every placeholder must be within a
+    single run (editing the template in Word may split it, retype it if so).
+    Rendering only substitutes the placeholders in the XML and re-zips the parts.
+    """
+
+    def __init__(self, docx_bytes: bytes):
+        with zipfile.ZipFile(BytesIO(docx_bytes)) as template:
+            self.parts = [(info, template.read(info)) for info in template.infolist()]
+
+        document_xml = next(data for info, data in self.parts if info.filename == "word/document.xml").decode("utf-8")
+        # Substituted values may start or end with spaces
+        document_xml = re.sub(r'<w:t>(?=[^<]*\{\{)', '<w:t xml:space="preserve">', document_xml)
+
+        missing = set(credit_file_values({}, {})[0]) | set(BUYER_PLACEHOLDERS.values())
+        missing -= set(PLACEHOLDER.findall(document_xml))
+        if missing:
+            raise ValueError(f"Credit file template is missing the placeholders: {', '.join(sorted(missing))}")
+
+        # Split the document into static XML, the buyer row and the multi-line paragraphs once,
+        # so rendering is a single pass over the segments
+        repeated = [(r'<w:tr\b(?:(?!<w:tr\b).)*?\{\{%s\}\}.*?</w:tr>' % BUYER_PLACEHOLDERS["name"], None)]
+        repeated += [(r'<w:p\b(?:(?!<w:p\b).)*?\{\{%s\}\}.*?</w:p>' % name, name) for name in MULTILINE_VALUES]
+        matches = []
+        for pattern, name in repeated:
+            match = re.search(pattern, document_xml, re.DOTALL)
+            matches.append((match.start(), match.end(), name))
+
+        self.segments = []
+        position = 0
+        for start, end, name in sorted(matches, key=lambda match: match[0]):
+            self.segments.append(("text", None, document_xml[position:start]))
+            self.segments.append(("buyers" if name is None else "lines", name, document_xml[start:end]))
+            position = end
+        self.segments.append(("text", None, document_xml[position:]))
+
+    @staticmethod
+    def _fill(xml: str, values: Dict[str, Any]) -> str:
+        return PLACEHOLDER.sub(lambda match: escape(str(values[match.group(1)])), xml)
+
+    def render_xml(self, values: Dict[str, Any], approved_buyers: List[Dict[str, str]]) -> str:
+        """Returns word/document.xml with the values filled in."""
+        xml = []
+        for kind, name, segment in self.segments:
+            if kind == "text":
+                xml.append(self._fill(segment, values))
+            elif kind == "buyers":
+                for buyer in approved_buyers:
+                    xml.append(self._fill(segment, {placeholder: buyer[key] for key, placeholder in BUYER_PLACEHOLDERS.items()}))
+            else:
+                for line in str(values[name]).splitlines():
+                    # python-docx writes empty lines as paragraphs without a run
+                    xml.append(self._fill(segment, {name: line}) if line else re.sub(r'<w:r\b.*</w:r>', '', segment, flags=re.DOTALL))
+        return "".join(xml)
+
+    def render(self, values: Dict[str, Any], approved_buyers: List[Dict[str, str]], output) -> None:
+        """
+        Writes the filled-in credit file.
+
+        Args:
+            output: File name or writable binary file object.
+        """
+        from .tracing import span
+
+        with span("credit_file.render", renderer="template"):
+            document_xml = self.render_xml(values, approved_buyers).encode("utf-8")
+        with span("credit_file.save"):
+            with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as docx:
+                for info, data in self.parts:
+                    # writestr fills in the entry's offset, sizes and CRC, so each render needs its own ZipInfo
+                    docx.writestr(copy(info), document_xml if info.filename == "word/document.xml" else data)
+
+
+def build_credit_file_template(output_filename: Optional[str] = None) -> bytes:
+    """
+    Builds the credit file template from the procedural layout, with a
+    placeholder for every value and a single approved buyers row.
+
+    Args:
+        output_filename: Also save the template to this file.
+
+    Returns:
+        bytes: The template .docx.
+    """
+    values = {name: "{{%s}}" % name for name in credit_file_values({}, {})[0]}
+    buyers = [{key: "{{%s}}" % placeholder for key, placeholder in BUYER_PLACEHOLDERS.items()}]
+
+    buffer = BytesIO()
+    build_credit_file_document(values, buyers).save(buffer)
+    if output_filename:
+        os.makedirs(os.path.dirname(os.path.abspath(output_filename)), exist_ok=True)
+        with open(output_filename, "wb") as f:
+            f.write(buffer.getvalue())
+    return buffer.getvalue()
+
+
+_template: Optional[CreditFileTemplate] = None
+_template_key = None
+_template_lock = threading.Lock()
+
+
+def get_credit_file_template(path: str = CREDIT_FILE_TEMPLATE_PATH) -> CreditFileTemplate:
+    """Returns the parsed credit file template, reloaded when the template file changes."""
+    global _template, _template_key
+
+    key = (path, os.stat(path).st_mtime_ns) if os.path.exists(path) else (path, None)
+    with _template_lock:
+        if _template is None or _template_key != key:
+            if key[1] is None:
+                docx_bytes = build_credit_file_template()
+            else:
+                with open(path, "rb") as f:
+                    docx_bytes = f.read()
+            _template = CreditFileTemplate(docx_bytes)
+            _template_key = key
+        return _template
+
+
+def create_lendo_credit_file(companyId, summary_data: Dict[str, Any], output="Lendo Credit File - ADK AGENT.docx", renderer: str = CREDIT_FILE_RENDERER):
+    """
+    Creates the Lendo credit file DOCX of a company.
+
+    Args:
+        companyId: Organization id of the company (its credit-file-data/BR{companyId}.json is used).
+        summary_data: Credit decision summary (finalDecision, riskRating, simahScore, ...).
+        output: File name to save the DOCX to, or a writable binary buffer (e.g. BytesIO)
+            to render it in memory. None renders into a new BytesIO.
+        renderer: "template" (fill in the pre-styled template) or "procedural" (build with python-docx).
+
+    Returns:
+        The file name or buffer the document was written to.
+
+    Raises:
+        Exception: Whatever failed rendering or saving the document (e.g. OSError), after logging it.
+    """
+    from .tracing import span, annotate
+
+    with span("create_lendo_credit_file", company_id=str(companyId), renderer=renderer):
+        with span("credit_file.load_data"):
+            values, approved_buyers = credit_file_values(load_credit_file_data(companyId), summary_data)
+
+        if output is None:
+            output = BytesIO()
+        output_name = output if isinstance(output, str) else "in-memory buffer"
+
+        # Save the document
+        try:
+            if renderer == "procedural":
+                with span("credit_file.render", renderer=renderer):
+                    document = build_credit_file_document(values, approved_buyers)
+                with span("credit_file.save"):
+                    document.save(output)
+            else:
+                get_credit_file_template().render(values, approved_buyers, output)
+        except Exception as e:
+            annotate(error=str(e))
+            logger.error("Saving credit file '%s' of companyId=%s failed: %s", output_name, companyId, e)
+            raise
+        logger.debug("Credit file '%s' of companyId=%s created", output_name, companyId)
+        return output
 
 # Call the function to create the document
 if __name__ == "__main__":
-    # Sample data for testing
+    # Regenerate the template after changing the procedural layout
+    if "--build-template" in sys.argv:
+        build_credit_file_template(CREDIT_FILE_TEMPLATE_PATH)
+        print(f"Template '{CREDIT_FILE_TEMPLATE_PATH}' created successfully.")
+        sys.exit(0)
+
+    # Sample data for testing (run as `python -m <package>.generate_credit_file` from the parent folder)
     summary_data = {
         "companyName": "شركة الأقتصاد الأفتراضي للتجارة",
         "crNumber": "1234567890",
@@ -867,4 +1071,5 @@ if __name__ == "__main__":
         "finalRecommendation": "Approve",
         "finalDecision": "Approved"
     }
-    create_lendo_credit_file(1742, summary_data)
\ No newline at end of file
+    output = create_lendo_credit_file(1742, summary_data)
+    print(f"Document '{output}' created successfully.")
\ No newline at end of file
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import logging
+import argparse
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+from .qawaem_loader import project_company, flatten_company
+from .simah_extraction import SIMAH_BUREAUS, extract_simah, simah_blocks
+
+logger = logging.getLogger(__name__)
+
+
+def organization_key(value: Any) -> str:
+    """Normalizes an organization id the way the snapshot indexes do."""
+    return str(value).strip()
+
+
+def year_key(value: Any) -> str:
+    """Normalizes a fiscal year, so 2023, 2023.0 and "2023" are the same year."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def validate_delta(company: Dict[str, Any]) -> None:
+    """
+    Checks a delta: a qawaem company with at least its organizationId and a
+    financialStatement list whose entries all have a year.
+
+    Raises:
+        ValueError: If the delta can't be applied.
+    """
+    if not isinstance(company, dict) or company.get("organizationId") in (None, ""):
+        raise ValueError("A delta needs an organizationId")
+    statements = company.get("financialStatement", [])
+    if not isinstance(statements, list) or any(
+        not isinstance(statement, dict) or statement.get("year") in (None, "") for statement in statements
+    ):
+        raise ValueError(f"Every financialStatement of organization {company['organizationId']} needs a year")
+
+
+def merge_company_records(records: List[Dict[str, Any]], company: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Upserts a delta into one company's flattened records, keyed on the year.
+
+    A year already present is replaced, a new year is appended. Company-level
+    fields are only taken from the delta when it has them: name, CR number,
+    the SIMAH blocks of a bureau it has rules for, and its non-empty bms fields
+    (on top of the current ones).
+
+    Args:
+        records: Current records of the company, empty for a new company.
+        company: The delta, projected and profiled (see `profile_deltas`).
+
+    Returns:
+        list: The company's new records.
+    """
+    delta_records = flatten_company(company)
+    if not records:
+        return delta_records
+
+    first = records[0]
+    identity = {
+        "companyName": company["companyName"] if "companyName" in company else first.get("companyName"),
+        "cr_number": company["commercialRegistrationNumber"] if "commercialRegistrationNumber" in company else first.get("cr_number"),
+        "organization_id": first.get("organization_id"),
+    }
+    simah = simah_blocks(*extract_simah(company))
+    blocks = {bureau: simah[bureau] if bureau in company else first.get(bureau) or {} for bureau in SIMAH_BUREAUS}
+    bms = dict(first.get("bms") or {})
+    bms.update((field, value) for field, value in (company.get("bms") or {}).items() if value is not None)
+
+    merged = list(records)
+    positions = {year_key(record.get("year")): i for i, record in enumerate(merged)}
+    for record in delta_records:
+        key = year_key(record.get("year"))
+        if key in positions:
+            merged[positions[key]] = record
+        else:
+            positions[key] = len(merged)
+            merged.append(record)
+
+    updated = []
+    for record in merged:
+        record = {**record, **identity, "bms": dict(bms)}
+        for bureau, block in blocks.items():
+            record[bureau] = dict(block)
+        updated.append(record)
+    return updated
+
+
+def profile_deltas(companies: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Projects deltas and merges their borrower profiles, as the full load does for every company."""
+    from .borrower_profile import iter_profiled_companies
+
+    return list(iter_profiled_companies(project_company(company) for company in companies))
+
+
+def group_deltas(companies: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Groups profiled deltas per organization id, in order of first appearance (later deltas win)."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for company in companies:
+        grouped.setdefault(organization_key(company.get("organizationId")), []).append(company)
+    return grouped
+
+
+def apply_company_deltas(records: List[Dict[str, Any]], deltas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Applies a company's deltas in order."""
+    for company in deltas:
+        records = merge_company_records(records, company)
+    return records
+
+
+def iter_with_deltas(
+    companies_records: Iterable[List[Dict[str, Any]]],
+    deltas: Dict[str, List[Dict[str, Any]]],
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields the flattened records of every company with the grouped deltas
+    applied; companies only found in the deltas come last.
+    """
+    pending = dict(deltas)
+    for company_records in companies_records:
+        if company_records and pending:
+            company_deltas = pending.pop(organization_key(company_records[0].get("organization_id")), None)
+            if company_deltas:
+                company_records = apply_company_deltas(company_records, company_deltas)
+        yield company_records
+
+    for company_deltas in pending.values():
+        company_records = apply_company_deltas([], company_deltas)
+        if company_records:
+            yield company_records
+
+
+# --- Deltas file ---
+
+def read_deltas(path: str, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Reads the deltas appended to the deltas file after `offset`.
+
+    Only complete lines are read, so a delta being written is picked up by the
+    next read. Lines that aren't valid deltas are logged and skipped.
+
+    Returns:
+        tuple: (deltas, offset just after the last complete line read)
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+
+    end = data.rfind(b"\n") + 1
+    deltas = []
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            company = json.loads(line)
+            validate_delta(company)
+        except ValueError as e:
+            logger.warning("Skipping an invalid line of %s: %s", path, e)
+            continue
+        deltas.append(company)
+    return deltas, offset + end
+
+
+def append_deltas(path: str, companies: List[Dict[str, Any]]) -> None:
+    """
+    Appends deltas to the deltas file, one JSON line each, in a single append
+    write so concurrent readers and writers never see part of a batch.
+
+    Raises:
+        ValueError: If a delta is invalid (nothing is written then).
+    """
+    for company in companies:
+        validate_delta(company)
+    payload = "".join(json.dumps(company, ensure_ascii=False, separators=(",", ":")) + "\n" for company in companies)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, payload.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def load_deltas(path: str) -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
+    """
+    Reads, profiles and groups every delta of the deltas file.
+
+    Returns:
+        tuple: (deltas per organization id, offset of the end of the last delta)
+    """
+    deltas, offset = read_deltas(path)
+    return group_deltas(profile_deltas(deltas)), offset
+
+
+# --- Upserts ---
+
+def upsert_companies(companies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Upserts new or restated fiscal years of some companies, keyed on
+    (organizationId, year), without reloading the portfolio.
+
+    The company database (if configured) is updated first, in one
+    transaction; then the deltas are appended to the deltas file
+    (QAWAEM_DELTAS_PATH), so every agent process picks them up and they are
+    replayed on the next full load, and the cached decisions of the changed
+    companies are dropped. A snapshot already loaded in this process is
+    updated in place of the changed companies only. If the database update
+    fails, nothing is applied; upserting the same deltas again is harmless.
+
+    Args:
+        companies: qawaem companies with an organizationId and the
+            financialStatement entries of the new or changed years.
+
+    Returns:
+        dict: Counts of the companies and years upserted.
+
+    Raises:
+        ValueError: If a delta is invalid (nothing is applied then).
+    """
+    from . import data_provider
+    from .company_db import CREDIT_DB_PATH, upsert_company_db
+    from .decision_cache import get_decision_cache
+
+    for company in companies:
+        validate_delta(company)
+
+    organization_ids = list(dict.fromkeys(organization_key(company["organizationId"]) for company in companies))
+    # The database rolls back on failure, so it goes first: the deltas file never holds deltas it lacks
+    database = bool(CREDIT_DB_PATH) and os.path.exists(CREDIT_DB_PATH)
+    if database:
+        upsert_company_db(CREDIT_DB_PATH, group_deltas(profile_deltas(companies)))
+
+    try:
+        append_deltas(data_provider.QAWAEM_DELTAS_PATH, companies)
+    except OSError:
+        if database:
+            logger.error(
+                "The company database has the upserted years of %d companies, but appending them to %s failed; upsert them again",
+                len(organization_ids), data_provider.QAWAEM_DELTAS_PATH,
+            )
+        raise
+
+    cache = get_decision_cache()
+    if cache is not None:
+        cache.forget_companies(organization_ids)
+
+    if data_provider._snapshot is not None:
+        data_provider.apply_new_deltas()
+
+    return {
+        "companies": len(organization_ids),
+        "years": sum(len(company.get("financialStatement", [])) for company in companies),
+    }
+
+
+def _read_delta_file(path: str) -> List[Dict[str, Any]]:
+    """Reads deltas from a qawaem payload ({"data": [...]}), a JSON list, a single company or JSON lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict) and isinstance(data.get("data"), list):
+        return data["data"]
+    return data if isinstance(data, list) else [data]
+
+
+# Upsert deltas (run as `python -m <package>.incremental_ingest delta.json` from the parent folder)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert new or restated fiscal years of some companies.")
+    parser.add_argument("files", nargs="+", help="qawaem JSON payloads, lists of companies or JSON lines files")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    companies = [company for path in args.files for company in _read_delta_file(path)]
+    try:
+        counts = upsert_companies(companies)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Upserted {counts['years']} fiscal years of {counts['companies']} companies "
+          f"in {time.perf_counter() - start:.2f} s.")
@@ -0,0 +1,260 @@
+import os
+import sys
+import time
+import logging
+import functools
+import threading
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from .tracing import span, annotate, latency_histograms
+
+logger = logging.getLogger(__name__)
+
+# Port of the Prometheus metrics endpoint (GET /metrics), started with the first tool call (0 disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Interface the metrics endpoint listens on (0.0.0.0 to be scraped from outside a container)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Prefix of every metric name
+METRICS_PREFIX = "credit_agent"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Tool names, registered by `instrumented_tool`; their spans are reported as tool latencies
+_tools: List[str] = []
+
+# Tool calls by (tool, result status)
+_tool_calls: Dict[Tuple[str, str], int] = {}
+_tool_calls_lock = threading.Lock()
+
+
+def record_tool_call(tool: str, status: str) -> None:
+    with _tool_calls_lock:
+        _tool_calls[(tool, status)] = _tool_calls.get((tool, status), 0) + 1
+
+
+def instrumented_tool(function: Callable) -> Callable:
+    """
+    Decorator for agent tools: every call is traced as a span named after the
+    tool and counted by result status ("Success", "Error", or "exception"), and
+    the first call starts the metrics endpoint.
+    """
+    name = function.__name__
+    _tools.append(name)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start_metrics_server()
+        status = "exception"
+        try:
+            with span(name):
+                result = function(*args, **kwargs)
+                status = result.get("status", "Success") if isinstance(result, dict) else "Success"
+                annotate(result_status=status)
+            return result
+        finally:
+            record_tool_call(name, status)
+    return wrapper
+
+
+# --- Exposition ---
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Exposition:
+    """Collects metric families and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> str:
+        name = f"{METRICS_PREFIX}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def sample(self, name: str, value: float, **labels: Any) -> None:
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def metric(self, name: str, kind: str, help_text: str, value: float, **labels: Any) -> None:
+        self.sample(self.family(name, kind, help_text), value, **labels)
+
+    def histograms(self, name: str, help_text: str, label: str, histograms: Dict[str, Dict[str, Any]]) -> None:
+        """Adds latency histograms from `tracing.latency_histograms` (ms) as one family in seconds."""
+        if not histograms:
+            return
+        family = self.family(name, "histogram", help_text)
+        for key, histogram in histograms.items():
+            for bound_ms, count in histogram["buckets"]:
+                self.sample(f"{family}_bucket", count, **{label: key, "le": _number(bound_ms / 1000)})
+            self.sample(f"{family}_sum", histogram["sum_ms"] / 1000, **{label: key})
+            self.sample(f"{family}_count", histogram["count"], **{label: key})
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _resident_memory_bytes() -> Optional[int]:
+    """Current RSS from /proc (Linux), None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_resident_memory_bytes() -> int:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def render_metrics() -> str:
+    """
+    Returns the current metrics in the Prometheus text format.
+
+    Only components already in use are reported: the data snapshot, decision
+    cache, email queue and SMTP pool are never created just to be measured.
+    """
+    from . import data_provider, decision_cache, email_queue, smtp_pool
+    from .reference_data import get_reference_data
+
+    out = _Exposition()
+    histograms = latency_histograms()
+
+    # Tools
+    with _tool_calls_lock:
+        tool_calls = dict(_tool_calls)
+    if tool_calls:
+        family = out.family("tool_calls_total", "counter", "Agent tool calls by result status.")
+        for (tool, status), count in sorted(tool_calls.items()):
+            out.sample(family, count, tool=tool, status=status)
+    out.histograms(
+        "tool_duration_seconds", "Latency of agent tool calls.", "tool",
+        {name: histogram for name, histogram in histograms.items() if name in _tools}
+    )
+    out.histograms(
+        "stage_duration_seconds",
+        "Latency of the stages of a tool call (snapshot build, credit file render/save, MIME, SMTP, ...).", "stage",
+        {name: histogram for name, histogram in histograms.items() if name not in _tools}
+    )
+
+    # Data snapshot
+    snapshot = data_provider._snapshot
+    if snapshot is not None:
+        out.metric("snapshot_age_seconds", "gauge", "Seconds since the data snapshot was loaded.", time.time() - snapshot.loaded_at)
+        out.metric("snapshot_companies", "gauge", "Companies in the data snapshot.", snapshot.store.company_count)
+        out.metric("snapshot_records", "gauge", "Company-year records in the data snapshot.", len(snapshot.store))
+
+    # Decision cache
+    cache = decision_cache._cache
+    if cache is not None:
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        out.metric("decision_cache_hits_total", "counter", "Decision cache hits.", stats["hits"])
+        out.metric("decision_cache_misses_total", "counter", "Decision cache misses.", stats["misses"])
+        out.metric("decision_cache_hit_ratio", "gauge", "Decision cache hits per lookup since start.", stats["hits"] / lookups if lookups else 0.0)
+        out.metric("decision_cache_entries", "gauge", "Decisions held in the cache.", stats["entries"])
+
+    # Reference data cache
+    stats = get_reference_data().stats()
+    out.metric("reference_data_entries", "gauge", "Per-BR reference files held in memory.", stats["entries"])
+    out.metric("reference_data_hits_total", "counter", "Reference data cache hits.", stats["hits"])
+    out.metric("reference_data_misses_total", "counter", "Reference data cache misses.", stats["misses"])
+
+    # Email queue and SMTP sessions
+    queue = email_queue._queue
+    if queue is not None:
+        stats = queue.stats()
+        out.metric("email_queue_depth", "gauge", "Emails queued or being retried, not yet sent or failed.", stats["pending"])
+        out.metric("emails_sent_total", "counter", "Emails delivered.", stats["sent"])
+        out.metric("emails_failed_total", "counter", "Emails that failed permanently.", stats["failed"])
+        out.metric("email_retries_total", "counter", "Delivery attempts that failed temporarily and were retried.", stats["retries"])
+    pool = smtp_pool._pool
+    if pool is not None:
+        stats = pool.stats()
+        out.metric("smtp_connects_total", "counter", "SMTP sessions opened.", stats["connects"])
+        out.metric("smtp_reuses_total", "counter", "Sends on a reused SMTP session.", stats["reuses"])
+        out.metric("smtp_idle_sessions", "gauge", "Idle SMTP sessions in the pool.", stats["idle"])
+
+    # Process
+    rss = _resident_memory_bytes()
+    if rss is not None:
+        out.metric("process_resident_memory_bytes", "gauge", "Resident memory of the agent process.", rss)
+    out.metric("process_peak_resident_memory_bytes", "gauge", "Peak resident memory of the agent process.", _peak_resident_memory_bytes())
+
+    return out.render()
+
+
+def _metrics_server(host: str, port: int) -> Any:
+    """Creates the HTTP server of the metrics endpoint (http.server is only imported here, it is slow to import)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            try:
+                body = render_metrics().encode("utf-8")
+            except Exception:
+                logger.exception("Rendering the metrics failed")
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    return server
+
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> Any:
+    """
+    Starts the metrics endpoint on a background thread, once per process.
+
+    Returns:
+        The server, or None if disabled (port 0) or the port is taken.
+    """
+    global _server, _server_started
+
+    if not _server_started:
+        with _server_lock:
+            if not _server_started:
+                _server_started = True
+                if port:
+                    try:
+                        _server = _metrics_server(host, port)
+                    except OSError as e:
+                        logger.warning("Metrics endpoint could not listen on %s:%s (%s), metrics are not served", host, port, e)
+                    else:
+                        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+                        logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return _server
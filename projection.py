@@ -0,0 +1,256 @@
+import re
+import json
+import numpy as np
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+from .columnar_store import CompanyYearStore, QAWAEM_FIELDS, TREND_RECORD_FIELDS
+from .simah_extraction import SIMAH_FIELDS, SIMAH_SLOTS
+
+# Fields every projected record keeps, so results can be attributed
+IDENTITY_FIELDS = ["companyName", "organization_id", "cr_number", "year"]
+
+# Nested blocks of a flattened record; a block name selects all of its fields
+RECORD_BLOCKS = ["qawaem", "commercial", "consumer", "bms", "trends"]
+
+YEAR_LATEST = "latest"
+YEAR_ALL = "all"
+
+# Rough bytes per token of JSON payloads, used for the approximate token count
+BYTES_PER_TOKEN = 4
+
+# Fields records can be filtered on; the numeric ones also support <, <=, > and >=
+NUMERIC_FILTER_FIELDS = QAWAEM_FIELDS + ["year"] + TREND_RECORD_FIELDS
+FILTER_FIELDS = NUMERIC_FILTER_FIELDS + SIMAH_SLOTS + [f"{field}_flag" for field in SIMAH_SLOTS]
+
+# Filter operator -> comparison; "==" is accepted as "="
+FILTER_OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "=": np.equal,
+    "!=": np.not_equal,
+}
+
+FILTER_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$")
+
+
+def parse_year(year: Union[str, int] = YEAR_LATEST) -> Union[str, int]:
+    """
+    Normalizes a year mode to "latest", "all" or a fiscal year (int).
+
+    Raises:
+        ValueError: If `year` is not a valid year mode.
+    """
+    year = str(year).strip().lower()
+    if year in (YEAR_LATEST, YEAR_ALL):
+        return year
+    try:
+        return int(year)
+    except ValueError:
+        raise ValueError(f"Invalid year '{year}', use 'latest', 'all' or a fiscal year like 2023") from None
+
+
+def select_year_rows(store: CompanyYearStore, year: Union[str, int] = YEAR_LATEST) -> np.ndarray:
+    """
+    Returns the store rows for a year mode.
+
+    Args:
+        year: "latest" (most recent year of every company), "all", or a specific fiscal year.
+
+    Raises:
+        ValueError: If `year` is not a valid year mode.
+    """
+    year = parse_year(year)
+    if year == YEAR_LATEST:
+        mask = store.latest_year_mask()
+    elif year == YEAR_ALL:
+        mask = np.ones(len(store), dtype=bool)
+    else:
+        mask = store.year == year
+    return np.flatnonzero(mask)
+
+
+def parse_filters(filters: Optional[List[str]]) -> List[Tuple[str, str, Any]]:
+    """
+    Parses record filters such as "dscr < 1.5" or "dpd_commercial_flag = RED".
+
+    Returns:
+        list: (field, operator, value) per filter; values of the numeric fields
+        are parsed as float, SIMAH values and flags stay text (flags
+        upper-cased) and quotes around text values are dropped.
+
+    Raises:
+        ValueError: If a filter can't be parsed, or its field or operator isn't supported.
+    """
+    parsed = []
+    for text in filters or []:
+        match = FILTER_PATTERN.match(str(text))
+        if not match:
+            raise ValueError(f"Invalid filter '{text}', use '<field> <operator> <value>' like 'dscr < 1.5'")
+        field, operator, raw = match.groups()
+        operator = "=" if operator == "==" else operator
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field '{field}'")
+
+        raw = raw.strip("'\"")
+        if field in NUMERIC_FILTER_FIELDS:
+            try:
+                value = float(raw)
+            except ValueError:
+                raise ValueError(f"Filter '{text}' needs a number") from None
+        elif operator not in ("=", "!="):
+            raise ValueError(f"Filter '{text}': '{field}' only supports = and !=")
+        else:
+            value = raw.upper() if field.endswith("_flag") else raw
+        parsed.append((field, operator, value))
+    return parsed
+
+
+def filter_rows(store: CompanyYearStore, rows: np.ndarray, filters: List[Tuple[str, str, Any]]) -> np.ndarray:
+    """
+    Keeps the rows matching every parsed filter. Missing values never match,
+    as in SQL, so "dscr != 1" skips records without a DSCR. Text fields
+    (SIMAH values and flags) are compared as text.
+    """
+    for field, operator, value in filters:
+        column = store.column(field)[rows]
+        if column.dtype == object:
+            present = np.array([item is not None for item in column], dtype=bool)
+            column = np.array([str(item) for item in column], dtype=object)
+        else:
+            present = ~np.isnan(column)
+        rows = rows[present & FILTER_OPERATORS[operator](column, value)]
+    return rows
+
+
+def page_bounds(page: int = 1, page_size: Optional[int] = None) -> Tuple[int, Optional[int]]:
+    """
+    Returns the (offset, limit) of a 1-based page; no page size means everything.
+
+    Raises:
+        ValueError: If page or page_size is below 1.
+    """
+    if int(page) < 1 or (page_size is not None and int(page_size) < 1):
+        raise ValueError("page and page_size must be at least 1")
+    if page_size is None:
+        return 0, None
+    return (int(page) - 1) * int(page_size), int(page_size)
+
+
+def page_info(page: int, page_size: int, total: int) -> Dict[str, int]:
+    """Describes a page of results, returned alongside paged records."""
+    return {"page": int(page), "page_size": int(page_size), "total_records": total, "total_pages": -(-total // int(page_size))}
+
+
+def select_fields(fields: List[str], block_fields: Dict[str, Iterable[str]]) -> Dict[str, List[str]]:
+    """
+    Resolves requested field and block names to the fields to keep per record block.
+
+    Args:
+        fields: Field names (e.g. "dscr", "dpd_commercial_flag", "nitaqatColor")
+            or block names ("qawaem", "commercial", "consumer", "bms", "trends").
+        block_fields: The fields records have, per block.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    block_fields = {block: dict.fromkeys(block_fields.get(block) or []) for block in RECORD_BLOCKS}
+
+    selected = {block: [] for block in RECORD_BLOCKS}
+    for field in fields:
+        if field in IDENTITY_FIELDS:
+            continue
+        if field in block_fields:
+            selected[field].extend(block_fields[field])
+            continue
+        block = next((block for block in RECORD_BLOCKS if field in block_fields[block]), None)
+        if block is None:
+            raise ValueError(f"Unknown field '{field}'")
+        selected[block].append(field)
+    return {block: list(dict.fromkeys(block_selection)) for block, block_selection in selected.items()}
+
+
+def project_records(records: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Keeps only the requested fields of flattened records (plus the identity fields).
+
+    Args:
+        fields: Field or block names, see `select_fields`. None keeps everything.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    if not fields or not records:
+        return records
+
+    block_fields = {block: {} for block in RECORD_BLOCKS}
+    for block in RECORD_BLOCKS:
+        for record in records:
+            for field in record.get(block) or {}:
+                block_fields[block][field] = True
+    selected = select_fields(fields, block_fields)
+
+    projected = []
+    for record in records:
+        item = {field: record.get(field) for field in IDENTITY_FIELDS}
+        for block, block_selection in selected.items():
+            if block_selection:
+                source = record.get(block) or {}
+                item[block] = {field: source.get(field) for field in block_selection}
+        projected.append(item)
+    return projected
+
+
+def project_store_records(store: CompanyYearStore, rows: np.ndarray, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Materializes store rows with only the requested fields (plus the identity
+    fields), without building the full records first. Same result as
+    `project_records(store.to_records(rows), fields)`.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    if not fields or not len(rows):
+        return store.to_records(rows)
+
+    companies = np.unique(store.company_index[rows])
+    block_fields = {
+        "qawaem": QAWAEM_FIELDS,
+        "trends": TREND_RECORD_FIELDS,
+        # Only the bms fields of these companies, as `project_records` would see them
+        "bms": [field for company in companies for field in store.bms[company]],
+    }
+    for bureau, bureau_fields in SIMAH_FIELDS.items():
+        block_fields[bureau] = [name for field in bureau_fields for name in (field, f"{field}_flag")]
+    return store.to_records(rows, select_fields(fields, block_fields))
+
+
+def to_table(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Encodes records as one header row plus value rows, instead of repeating the
+    keys in every record. Nested blocks are flattened into their field names.
+    """
+    columns = {}
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, dict):
+                for field in value:
+                    columns.setdefault(field, (key, field))
+            else:
+                columns.setdefault(key, (None, key))
+
+    rows = []
+    for record in records:
+        row = []
+        for block, field in columns.values():
+            source = (record.get(block) or {}) if block else record
+            row.append(source.get(field))
+        rows.append(row)
+
+    return {"columns": list(columns), "rows": rows}
+
+
+def payload_size(data: Any) -> Dict[str, int]:
+    """Returns the serialized size of a tool payload in bytes and approximate tokens."""
+    size = len(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    return {"bytes": size, "approx_tokens": -(-size // BYTES_PER_TOKEN)}
@@ -0,0 +1,149 @@
+import json
+from typing import Dict, Any, Iterator, List
+from .simah_extraction import extract_simah, simah_blocks
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Fields of a qawaem company that `Lendo_Credit_Decision_Engine` projects.
+# Everything else (incomeStatement, changesInEquity, editorsReport, ...) is
+# dropped as soon as a company has been parsed.
+COMPANY_FIELDS = ["companyName", "commercialRegistrationNumber", "organizationId", "bms"]
+SIMAH_RULE_FIELDS = ["parameterName", "parameterValue", "flag"]
+STATEMENT_FIELDS = ["year", "totalEquity"]
+PROFIT_AND_LOSS_FIELDS = ["netProfit", "totalRevenue", "operatingProfitLoss"]
+CASHFLOW_FIELDS = ["netCashFlowsFromUsedInOperatingActivities"]
+
+# bms block of a flattened record for a borrower without bms data. Fields
+# found in the borrower's bms / credit-file-data files override these.
+BMS_DEFAULTS = {
+    "nitaqatColor": "Low Green",
+    "yearsInBusiness": "2016-03-18",
+    "market": "Local Market (Including GCC)",
+    "industry": "Information & Communication, Arts & Recreation",
+    "typeOfCustomer": "Govt. & Semi Govt. Entities, and well-known Corporation",
+    "customerConcentration": 0,
+    "changeInOwnership": "No",
+    "changeInManagement": "No",
+    "breachInFinancialCovenant": "No",
+    "delayedAfs": "No",
+}
+
+
+def _pick(source: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {field: source[field] for field in fields if field in source}
+
+
+def project_company(company: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keeps only the fields of a qawaem company that are used to build the
+    flattened company-year records.
+    """
+    projected = _pick(company, COMPANY_FIELDS)
+
+    for bureau in ("commercial", "consumer"):
+        bureau_data = company.get(bureau)
+        if bureau_data and "rules" in bureau_data:
+            projected[bureau] = {
+                "rules": [_pick(rule, SIMAH_RULE_FIELDS) for rule in bureau_data["rules"]]
+            }
+
+    statements = []
+    for yearly_data in company.get("financialStatement", []):
+        statement = _pick(yearly_data, STATEMENT_FIELDS)
+        statement["profitAndLoss"] = _pick(yearly_data.get("profitAndLoss") or {}, PROFIT_AND_LOSS_FIELDS)
+        statement["cashflow"] = _pick(yearly_data.get("cashflow") or {}, CASHFLOW_FIELDS)
+        statement["ratios"] = {
+            "financialSpreading": dict((yearly_data.get("ratios") or {}).get("financialSpreading") or {})
+        }
+        statements.append(statement)
+    projected["financialStatement"] = statements
+
+    return projected
+
+
+def flatten_company(company: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flattens one qawaem company into one record per fiscal year, in the shape
+    returned by `Lendo_Credit_Decision_Engine`.
+    """
+    simplified_data = []
+
+    company_name = company.get("companyName", "Unknown")
+    cr_number = company.get("commercialRegistrationNumber", "")
+    organization_id = company.get("organizationId", "")
+    financial_statements = company.get("financialStatement", [])
+    bms = company.get("bms") or {}
+
+    # bms fields of the borrower profile (see borrower_profile.py), the defaults for the rest
+    bms_block = dict(BMS_DEFAULTS)
+    bms_block.update((field, value) for field, value in bms.items() if value is not None)
+
+    # SIMAH values and flags of both bureaus, in one pass over their rules
+    simah = simah_blocks(*extract_simah(company))
+
+    for yearly_data in financial_statements:
+        year = yearly_data.get("year", "")
+        ratios = yearly_data.get("ratios", {})
+        spreading = ratios.get("financialSpreading", {})
+        profit_loss = yearly_data.get("profitAndLoss", {})
+        cashflow = yearly_data.get("cashflow", {})
+
+
+        simplified_data.append({
+            "companyName": company_name,
+            "cr_number": cr_number,
+            "organization_id": organization_id,
+            "year": year,
+            "qawaem": {"netProfit": profit_loss.get("netProfit", 0),
+            "revenue": profit_loss.get("totalRevenue", 0),
+            "operatingProfit": profit_loss.get("operatingProfitLoss", 0),
+            "cashFlowFromOperatingActivities": cashflow.get("netCashFlowsFromUsedInOperatingActivities", 0),
+            "currentRatio": spreading.get("currentRatio", 0),
+            "dscr": spreading.get("dscr", 0),
+            "debtRatio": spreading.get("debtRatio", 0),
+            "netProfitMargin": spreading.get("netProfitMargin", 0),
+            "netProfitMarginGrowth":spreading.get("npmGrowth", 0),
+            "grossProfitMargin": spreading.get("grossProfitMargin", 0),
+            "grossProfitMarginGrowth":spreading.get("gpmGrowth", 0),
+            "leverageRatio": spreading.get("leverageRatio", 0),
+            "gearingRatio": spreading.get("gearingRatio", 0),
+            "totalEquity": yearly_data.get("totalEquity",0),
+            "revenueGrowth":spreading.get("revenueGrowth", 0),
+            "interestCoverage": spreading.get("interestCoverage", 0),
+            "externalDebtSales": spreading.get("externalDebtSalesRatio", 0),
+            "receivablePercentageSales": spreading.get("receivablePercentageSales", 0),
+            "daysSalesOutstanding": spreading.get("daysSalesOutstanding", 0),
+
+            },
+            "commercial": dict(simah["commercial"]),
+            "consumer": dict(simah["consumer"]),
+            "bms": dict(bms_block),
+        })
+
+    return simplified_data
+
+
+def iter_qawaem_companies(file_path: str, streaming: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the projected companies of a qawaem payload one at a time.
+
+    Args:
+        file_path: Path to the qawaem JSON payload ({"data": [company, ...]}).
+        streaming: Parse `data[*]` incrementally with ijson so that only one
+            company is resident at a time. Falls back to `json.load` of the
+            whole file when ijson is not installed or streaming is False.
+    """
+    if streaming and ijson is not None:
+        with open(file_path, "rb") as f:
+            for company in ijson.items(f, "data.item", use_float=True):
+                yield project_company(company)
+        return
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        qawaem_data = json.load(f)
+
+    for company in qawaem_data.get("data", []):
+        yield project_company(company)
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import errno
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional
+from .data_provider import BMS_DIR, SIMAH_COMMERCIAL_DIR, SIMAH_CONSUMER_DIR, CREDIT_FILE_DATA_DIR
+
+# Per-BR reference files: kind -> directory of BR{id}.json files
+REFERENCE_DIRS = {
+    "credit_file": CREDIT_FILE_DATA_DIR,
+    "bms": BMS_DIR,
+    "simah_commercial": SIMAH_COMMERCIAL_DIR,
+    "simah_consumer": SIMAH_CONSUMER_DIR,
+}
+
+# Maximum number of parsed files kept, the least recently used ones are evicted beyond it
+REFERENCE_DATA_CACHE_SIZE = int(os.getenv("REFERENCE_DATA_CACHE_SIZE", "1024"))
+
+# Minimum seconds between two mtime checks of a cached file (0 checks on every access)
+REFERENCE_DATA_CHECK_INTERVAL = float(os.getenv("REFERENCE_DATA_CHECK_INTERVAL", "1"))
+
+# Threads loading the files of a prefetch; the loads are I/O bound, so more threads than cores pays off
+REFERENCE_DATA_PREFETCH_WORKERS = int(os.getenv("REFERENCE_DATA_PREFETCH_WORKERS", "8"))
+
+# Cached in place of the data of a file that doesn't exist, so looking it up again doesn't hit the disk either
+_MISSING = object()
+
+
+def reference_path(kind: str, br: Any) -> str:
+    """Returns the path of the BR{br}.json file of a kind (credit_file, bms, simah_commercial, simah_consumer)."""
+    return os.path.join(REFERENCE_DIRS[kind], f"BR{br}.json")
+
+
+class ReferenceDataCache:
+    """
+    LRU cache of parsed per-BR reference files.
+
+    A cached file is served from memory until its mtime/size changes, which is
+    checked at most every `check_interval` seconds; a missing file is cached as
+    missing and checked the same way. The parsed JSON is shared between callers
+    and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = REFERENCE_DATA_CACHE_SIZE, check_interval: float = REFERENCE_DATA_CHECK_INTERVAL):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+
+        # (kind, br) -> {"data", "stat", "checked_at"}, the most recently used last
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, kind: str, br: Any, evict: bool = True) -> Any:
+        """
+        Returns the parsed BR{br}.json of a kind.
+
+        Args:
+            evict: Make room for a newly loaded file by evicting the least
+                recently used ones. If False, it is only kept while the cache
+                has room, so bulk loads (e.g. a snapshot build) don't flush it.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist.
+        """
+        key = (kind, str(br).strip())
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["checked_at"] < self.check_interval:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._data(key, entry)
+
+        path = reference_path(kind, key[1])
+        try:
+            stat = os.stat(path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stat = None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["stat"] == stat:
+                entry["checked_at"] = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._data(key, entry)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+
+        if stat is None:
+            data = _MISSING
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+        entry = {"data": data, "stat": stat, "checked_at": now}
+        with self._lock:
+            if evict or key in self._entries or len(self._entries) < self.max_entries:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return self._data(key, entry)
+
+    @staticmethod
+    def _data(key: tuple, entry: Dict[str, Any]) -> Any:
+        if entry["data"] is _MISSING:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), reference_path(*key))
+        return entry["data"]
+
+    def get_optional(self, kind: str, br: Any, default: Any = None, evict: bool = True) -> Any:
+        """Returns the parsed BR{br}.json of a kind, or `default` if the file doesn't exist (see `get`)."""
+        try:
+            return self.get(kind, br, evict)
+        except FileNotFoundError:
+            return default
+
+    def prefetch(self, brs: Iterable[Any], kinds: Optional[List[str]] = None, workers: int = REFERENCE_DATA_PREFETCH_WORKERS) -> int:
+        """
+        Warms the cache with the files of the given BR ids, loaded on a thread pool.
+
+        Args:
+            brs: BR (organization) ids.
+            kinds: Kinds to load, default all of REFERENCE_DIRS.
+            workers: Threads loading the files.
+
+        Returns:
+            int: Number of files available in the cache (missing files are cached as missing).
+        """
+        kinds = kinds or list(REFERENCE_DIRS)
+        keys = [(kind, br) for br in brs for kind in kinds]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reference-prefetch") as pool:
+            found = pool.map(lambda key: self.get_optional(*key, default=_MISSING) is not _MISSING, keys)
+            return sum(found)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+
+_cache = ReferenceDataCache()
+
+
+def get_reference_data() -> ReferenceDataCache:
+    """Returns the shared reference data cache."""
+    return _cache
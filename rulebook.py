@@ -0,0 +1,141 @@
+import hashlib
+import numpy as np
+from typing import Dict, Any, List
+from .columnar_store import CompanyYearStore
+
+# Bump whenever a threshold or rule below changes, so anything derived from a
+# rulebook result can tell it was produced by an older rulebook.
+RULEBOOK_VERSION = "4"
+
+# Minimum share of rules (in %) that must be met for a recommendation
+RECOMMENDATION_THRESHOLD = 60.0
+
+RECOMMENDED = "RECOMMENDED, Credit officier needs evaluate some of the ratios"
+NOT_RECOMMENDED = "NOT RECOMMENDED"
+
+# Financial RULEBOOK criteria: (rule name, qawaem field, comparison, threshold)
+FINANCIAL_RULES = [
+    ("Revenue > SAR 1,000,000", "revenue", np.greater, 1_000_000),
+    ("Operating Profit > 0", "operatingProfit", np.greater, 0),
+    ("DSCR ≥ 1.5", "dscr", np.greater_equal, 1.5),
+    ("Gearing Ratio ≤ 1.7", "gearingRatio", np.less_equal, 1.7),
+    ("Leverage Ratio (Asset Heavy) ≤ 2.0", "leverageRatio", np.less_equal, 2.0),
+    ("Current Ratio ≥ 1.2", "currentRatio", np.greater_equal, 1.2),
+    ("External Debt / Sales < 50%", "externalDebtSales", np.less, 0.5),
+    ("Total Equity > SAR 100,000", "totalEquity", np.greater, 100_000),
+]
+
+YEARS_OF_DATA_RULE = "Has at least 2 years of data"
+MIN_YEARS_OF_DATA = 2
+
+# Credit history criteria: (rule name, SIMAH parameters whose flag must not be RED)
+CREDIT_HISTORY_RULES = [
+    ("Credit History: No 30+ dpd", ["dpd_commercial", "dpd_consumer"]),
+    ("Credit History: ≤ 5 bounced cheques ≤ 250K", ["bounced_cheque_commercial", "bounced_cheque_consumer"]),
+    ("Credit History: No unsettled defaults or court cases", [
+        "unsettled_commercial",
+        "court_cases_commercial",
+        "unsettled_consumer",
+        "court_cases_consumer",
+    ]),
+]
+
+RULE_NAMES = (
+    [YEARS_OF_DATA_RULE]
+    + [rule[0] for rule in FINANCIAL_RULES]
+    + [rule[0] for rule in CREDIT_HISTORY_RULES]
+)
+
+# Identifies this rulebook in cached decisions: the version plus a digest of the
+# rule tables, so editing a threshold invalidates them even without a version bump
+RULEBOOK_ID = RULEBOOK_VERSION + "-" + hashlib.sha256(repr((
+    FINANCIAL_RULES, CREDIT_HISTORY_RULES, MIN_YEARS_OF_DATA, RECOMMENDATION_THRESHOLD, RECOMMENDED, NOT_RECOMMENDED
+)).encode("utf-8")).hexdigest()[:12]
+
+
+def evaluate_rulebook_columns(store: CompanyYearStore) -> Dict[str, np.ndarray]:
+    """
+    Evaluates every RULEBOOK rule for all company-years of the store at once.
+
+    Returns:
+        dict: {
+            "met": bool matrix (company-years x RULE_NAMES),
+            "percentage_met": float64 array,
+            "credit_history_violated": bool array,
+            "recommended": bool array
+        }
+    """
+    # Years of data is counted per company: its distinct fiscal years, computed at load
+    rule_results = [store.year_count[store.company_index] >= MIN_YEARS_OF_DATA]
+
+    # NaN comparisons are False, so missing data counts as a violated rule
+    for _, field, compare, threshold in FINANCIAL_RULES:
+        rule_results.append(compare(store.qawaem[field], threshold))
+
+    credit_history_results = []
+    for _, fields in CREDIT_HISTORY_RULES:
+        is_red = np.zeros(len(store), dtype=bool)
+        for field in fields:
+            is_red |= store.flag_is(field, "RED")
+        credit_history_results.append(~is_red)
+    rule_results.extend(credit_history_results)
+
+    met = np.column_stack(rule_results)
+    percentage_met = met.mean(axis=1) * 100
+    credit_history_violated = ~np.column_stack(credit_history_results).all(axis=1)
+    recommended = ~credit_history_violated & (percentage_met >= RECOMMENDATION_THRESHOLD)
+
+    return {
+        "met": met,
+        "percentage_met": percentage_met,
+        "credit_history_violated": credit_history_violated,
+        "recommended": recommended,
+    }
+
+
+def evaluate_rulebook(store: CompanyYearStore, all_years: bool = False, by_company: bool = False) -> List[Any]:
+    """
+    Applies the RULEBOOK and the Partial Acceptance Criteria to the
+    company-years of a columnar store.
+
+    Args:
+        store: Company-year records, e.g. the data snapshot's store.
+        all_years: If False (default), only the most recent year of every
+            company is reported. Older years are still used for the
+            "at least 2 years of data" rule.
+        by_company: Return one list of results per company of the store
+            instead of one flat list.
+
+    Returns:
+        list: One result dict per reported company-year (a list of them per
+        company with `by_company`).
+    """
+    if len(store) == 0:
+        return []
+
+    evaluation = evaluate_rulebook_columns(store)
+
+    rows = np.arange(len(store))
+    if not all_years:
+        rows = rows[store.latest_year_mask()]
+
+    results = []
+    for row in rows:
+        met = evaluation["met"][row]
+        results.append({
+            "companyName": store.value(row, "companyName"),
+            "organization_id": store.value(row, "organization_id"),
+            "cr_number": store.value(row, "cr_number"),
+            "year": store.value(row, "year"),
+            "rules_met": [name for name, ok in zip(RULE_NAMES, met) if ok],
+            "rules_violated": [name for name, ok in zip(RULE_NAMES, met) if not ok],
+            "rules_met_count": int(met.sum()),
+            "rules_violated_count": int((~met).sum()),
+            "percentage_met": round(float(evaluation["percentage_met"][row]), 2),
+            "credit_history_violated": bool(evaluation["credit_history_violated"][row]),
+            "recommendation": RECOMMENDED if evaluation["recommended"][row] else NOT_RECOMMENDED,
+        })
+
+    if by_company:
+        return store.group_by_company(rows, results)
+    return results
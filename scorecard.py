@@ -0,0 +1,296 @@
+import hashlib
+import numpy as np
+from datetime import date
+from typing import Dict, Any, List, Optional
+from .columnar_store import CompanyYearStore, SIMAH_FIELDS, _to_float
+
+# Bump whenever a band, score or grade below changes
+SCORECARD_VERSION = "4"
+
+MAX_SCORE = 106
+
+# Numeric banded criteria, evaluated with np.digitize:
+# (criterion, record block, field, band edges, score per band, right)
+# `scores` has one more entry than `edges`; with right=False a band is
+# edges[i-1] <= value < edges[i], with right=True it is edges[i-1] < value <= edges[i].
+# Missing values (NaN) are not scored.
+NUMERIC_CRITERIA = [
+    ("Revenue Growth", "qawaem", "revenueGrowth", [-10, 0, 5, 30], [-2, -1, 1, 3, 4], False),
+    ("GPM Growth", "qawaem", "grossProfitMarginGrowth", [3], [0.75, 0], False),
+    ("NPM", "qawaem", "netProfitMargin", [0, 5, 15], [-6, -0.75, 1.5, 3], False),
+    ("NPM Growth", "qawaem", "netProfitMarginGrowth", [-20, 0, 3, 20], [-3, -1.5, 0.75, 2.25, 3], False),
+    ("Cash Flow From Operations", "qawaem", "cashFlowFromOperatingActivities", [0], [-2, 2], False),
+    ("Current Ratio", "qawaem", "currentRatio", [1, 4], [-2, 1.5, 2], False),
+    ("Leverage Ratio", "qawaem", "leverageRatio", [1, 2], [-2, 1, 2], False),
+    ("Interest Coverage", "qawaem", "interestCoverage", [1, 4], [-2, 1.5, 2], False),
+    ("DSCR", "qawaem", "dscr", [1, 2], [-2, 1, 2], False),
+    ("Days Sales Outstanding", "qawaem", "daysSalesOutstanding", [120, 180, 270], [2, 0, -1, -2], False),
+    # Receivable % of sales and External Debt / Sales are fractions (0.5 == 50%)
+    ("Receivable Percentage Sales", "qawaem", "receivablePercentageSales", [0.5, 0.7, 1.0], [2, 0, -1, -2], True),
+    ("External Debt Sales Ratio", "qawaem", "externalDebtSales", [0.25, 0.5], [2, 0, -1], True),
+    ("Type of Customer (number of customers)", "bms", "numberOfCustomers", [5, 20], [1.25, 3.75, 5], True),
+]
+
+# Categorical criteria: (criterion, record block, field, [(keyword, score)], exact)
+# The first keyword found in the (lower-cased) value wins; with exact=True the
+# value must equal the keyword. Values matching no keyword are not scored.
+CATEGORICAL_CRITERIA = [
+    ("Nitaqat Color", "bms", "nitaqatColor", [
+        ("platinum", 2), ("بلاتيني", 2),
+        ("red", -4), ("أحمر", -4),
+        ("yellow", -2), ("أصفر", -2),
+        ("green", 0), ("أخضر", 0),
+    ], False),
+    ("Market", "bms", "market", [
+        ("excluding gcc", 1.5),
+        (">25%", -1.5),
+        ("local market", 3),
+    ], False),
+    ("Industry", "bms", "industry", [
+        ("information & communication", 7), ("arts & recreation", 7),
+        ("mining", 6), ("utilities", 6), ("food", 6), ("finance", 6), ("education", 6), ("prof. services", 6),
+        ("health", 5), ("retail", 5), ("motor repai", 5),
+        ("agriculture", 3.5), ("forestry", 3.5), ("manufacturing", 3.5), ("transport", 3.5), ("real estate", 3.5),
+        ("water supply", 2), ("waste mgmt", 2), ("defense", 2), ("other services", 2), ("households", 2),
+    ], False),
+    ("Inventory Liquid Management", "bms", "inventoryManagement", [
+        ("concerning", -3),
+        ("n.a.", 3),
+        ("uncertain", 1.5),
+        ("ready for sale", 3),
+    ], False),
+    ("Access to Additional Fund", "bms", "accessToAdditionalFund", [
+        ("no access", 0),
+        ("proven access to fi", 1),
+        ("proven support", 2),
+    ], False),
+    ("Control over cash flow", "bms", "controlOverCashFlow", [
+        ("full control", 1.25),
+        ("third party", 1.05),
+        ("by client", 1.01),
+        ("no control", 1),
+    ], False),
+    ("Relationship with Lendo", "bms", "relationshipWithLendo", [
+        ("no relationship", 1),
+        ("frequent pds", 0.75),
+        ("some pds", 1.05),
+        ("timely repayments", 1.15),
+    ], False),
+    ("Change in Ownership", "bms", "changeInOwnership", [("no", 1), ("yes", 0.9)], True),
+    ("Change in Management", "bms", "changeInManagement", [("no", 1), ("yes", 0.9)], True),
+    ("Breach in Financial Covenants", "bms", "breachInFinancialCovenant", [("no", 1), ("yes", 0.9)], True),
+    ("Delayed AFS", "bms", "delayedAfs", [("no", 1), ("yes", 0.9)], True),
+]
+
+# Growth criteria scored on the growth computed from the statements (the trend features of
+# columnar_store.TREND_FIELDS), since financialSpreading often only has it for the latest year.
+# financialSpreading is the fallback for a year without the prior fiscal year.
+# qawaem field -> trend field
+GROWTH_TREND_FIELDS = {
+    "revenueGrowth": "revenue",
+    "grossProfitMarginGrowth": "grossProfitMargin",
+    "netProfitMarginGrowth": "netProfitMargin",
+}
+
+YEARS_IN_BUSINESS_CRITERION = "Years in Business"
+YEARS_IN_BUSINESS_EDGES = [3, 10]
+YEARS_IN_BUSINESS_SCORES = [-1, 3, 4]
+# Score for < 3 years in business with positive NPM growth
+YOUNG_BUSINESS_NPM_GROWTH_SCORE = 1.4
+
+BOUNCED_CHEQUES_CRITERION = "Unsettled Bounced Cheques / Court Cases"
+ALL_FLAGS_GREEN_CRITERION = "All flags are green"
+ALL_FLAGS_GREEN_SCORE = 7
+
+BOUNCED_CHEQUE_FIELDS = ["bounced_cheque_commercial", "bounced_cheque_consumer"]
+COURT_CASES_FIELDS = ["court_cases_commercial", "court_cases_consumer"]
+ALL_FLAG_FIELDS = [field for fields in SIMAH_FIELDS.values() for field in fields]
+
+# Grades: lower score bound of every grade after "R"
+GRADE_EDGES = [40, 50, 60, 70, 90]
+GRADES = ["R", "D", "C", "B", "A", "A+"]
+
+CRITERIA_NAMES = (
+    [YEARS_IN_BUSINESS_CRITERION]
+    + [criterion[0] for criterion in CATEGORICAL_CRITERIA]
+    + [BOUNCED_CHEQUES_CRITERION, ALL_FLAGS_GREEN_CRITERION]
+    + [criterion[0] for criterion in NUMERIC_CRITERIA]
+)
+
+# Identifies this scorecard in cached decisions: the version plus a digest of the
+# criteria tables, so editing a band invalidates them even without a version bump
+SCORECARD_ID = SCORECARD_VERSION + "-" + hashlib.sha256(repr((
+    NUMERIC_CRITERIA, CATEGORICAL_CRITERIA, GROWTH_TREND_FIELDS, YEARS_IN_BUSINESS_EDGES, YEARS_IN_BUSINESS_SCORES,
+    YOUNG_BUSINESS_NPM_GROWTH_SCORE, ALL_FLAGS_GREEN_SCORE, BOUNCED_CHEQUE_FIELDS, COURT_CASES_FIELDS,
+    GRADE_EDGES, GRADES, MAX_SCORE
+)).encode("utf-8")).hexdigest()[:12]
+
+
+def _years_since(value: Any, as_of: date) -> float:
+    """Returns the number of years between an ISO date string and `as_of`."""
+    try:
+        started = date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return np.nan
+    return (as_of - started).days / 365.25
+
+
+def score_numeric(values: np.ndarray, edges: List[float], scores: List[float], right: bool = False) -> np.ndarray:
+    """Buckets values into bands and returns the band scores (NaN where value is missing)."""
+    band_scores = np.asarray(scores, dtype=np.float64)[np.digitize(values, edges, right=right)]
+    band_scores[np.isnan(values)] = np.nan
+    return band_scores
+
+
+def score_categorical(values: np.ndarray, keywords: List[tuple], exact: bool = False) -> np.ndarray:
+    """Scores categorical values by keyword, matching every distinct value only once."""
+    distinct = {}
+    codes = np.fromiter((distinct.setdefault(value, len(distinct)) for value in values), dtype=np.int64, count=len(values))
+    distinct_scores = np.full(len(distinct), np.nan)
+
+    for value, code in distinct.items():
+        if value is None:
+            continue
+        value = str(value).strip().lower()
+        for keyword, score in keywords:
+            if (value == keyword) if exact else (keyword in value):
+                distinct_scores[code] = score
+                break
+
+    return distinct_scores[codes]
+
+
+def assign_grades(total_scores: np.ndarray) -> np.ndarray:
+    """Maps total scores to A+/A/B/C/D/R grades."""
+    return np.asarray(GRADES, dtype=object)[np.digitize(total_scores, GRADE_EDGES)]
+
+
+def _flag_is_any(store: CompanyYearStore, fields: List[str], flag: str) -> np.ndarray:
+    is_flag = np.zeros(len(store), dtype=bool)
+    for field in fields:
+        is_flag |= store.flag_is(field, flag)
+    return is_flag
+
+
+def _numeric_column(store: CompanyYearStore, block: str, field: str) -> np.ndarray:
+    if block == "qawaem" and field in GROWTH_TREND_FIELDS:
+        computed = store.yoy_growth[GROWTH_TREND_FIELDS[field]]
+        return np.where(np.isnan(computed), store.qawaem[field], computed)
+    if block == "qawaem":
+        return store.qawaem[field]
+    per_company = np.array([_to_float(value) for value in store.bms_company_column(field)], dtype=np.float64)
+    return per_company[store.company_index]
+
+
+def evaluate_scorecard_columns(store: CompanyYearStore, as_of: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """
+    Evaluates every scorecard criterion for all company-years of the store at once.
+
+    Returns:
+        dict: {
+            "values": list of row-aligned columns (one per CRITERIA_NAMES) of the values scored,
+            "scores": float64 matrix of criterion scores (NaN when not scored),
+            "total_score": float64 array,
+            "grade": object array
+        }
+    """
+    as_of = as_of or date.today()
+    values = []
+    scores = []
+
+    # Years in business, with the positive NPM growth exception for young businesses
+    started = store.bms_company_column("yearsInBusiness")
+    years_by_start = {value: _years_since(value, as_of) for value in set(started)}
+    years_in_business = np.array([years_by_start[value] for value in started], dtype=np.float64)[store.company_index]
+    years_scores = score_numeric(years_in_business, YEARS_IN_BUSINESS_EDGES, YEARS_IN_BUSINESS_SCORES)
+    young_with_npm_growth = (years_in_business < YEARS_IN_BUSINESS_EDGES[0]) & (_numeric_column(store, "qawaem", "netProfitMarginGrowth") > 0)
+    years_scores[young_with_npm_growth] = YOUNG_BUSINESS_NPM_GROWTH_SCORE
+    values.append(np.round(years_in_business, 1))
+    scores.append(years_scores)
+
+    # bms categories are constant per company, so they are scored per company and broadcast
+    for _, _, field, keywords, exact in CATEGORICAL_CRITERIA:
+        category = store.bms_company_column(field)
+        values.append(category[store.company_index])
+        scores.append(score_categorical(category, keywords, exact)[store.company_index])
+
+    # Bounced cheques combined with court cases, across commercial and consumer
+    bounced_red = _flag_is_any(store, BOUNCED_CHEQUE_FIELDS, "RED")
+    court_red = _flag_is_any(store, COURT_CASES_FIELDS, "RED")
+    values.append(np.where(bounced_red, np.where(court_red, "Bounced RED, Court RED", "Bounced RED, Court GREEN"), "Bounced GREEN"))
+    scores.append(np.select([bounced_red & court_red, bounced_red], [3, -1.5], default=3).astype(np.float64))
+
+    all_green = np.column_stack([store.flag_is(field, "GREEN") for field in ALL_FLAG_FIELDS]).all(axis=1)
+    values.append(np.where(all_green, "Yes", "No"))
+    scores.append(np.where(all_green, ALL_FLAGS_GREEN_SCORE, 0).astype(np.float64))
+
+    for _, block, field, edges, band_scores, right in NUMERIC_CRITERIA:
+        numeric = _numeric_column(store, block, field)
+        values.append(numeric)
+        scores.append(score_numeric(numeric, edges, band_scores, right))
+
+    score_matrix = np.column_stack(scores)
+    total_score = np.nansum(score_matrix, axis=1)
+
+    return {
+        "values": values,
+        "scores": score_matrix,
+        "total_score": total_score,
+        "grade": assign_grades(total_score),
+    }
+
+
+def evaluate_scorecard(store: CompanyYearStore, all_years: bool = False, as_of: Optional[date] = None, by_company: bool = False) -> List[Any]:
+    """
+    Computes the qualitative scorecard (max 106 points) and grade for the
+    company-years of a columnar store.
+
+    Args:
+        store: Company-year records, e.g. the data snapshot's store.
+        all_years: If False (default), only the most recent year of every company is reported.
+        as_of: Date used to compute years in business (defaults to today).
+        by_company: Return one list of results per company of the store
+            instead of one flat list.
+
+    Returns:
+        list: One result dict per reported company-year, with the per-criterion
+        hit table (a list of them per company with `by_company`).
+    """
+    if len(store) == 0:
+        return []
+
+    evaluation = evaluate_scorecard_columns(store, as_of)
+
+    rows = np.arange(len(store))
+    if not all_years:
+        rows = rows[store.latest_year_mask()]
+
+    results = []
+    for row in rows:
+        criteria = []
+        for name, column, score in zip(CRITERIA_NAMES, evaluation["values"], evaluation["scores"][row]):
+            value = column[row]
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, float) and np.isnan(value):
+                value = None
+            criteria.append({
+                "criterion": name,
+                "value": value,
+                "score": None if np.isnan(score) else float(score),
+            })
+
+        results.append({
+            "companyName": store.value(row, "companyName"),
+            "organization_id": store.value(row, "organization_id"),
+            "cr_number": store.value(row, "cr_number"),
+            "year": store.value(row, "year"),
+            "criteria": criteria,
+            "total_score": round(float(evaluation["total_score"][row]), 2),
+            "max_score": MAX_SCORE,
+            "grade": evaluation["grade"][row],
+        })
+
+    if by_company:
+        return store.group_by_company(rows, results)
+    return results
@@ -0,0 +1,122 @@
+from typing import Dict, Any, Iterable, List, Tuple
+
+# SIMAH bureau parameter name -> field name prefix of the flattened record
+SIMAH_PARAMETERS = {
+    "30-dpd on existing facilities": "dpd",
+    "Bounced Cheques": "bounced_cheque",
+    "Unsettled Defaults": "unsettled",
+    "Outstanding Court Cases": "court_cases",
+}
+
+SIMAH_BUREAUS = ["commercial", "consumer"]
+
+# SIMAH parameters per bureau; every parameter has a "<name>_flag" companion
+SIMAH_FIELDS = {
+    bureau: [f"{prefix}_{bureau}" for prefix in SIMAH_PARAMETERS.values()] for bureau in SIMAH_BUREAUS
+}
+
+# Every SIMAH field of both bureaus; extracted values and flags are lists in this order
+SIMAH_SLOTS = [field for bureau in SIMAH_BUREAUS for field in SIMAH_FIELDS[bureau]]
+
+# Small-int codes of the SIMAH flags; 0 means no flag
+FLAG_NAMES = [None, "GREEN", "AMBER", "RED"]
+FLAG_CODES = {name: code for code, name in enumerate(FLAG_NAMES)}
+
+# Dispatch table, compiled once: bureau -> parameter name -> slot
+SIMAH_DISPATCH = {
+    bureau: {name: SIMAH_SLOTS.index(f"{prefix}_{bureau}") for name, prefix in SIMAH_PARAMETERS.items()}
+    for bureau in SIMAH_BUREAUS
+}
+
+
+def flag_code(flag: Any) -> int:
+    """Returns the code of a SIMAH flag; unknown flags are kept as "no flag" rather than guessed."""
+    return FLAG_CODES.get(str(flag).upper() if flag else None, 0)
+
+
+def extract_simah(company: Dict[str, Any]) -> Tuple[List[Any], List[int]]:
+    """
+    Extracts the SIMAH values and flags of one qawaem company in a single pass
+    over the rules of both bureaus.
+
+    Every slot starts out empty for each company, so a bureau without rules
+    yields None values and "no flag" codes.
+
+    Returns:
+        tuple: (values, flag codes), both lists in SIMAH_SLOTS order.
+    """
+    values: List[Any] = [None] * len(SIMAH_SLOTS)
+    codes = [0] * len(SIMAH_SLOTS)
+
+    for bureau in SIMAH_BUREAUS:
+        dispatch = SIMAH_DISPATCH[bureau]
+        for rule in (company.get(bureau) or {}).get("rules") or ():
+            slot = dispatch.get(rule.get("parameterName"))
+            if slot is not None:
+                values[slot] = rule.get("parameterValue")
+                codes[slot] = flag_code(rule.get("flag"))
+    return values, codes
+
+
+def simah_blocks(values: List[Any], codes: List[int]) -> Dict[str, Dict[str, Any]]:
+    """Returns the "commercial" and "consumer" blocks of a flattened record for extracted values and flags."""
+    blocks = {bureau: {} for bureau in SIMAH_BUREAUS}
+    slot = 0
+    for bureau in SIMAH_BUREAUS:
+        block = blocks[bureau]
+        for field in SIMAH_FIELDS[bureau]:
+            block[field] = values[slot]
+            block[f"{field}_flag"] = FLAG_NAMES[codes[slot]]
+            slot += 1
+    return blocks
+
+
+def record_simah(record: Dict[str, Any]) -> Tuple[List[Any], List[int]]:
+    """Reads the SIMAH values and flag codes back from the blocks of a flattened record, in SIMAH_SLOTS order."""
+    values, codes = [], []
+    for bureau in SIMAH_BUREAUS:
+        block = record.get(bureau) or {}
+        for field in SIMAH_FIELDS[bureau]:
+            values.append(block.get(field))
+            codes.append(flag_code(block.get(f"{field}_flag")))
+    return values, codes
+
+
+class SimahColumns:
+    """
+    Accumulates the extracted SIMAH values and flags of many companies and
+    turns them into per-field columns: an object array of values and an int8
+    array of flag codes, as held by `CompanyYearStore` and consumed by the
+    rulebook and scorecard.
+    """
+
+    def __init__(self):
+        self._values: List[List[Any]] = [[] for _ in SIMAH_SLOTS]
+        self._codes: List[List[int]] = [[] for _ in SIMAH_SLOTS]
+
+    def append(self, values: List[Any], codes: List[int]) -> None:
+        for slot in range(len(SIMAH_SLOTS)):
+            self._values[slot].append(values[slot])
+            self._codes[slot].append(codes[slot])
+
+    def arrays(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Returns ({field: object array of values}, {field: int8 array of flag codes})."""
+        import numpy as np
+
+        values = {field: np.array(self._values[slot], dtype=object) for slot, field in enumerate(SIMAH_SLOTS)}
+        codes = {field: np.array(self._codes[slot], dtype=np.int8) for slot, field in enumerate(SIMAH_SLOTS)}
+        return values, codes
+
+
+def extract_simah_columns(companies: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Extracts the SIMAH values and flags of many qawaem companies in bulk.
+
+    Returns:
+        tuple: ({field: object array of values}, {field: int8 array of flag codes}),
+        one entry per company in input order.
+    """
+    columns = SimahColumns()
+    for company in companies:
+        columns.append(*extract_simah(company))
+    return columns.arrays()
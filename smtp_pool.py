@@ -0,0 +1,209 @@
+import os
+import time
+import atexit
+import smtplib
+import logging
+import threading
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Dict, Any, List, Optional, Tuple
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# SMTP server, SendGrid by default. For a local MailHog/aiosmtpd stand-in use
+# SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=0 SMTP_USERNAME=
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.sendgrid.net")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "apikey")  # literally the word 'apikey' for SendGrid
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Maximum number of open sessions (and of messages sent at the same time)
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+
+# Sessions idle for longer than this are closed instead of reused (servers drop idle clients)
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))
+
+# Sessions idle for longer than this are checked with a NOOP before they are reused
+SMTP_HEALTH_CHECK_AFTER = float(os.getenv("SMTP_HEALTH_CHECK_AFTER", "2"))
+
+# Errors after which the session is dropped and the message resent on a new one
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# SMTP reply code of a server closing the session
+SERVICE_NOT_AVAILABLE = 421
+
+
+class SMTPPool:
+    """
+    Pool of persistent, authenticated SMTP sessions.
+
+    Sessions are kept open between sends and reused, most recently used first,
+    so a burst of emails pays the connect/STARTTLS/login handshake once per
+    session instead of once per message. A session idle for a while is checked
+    with a NOOP before reuse, and a dropped session is replaced and the message
+    resent once.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = None,
+        starttls: bool = SMTP_STARTTLS,
+        max_size: int = SMTP_POOL_SIZE,
+        idle_timeout: float = SMTP_IDLE_TIMEOUT,
+        health_check_after: float = SMTP_HEALTH_CHECK_AFTER,
+        timeout: float = SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+
+        # Idle sessions as (session, last used), the most recently used last
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+        self.connects = 0
+        self.reuses = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        password = self.password if self.password is not None else os.getenv("EMAIL_API_KEY")
+        if self.username and not password:
+            raise EnvironmentError("❌ EMAIL_API_KEY environment variable is missing or not set.")
+
+        with span("smtp.connect", host=self.host, port=self.port):
+            session = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                with span("smtp.starttls"):
+                    session.starttls()  # upgrade the connection to secure
+            if self.username:
+                with span("smtp.login"):
+                    session.login(self.username, password)
+        except Exception:
+            self._close(session)
+            raise
+
+        self.connects += 1
+        return session
+
+    @staticmethod
+    def _close(session: smtplib.SMTP) -> None:
+        try:
+            session.quit()
+        except (smtplib.SMTPException, OSError):
+            session.close()
+
+    @staticmethod
+    def _is_alive(session: smtplib.SMTP) -> bool:
+        try:
+            with span("smtp.noop"):
+                return session.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self) -> smtplib.SMTP:
+        """Returns an open session: a healthy idle one if there is one, else a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                session, last_used = self._idle.pop()
+
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(session)
+            elif idle_for < self.health_check_after or self._is_alive(session):
+                self.reuses += 1
+                return session
+            else:
+                session.close()
+
+        return self._connect()
+
+    def _checkin(self, session: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((session, time.monotonic()))
+
+    @staticmethod
+    def _is_dropped(error: BaseException) -> bool:
+        """Whether an error raised while using a session means the session is gone."""
+        if isinstance(error, RECONNECT_ERRORS):
+            return True
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == SERVICE_NOT_AVAILABLE
+
+    @contextmanager
+    def session(self):
+        """
+        Checks out a session for the duration of the block. The session goes back
+        to the pool afterwards, unless the block raised an error that means the
+        session was dropped (then it is closed). Other errors, like refused
+        recipients or errors of the caller, leave the session usable.
+        """
+        with self._slots:
+            session = self._checkout()
+            try:
+                yield session
+            except BaseException as e:
+                if self._is_dropped(e):
+                    session.close()
+                else:
+                    self._checkin(session)
+                raise
+            self._checkin(session)
+
+    def send_message(self, msg: EmailMessage) -> Dict[str, Any]:
+        """
+        Sends a message on a pooled session, reconnecting and resending once if
+        the session turns out to be dropped.
+
+        Returns:
+            dict: The recipients the server refused, as returned by `SMTP.send_message`.
+        """
+        for attempt in range(2):
+            try:
+                with self.session() as session, span("smtp.send", attempt=attempt + 1):
+                    return session.send_message(msg)
+            except (smtplib.SMTPResponseException, *RECONNECT_ERRORS) as e:
+                if not self._is_dropped(e):
+                    raise
+                error = e
+            logger.warning("SMTP session to %s:%s was dropped (%s), reconnecting", self.host, self.port, error)
+        raise error
+
+    def close(self) -> None:
+        """Closes every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session, _ in idle:
+            self._close(session)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            idle = len(self._idle)
+        return {"host": self.host, "port": self.port, "idle": idle, "connects": self.connects, "reuses": self.reuses}
+
+
+_pool: Optional[SMTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool:
+    """Returns the shared SMTP pool, created on first use."""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,109 @@
+import os
+import sys
+import copy
+import tempfile
+import importlib.util
+from typing import Dict, Any, List
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "credit_risk_agent"
+
+# Settings read at import time: keep the tests' caches, deltas and ports out of the repo and the host
+SCRATCH_DIR = tempfile.mkdtemp(prefix="credit-agent-tests-")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("DECISION_CACHE_PATH", os.path.join(SCRATCH_DIR, "decision_cache.sqlite3"))
+os.environ.setdefault("QAWAEM_DELTAS_PATH", os.path.join(SCRATCH_DIR, "qawaem_deltas.jsonl"))
+os.environ.setdefault("DATA_RELOAD_CHECK_INTERVAL", "0")
+
+# The repo folder is the package; load it under its deployed name whatever the checkout is called
+if PACKAGE not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = module
+    spec.loader.exec_module(module)
+
+
+def statement(year: int, revenue: float = 2_000_000, net_profit: float = 200_000, **spreading: float) -> Dict[str, Any]:
+    """A financialStatement entry with the fields the agent reads."""
+    ratios = {
+        "currentRatio": 1.5,
+        "dscr": 2.0,
+        "debtRatio": 0.4,
+        "netProfitMargin": round(net_profit / revenue * 100, 2) if revenue else 0,
+        "grossProfitMargin": 30.0,
+        "leverageRatio": 1.0,
+        "gearingRatio": 0.8,
+        "interestCoverage": 5.0,
+        "externalDebtSalesRatio": 0.2,
+        "receivablePercentageSales": 0.3,
+        "daysSalesOutstanding": 90,
+    }
+    ratios.update(spreading)
+    return {
+        "year": year,
+        "totalEquity": 1_000_000,
+        "profitAndLoss": {"netProfit": net_profit, "totalRevenue": revenue, "operatingProfitLoss": net_profit * 1.2},
+        "cashflow": {"netCashFlowsFromUsedInOperatingActivities": net_profit},
+        "ratios": {"financialSpreading": ratios},
+    }
+
+
+def company(organization_id: int, statements: List[Dict[str, Any]], cr_number: str = None, **fields: Any) -> Dict[str, Any]:
+    """A qawaem company (no borrower files exist for test organization ids)."""
+    data = {
+        "organizationId": organization_id,
+        "companyName": f"Company {organization_id}",
+        "commercialRegistrationNumber": cr_number or f"CR{organization_id}",
+        "commercial": {"rules": [
+            {"parameterName": "30-dpd on existing facilities", "parameterValue": "0", "flag": "GREEN"},
+        ]},
+        "financialStatement": copy.deepcopy(statements),
+    }
+    data.update(fields)
+    return data
+
+
+def flat_record(organization_id: int, year: int, qawaem: Dict[str, Any], flags: Dict[str, str] = None, bms: Dict[str, Any] = None) -> Dict[str, Any]:
+    """A flattened company-year record; `flags` maps SIMAH fields to their flag (GREEN otherwise)."""
+    from credit_risk_agent.simah_extraction import SIMAH_SLOTS, FLAG_CODES, simah_blocks
+
+    flags = flags or {}
+    codes = [FLAG_CODES[flags.get(field, "GREEN")] for field in SIMAH_SLOTS]
+    return {
+        "organization_id": organization_id,
+        "companyName": f"Company {organization_id}",
+        "cr_number": f"CR{organization_id}",
+        "year": year,
+        "qawaem": dict(qawaem),
+        **simah_blocks([None] * len(SIMAH_SLOTS), codes),
+        "bms": dict(bms or {}),
+    }
+
+
+@pytest.fixture
+def package():
+    return sys.modules[PACKAGE]
+
+
+@pytest.fixture
+def make_store():
+    """Builds a columnar store from qawaem companies."""
+    from credit_risk_agent.columnar_store import CompanyYearStore
+    from credit_risk_agent.qawaem_loader import project_company, flatten_company
+
+    def make(companies: List[Dict[str, Any]]):
+        return CompanyYearStore.from_companies(flatten_company(project_company(c)) for c in companies)
+    return make
+
+
+@pytest.fixture
+def make_snapshot(make_store):
+    from credit_risk_agent.data_provider import DataSnapshot
+
+    def make(companies: List[Dict[str, Any]]):
+        return DataSnapshot(make_store(companies))
+    return make
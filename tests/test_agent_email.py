@@ -0,0 +1,35 @@
+import zipfile
+from io import BytesIO
+from functools import partial
+
+import pytest
+
+
+def summary(company_id, score):
+    return {"companyName": f"Company {company_id}", "crNumber": f"CR{company_id}", "simahScore": score,
+            "riskRating": "A", "finalDecision": "Approved"}
+
+
+@pytest.mark.parametrize("renderer", ["template", "procedural"])
+def test_digest_zip_holds_valid_credit_files(monkeypatch, renderer):
+    from docx import Document
+    from credit_risk_agent import agent, generate_credit_file
+
+    monkeypatch.setattr(
+        generate_credit_file, "create_lendo_credit_file", partial(generate_credit_file.create_lendo_credit_file, renderer=renderer)
+    )
+
+    companies = [{"companyId": 1742, "summary_data": summary(1742, 701)}, {"companyId": 4560, "summary_data": summary(4560, 702)}]
+    msg = agent._build_credit_digest_email("to@example.com", "Digest", "Body", companies, zip_files=True)
+
+    attachments = list(msg.iter_attachments())
+    assert [attachment.get_filename() for attachment in attachments] == ["Lendo Credit Files.zip"]
+    with zipfile.ZipFile(BytesIO(attachments[0].get_content())) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["Lendo Credit File - CR1742.docx", "Lendo Credit File - CR4560.docx"]
+        for name, score in zip(archive.namelist(), (701, 702)):
+            docx_bytes = archive.read(name)
+            with zipfile.ZipFile(BytesIO(docx_bytes)) as docx:
+                assert docx.testzip() is None
+            text = "\n".join(cell.text for table in Document(BytesIO(docx_bytes)).tables for row in table.rows for cell in row.cells)
+            assert f"A ({score})" in text
@@ -0,0 +1,118 @@
+import pytest
+
+from conftest import company, statement
+
+
+@pytest.fixture
+def make_db(tmp_path, make_store):
+    from credit_risk_agent.company_db import create_company_db, CompanyYearDatabase
+
+    def make(companies):
+        store = make_store(companies)
+        path = str(tmp_path / "companies.sqlite3")
+        create_company_db(path, (store.to_records(store.company_rows(c)) for c in range(store.company_count)))
+        return CompanyYearDatabase(path)
+    return make
+
+
+def test_company_lookup_rejects_mismatched_ids(make_db):
+    database = make_db([company(900001, [statement(2023)]), company(900002, [statement(2023)])])
+
+    assert database.has_company(organization_id=900001, cr_number="CR900001")
+    assert not database.has_company(organization_id=900001, cr_number="CR900002")
+    records, total = database.query(organization_id=900001, cr_number="CR900002")
+    assert (records, total) == ([], 0)
+    records, total = database.query(cr_number="CR900002")
+    assert [record["organization_id"] for record in records] == [900002]
+
+
+def dpd_company(organization_id, value):
+    return company(organization_id, [statement(2023)], commercial={"rules": [
+        {"parameterName": "30-dpd on existing facilities", "parameterValue": value, "flag": "RED"},
+    ]})
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("dpd_commercial = 11", [900001, 900003]),
+    ("dpd_commercial != 11", [900002]),
+    ("dpd_commercial = '0'", [900002]),
+    ("dpd_commercial_flag = red", [900001, 900002, 900003, 900004]),
+])
+def test_simah_value_filters_compare_text(make_db, make_store, text, expected):
+    from credit_risk_agent.projection import parse_filters, filter_rows
+
+    companies = [dpd_company(900001, "11"), dpd_company(900002, "0"), dpd_company(900003, 11), dpd_company(900004, None)]
+    filters = parse_filters([text])
+    records, _ = make_db(companies).query(year="all", filters=filters)
+    assert [record["organization_id"] for record in records] == expected
+
+    store = make_store(companies)
+    rows = filter_rows(store, store.latest_year_rows(), filters)
+    assert [store.organization_id[store.company_index[row]] for row in rows] == expected
+
+
+def test_filter_values_are_checked():
+    from credit_risk_agent.projection import parse_filters
+
+    assert parse_filters(["dscr < 1.5", "dpd_commercial = 11"]) == [("dscr", "<", 1.5), ("dpd_commercial", "=", "11")]
+    with pytest.raises(ValueError):
+        parse_filters(["dscr < high"])
+    with pytest.raises(ValueError):
+        parse_filters(["dpd_commercial > 11"])
+
+
+def test_duplicate_years_are_kept_like_in_memory(make_db, make_store, caplog):
+    companies = [
+        company(900001, [statement(2023), statement(2023, revenue=2_500_000), statement(2022)]),
+        company(900002, [statement(2023)]),
+        company(900001, [statement(2021)], cr_number="CR900001-B"),
+    ]
+    store = make_store(companies)
+    records, total = make_db(companies).query(year="all")
+
+    assert total == len(store) == 5
+    assert records == store.to_records()
+    assert "900001/2023 x2" in caplog.text
+
+
+def test_decisions_are_made_on_the_database(make_db, make_snapshot, monkeypatch):
+    from credit_risk_agent import agent, company_db, data_provider
+
+    # The database has the latest data: 900001 lost its revenue and 900003 was added
+    database = make_db([
+        company(900001, [statement(2023, revenue=500_000), statement(2022)]),
+        company(900002, [statement(2023), statement(2022)]),
+        company(900003, [statement(2023), statement(2022)]),
+    ])
+    stale = make_snapshot([company(900001, [statement(2023), statement(2022)]), company(900002, [statement(2023)])])
+    monkeypatch.setattr(company_db, "get_company_db", lambda: database)
+    monkeypatch.setattr(data_provider, "_snapshot", stale)
+
+    portfolio = agent.Evaluate_Credit_Rulebook()
+    assert [decision["organization_id"] for decision in portfolio["data"]] == [900001, 900002, 900003]
+    single = agent.Evaluate_Credit_Rulebook(organization_id=900001)
+    assert [decision["organization_id"] for decision in single["data"]] == [900001]
+    for decision in (portfolio["data"][0], single["data"][0]):
+        assert "Revenue > SAR 1,000,000" in decision["rules_violated"]
+
+    scorecard = agent.Calculate_Credit_Scorecard(cr_number="CR900003")
+    assert scorecard["status"] == "Success" and [d["organization_id"] for d in scorecard["data"]] == [900003]
+    assert agent.Calculate_Credit_Scorecard(organization_id=900001, cr_number="CR900002")["status"] == "Error"
+    assert agent.Evaluate_Credit_Rulebook(organization_id=900004)["status"] == "Error"
+
+
+def test_company_store_matches_the_snapshot(make_db, make_snapshot):
+    companies = [
+        company(900001, [statement(2023, revenue=2_400_000), statement(2022)]),
+        company(900002, [statement(2022), statement(2023, dscr=None)], cr_number="CR-SHARED"),
+        company(900002, [statement(2024)], cr_number="CR900002B"),
+    ]
+    database, snapshot = make_db(companies), make_snapshot(companies)
+
+    assert database.company_store().to_records() == snapshot.store.to_records()
+    for ids in ({"organization_id": 900002}, {"cr_number": "CR-SHARED"}, {"organization_id": "900001", "cr_number": "CR900001"}):
+        store, expected = database.company_store(**ids), snapshot.company_store(**ids)
+        assert store.to_records() == expected.to_records()
+        # Same digest, so both paths share cached decisions
+        assert store.company_digest(0) == expected.company_digest(0)
+    assert database.company_store(organization_id=900001, cr_number="CR900002B") is None
@@ -0,0 +1,36 @@
+import zipfile
+import pytest
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+SUMMARY = {
+    "companyName": "Company 1742",
+    "crNumber": "1234567890",
+    "simahScore": 789,
+    "riskRating": "A",
+    "finalDecision": "Approved",
+}
+
+
+def test_concurrent_renders_are_valid_docx():
+    from credit_risk_agent.generate_credit_file import create_lendo_credit_file
+
+    def render(i):
+        return create_lendo_credit_file(1742, dict(SUMMARY, simahScore=1000 + i), BytesIO(), renderer="template")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        files = list(pool.map(render, range(80)))
+
+    for i, output in enumerate(files):
+        with zipfile.ZipFile(BytesIO(output.getvalue())) as docx:
+            assert docx.testzip() is None
+            assert b"A (%d)" % (1000 + i) in docx.read("word/document.xml")
+
+
+def test_save_errors_reach_the_caller(tmp_path, caplog):
+    from credit_risk_agent.generate_credit_file import create_lendo_credit_file
+
+    output = str(tmp_path / "missing-folder" / "credit file.docx")
+    with pytest.raises(OSError):
+        create_lendo_credit_file(1742, SUMMARY, output)
+    assert "credit file.docx" in caplog.text
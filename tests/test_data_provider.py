@@ -0,0 +1,48 @@
+from conftest import company, statement
+
+
+def test_company_position_by_either_id(make_snapshot):
+    snapshot = make_snapshot([company(900001, [statement(2023)]), company(900002, [statement(2023)])])
+
+    assert snapshot.company_position(organization_id=900002) == 1
+    assert snapshot.company_position(cr_number="CR900001") == 0
+    assert snapshot.company_position(organization_id=" 900001 ", cr_number="CR900001") == 0
+    assert snapshot.company_position(organization_id=900003) is None
+
+
+def test_company_position_rejects_mismatched_ids(make_snapshot):
+    snapshot = make_snapshot([company(900001, [statement(2023)]), company(900002, [statement(2023)])])
+
+    assert snapshot.company_position(organization_id=900001, cr_number="CR900002") is None
+    assert snapshot.company_position(organization_id=900001, cr_number="CR-UNKNOWN") is None
+    assert snapshot.company_store(organization_id=900001, cr_number="CR900002") is None
+
+
+def test_change_check_never_blocks_the_caller(make_snapshot, monkeypatch):
+    import threading
+    from credit_risk_agent import data_provider
+
+    scanning, release = threading.Event(), threading.Event()
+    scans = []
+
+    def slow_fingerprint():
+        scans.append(1)
+        scanning.set()
+        assert release.wait(5)
+        return ()
+
+    snapshot = make_snapshot([company(900001, [statement(2023)])])
+    monkeypatch.setattr(data_provider, "_snapshot", snapshot)
+    monkeypatch.setattr(data_provider, "_last_check", 0.0)
+    monkeypatch.setattr(data_provider, "DATA_RELOAD_CHECK_INTERVAL", 0.0)
+    monkeypatch.setattr(data_provider, "source_fingerprint", slow_fingerprint)
+    monkeypatch.setattr(data_provider, "apply_new_deltas", lambda: False)
+
+    assert data_provider.get_snapshot() is snapshot
+    assert scanning.wait(5)
+    # The scan is still running: callers get the current snapshot and start no second scan
+    for _ in range(10):
+        assert data_provider.get_snapshot() is snapshot
+    release.set()
+    data_provider._check_thread.join(5)
+    assert len(scans) == 1
@@ -0,0 +1,92 @@
+import pytest
+
+from conftest import company, statement
+
+
+@pytest.fixture
+def portfolio():
+    return [
+        company(900001, [statement(2023), statement(2022)]),
+        company(900002, [statement(2023, revenue=3_000_000), statement(2022)]),
+        company(900003, [statement(2023, net_profit=-50_000)]),
+    ]
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    from credit_risk_agent import decision_cache
+
+    cache = decision_cache.DecisionCache(str(tmp_path / "decisions.sqlite3"))
+    monkeypatch.setattr(decision_cache, "_cache", cache)
+    return cache
+
+
+def test_digests_follow_the_content_not_the_position(make_store, portfolio):
+    store = make_store(portfolio)
+    reordered = make_store(portfolio[::-1])
+    restated = make_store([portfolio[0], company(900002, [statement(2023, revenue=3_000_001), statement(2022)])])
+
+    assert len({store.company_digest(i) for i in range(3)}) == 3
+    assert reordered.company_digest(2) == store.company_digest(0)
+    assert restated.company_digest(0) == store.company_digest(0)
+    assert restated.company_digest(1) != store.company_digest(1)
+    assert store.take_companies([2, 0]).company_digest(1) == store.company_digest(0)
+
+
+def test_with_companies_only_changes_the_replaced_digest(make_snapshot, portfolio):
+    from credit_risk_agent.qawaem_loader import project_company, flatten_company
+
+    snapshot = make_snapshot(portfolio)
+    changed = company(900002, [statement(2024), statement(2023, revenue=3_000_000), statement(2022)])
+    updated = snapshot.with_companies([flatten_company(project_company(changed))])
+
+    assert updated.company_digest(0) == snapshot.company_digest(0)
+    assert updated.company_digest(2) == snapshot.company_digest(2)
+    assert updated.company_digest(1) == make_snapshot([changed]).company_digest(0)
+
+
+def test_cached_decisions_match_direct_evaluation(cache, make_snapshot, portfolio):
+    from credit_risk_agent.decision_cache import cached_decisions
+    from credit_risk_agent.rulebook import evaluate_rulebook, RULEBOOK_ID
+
+    snapshot = make_snapshot(portfolio)
+    calls = []
+
+    def evaluate(store):
+        calls.append(store.company_count)
+        return evaluate_rulebook(store, all_years=True, by_company=True)
+
+    expected = evaluate_rulebook(snapshot.store.take_companies([2, 0]), all_years=True)
+    assert cached_decisions(snapshot, [2], "rulebook", RULEBOOK_ID, evaluate, all_years=True)
+    assert cached_decisions(snapshot, [2, 0], "rulebook", RULEBOOK_ID, evaluate, all_years=True) == expected
+    assert cached_decisions(snapshot, [2, 0], "rulebook", RULEBOOK_ID, evaluate, all_years=True) == expected
+    assert calls == [1, 1]
+    assert cache.stats()["hits"] == 3
+
+
+def test_eviction_is_per_kind(tmp_path):
+    from credit_risk_agent.decision_cache import DecisionCache
+
+    cache = DecisionCache(str(tmp_path / "decisions.sqlite3"), max_entries=2)
+    cache.put_many("scorecard", {"s1": [1]})
+    for key in ("r1", "r2", "r3"):
+        cache.put_many("rulebook", {key: [key]})
+
+    assert cache.stats()["entries_per_kind"] == {"rulebook": 2, "scorecard": 1}
+    assert set(cache.get_many(["s1", "r1", "r2", "r3"])) == {"s1", "r2", "r3"}
+
+
+def test_whole_portfolio_skips_the_cache(cache, monkeypatch, make_snapshot, portfolio):
+    from credit_risk_agent import agent
+    from credit_risk_agent.rulebook import evaluate_rulebook
+
+    snapshot = make_snapshot(portfolio)
+    monkeypatch.setattr(agent, "get_snapshot", lambda: snapshot)
+
+    result = agent.Evaluate_Credit_Rulebook()
+    assert result["data"] == evaluate_rulebook(snapshot.store)
+    assert cache.stats()["entries"] == 0
+
+    single = agent.Evaluate_Credit_Rulebook(organization_id=900002)
+    assert single["data"] == [result["data"][1]]
+    assert cache.stats()["entries_per_kind"] == {"rulebook": 1}
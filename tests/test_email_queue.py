@@ -0,0 +1,58 @@
+import time
+import smtplib
+from email.message import EmailMessage
+
+
+def message(to: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "sender@example.com"
+    msg["To"] = to
+    msg["Subject"] = "Credit file"
+    msg.set_content("Body")
+    return msg
+
+
+def wait_for(queue, tracking_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        email = queue.status(tracking_id)
+        if email["status"] == status:
+            return email
+        time.sleep(0.01)
+    raise AssertionError(f"Email {tracking_id} is {queue.status(tracking_id)['status']}, not {status}")
+
+
+def test_refused_recipients_are_reported():
+    from credit_risk_agent.email_queue import EmailQueue
+
+    def send(msg):
+        return {"b@example.com": (550, b"User unknown")} if "b@example.com" in msg["To"] else {}
+
+    queue = EmailQueue(send, workers=1)
+    partly = queue.submit(lambda: message("a@example.com, b@example.com"), "a@example.com, b@example.com", "Credit file")
+    refused = queue.submit(lambda: message("b@example.com"), "b@example.com", "Credit file")
+    assert queue.wait(5)
+
+    assert queue.status(partly)["status"] == "sent"
+    assert queue.status(partly)["refused"] == {"b@example.com": "550 User unknown"}
+    assert queue.status(refused)["status"] == "failed"
+    assert queue.status(refused)["refused"] == {"b@example.com": "550 User unknown"}
+    assert queue.stats()["sent"] == 1 and queue.stats()["failed"] == 1
+
+
+def test_retry_wait_counts_down():
+    from credit_risk_agent.email_queue import EmailQueue
+
+    def send(msg):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+    queue = EmailQueue(send, workers=1, backoff=30)
+    tracking_id = queue.submit(lambda: message("a@example.com"), "a@example.com", "Credit file")
+    first = wait_for(queue, tracking_id, "retrying")
+    time.sleep(0.2)
+    second = queue.status(tracking_id)
+
+    assert first["next_attempt_at"] == second["next_attempt_at"]
+    assert abs(first["next_attempt_at"] - (first["updated_at"] + 30)) < 0.1
+    assert 29 < first["retry_in"] <= 30
+    assert second["retry_in"] <= first["retry_in"] - 0.15
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from conftest import company, statement
+
+BASE = [
+    company(900001, [statement(2023), statement(2022)]),
+    company(900002, [statement(2023), statement(2022, revenue=1_500_000)]),
+]
+
+DELTAS = [
+    company(900001, [statement(2023, revenue=2_400_000, net_profit=-10_000)]),
+    company(900002, [statement(2024, revenue=2_600_000)], companyName="Company 900002 Renamed"),
+    company(900003, [statement(2023), statement(2022)]),
+]
+
+
+def flattened(companies):
+    from credit_risk_agent.qawaem_loader import project_company, flatten_company
+
+    return [flatten_company(project_company(c)) for c in companies]
+
+
+@pytest.fixture
+def grouped_deltas():
+    from credit_risk_agent.incremental_ingest import group_deltas, profile_deltas
+
+    return group_deltas(profile_deltas(DELTAS))
+
+
+def test_upserts_match_a_full_rebuild(tmp_path, make_snapshot, grouped_deltas):
+    from credit_risk_agent.columnar_store import CompanyYearStore
+    from credit_risk_agent.company_db import create_company_db, upsert_company_db, CompanyYearDatabase
+    from credit_risk_agent.incremental_ingest import iter_with_deltas, apply_company_deltas
+
+    rebuilt = CompanyYearStore.from_companies(iter_with_deltas(flattened(BASE), grouped_deltas))
+
+    snapshot = make_snapshot(BASE)
+    changed = [
+        apply_company_deltas(snapshot.company_records(organization_id=organization_id) or [], deltas)
+        for organization_id, deltas in grouped_deltas.items()
+    ]
+    assert snapshot.with_companies(changed).store.to_records() == rebuilt.to_records()
+
+    incremental, full = str(tmp_path / "incremental.sqlite3"), str(tmp_path / "full.sqlite3")
+    create_company_db(incremental, flattened(BASE))
+    upsert_company_db(incremental, grouped_deltas)
+    create_company_db(full, iter_with_deltas(flattened(BASE), grouped_deltas))
+
+    for year in ("all", "latest"):
+        records, total = CompanyYearDatabase(incremental).query(year=year)
+        assert (records, total) == CompanyYearDatabase(full).query(year=year)
+    assert CompanyYearDatabase(incremental).query(year="all")[0] == rebuilt.to_records()
+
+
+def test_failed_database_upsert_leaves_the_deltas_file_alone(tmp_path, monkeypatch):
+    from credit_risk_agent import company_db, data_provider
+    from credit_risk_agent.incremental_ingest import upsert_companies
+
+    database = str(tmp_path / "companies.sqlite3")
+    company_db.create_company_db(database, flattened(BASE))
+    deltas_path = str(tmp_path / "qawaem_deltas.jsonl")
+
+    def failing_upsert(path, deltas):
+        raise company_db.sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(company_db, "CREDIT_DB_PATH", database)
+    monkeypatch.setattr(company_db, "upsert_company_db", failing_upsert)
+    monkeypatch.setattr(data_provider, "QAWAEM_DELTAS_PATH", deltas_path)
+    monkeypatch.setattr(data_provider, "_snapshot", None)
+
+    with pytest.raises(company_db.sqlite3.OperationalError):
+        upsert_companies(DELTAS)
+    assert not os.path.exists(deltas_path)
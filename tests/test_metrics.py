@@ -0,0 +1,35 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+
+@pytest.fixture
+def metrics_url():
+    from credit_risk_agent import metrics
+
+    server = metrics._metrics_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_metrics_endpoint_reports_tool_calls(metrics_url):
+    from credit_risk_agent import agent
+
+    assert agent.Get_Email_Status("unknown")["status"] == "Error"
+
+    with urllib.request.urlopen(metrics_url + "/metrics") as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = response.read().decode("utf-8")
+
+    assert '# TYPE credit_agent_tool_calls_total counter' in text
+    assert 'credit_agent_tool_calls_total{tool="Get_Email_Status",status="Error"}' in text
+    assert "credit_agent_tool_duration_seconds_count{tool=\"Get_Email_Status\"}" in text
+    assert "credit_agent_email_queue_depth" in text
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(metrics_url + "/other")
+    assert error.value.code == 404
@@ -0,0 +1,156 @@
+import pytest
+
+from conftest import company, statement
+
+
+def dpd(value, flag="RED"):
+    return {"rules": [{"parameterName": "30-dpd on existing facilities", "parameterValue": value, "flag": flag}]}
+
+
+@pytest.fixture
+def store(make_store):
+    return make_store([
+        company(900001, [statement(2023, dscr=1.2), statement(2022, dscr=1.5)], commercial=dpd(11)),
+        company(900002, [statement(2023, dscr=1.5)], commercial=dpd("11", "amber")),
+        company(900003, [statement(2023, dscr=None), statement(2022, dscr=2.5)], commercial=dpd("011", "GREEN")),
+        company(900004, [statement(2023, dscr=3.0)], commercial=dpd(None)),
+    ])
+
+
+@pytest.mark.parametrize("text, parsed", [
+    ("dscr < 1.5", ("dscr", "<", 1.5)),
+    ("dscr<=1.5", ("dscr", "<=", 1.5)),
+    ("  revenue >  1e6 ", ("revenue", ">", 1_000_000.0)),
+    ("year >= 2022", ("year", ">=", 2022.0)),
+    ("year == 2023", ("year", "=", 2023.0)),
+    ("revenue_cagr != 0", ("revenue_cagr", "!=", 0.0)),
+    # SIMAH values stay text, flags are upper-cased, quotes are dropped
+    ("dpd_commercial = 011", ("dpd_commercial", "=", "011")),
+    ("dpd_commercial != '11'", ("dpd_commercial", "!=", "11")),
+    ('dpd_commercial_flag = "red"', ("dpd_commercial_flag", "=", "RED")),
+    ("court_cases_consumer_flag == Amber", ("court_cases_consumer_flag", "=", "AMBER")),
+])
+def test_parse_filters(text, parsed):
+    from credit_risk_agent.projection import parse_filters
+
+    assert parse_filters([text]) == [parsed]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("dscr", "Invalid filter"),
+    ("dscr =", "Invalid filter"),
+    ("dscr <> 1", "needs a number"),
+    ("nitaqatColor = Green", "Unknown filter field"),
+    ("dscr > high", "needs a number"),
+    ("dpd_commercial > 11", "only supports = and !="),
+    ("dpd_commercial_flag >= RED", "only supports = and !="),
+])
+def test_parse_filters_rejects(text, message):
+    from credit_risk_agent.projection import parse_filters
+
+    with pytest.raises(ValueError, match=message):
+        parse_filters([text])
+
+
+def test_no_filters():
+    from credit_risk_agent.projection import parse_filters
+
+    assert parse_filters(None) == [] and parse_filters([]) == []
+
+
+@pytest.mark.parametrize("filters, expected", [
+    (["dscr < 1.5"], [(900001, 2023)]),
+    (["dscr <= 1.5"], [(900001, 2023), (900001, 2022), (900002, 2023)]),
+    (["dscr > 1.5"], [(900003, 2022), (900004, 2023)]),
+    (["dscr >= 2.5"], [(900003, 2022), (900004, 2023)]),
+    (["dscr = 1.5"], [(900001, 2022), (900002, 2023)]),
+    # Missing values never match, not even !=
+    (["dscr != 1.5"], [(900001, 2023), (900003, 2022), (900004, 2023)]),
+    (["dscr > 1", "year = 2023"], [(900001, 2023), (900002, 2023), (900004, 2023)]),
+])
+def test_filter_operators(store, filters, expected):
+    import numpy as np
+    from credit_risk_agent.projection import parse_filters, filter_rows
+
+    rows = filter_rows(store, np.arange(len(store)), parse_filters(filters))
+    assert [(store.value(row, "organization_id"), store.value(row, "year")) for row in rows] == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # An int 11 and the text "11" are the same value, "011" is not
+    ("dpd_commercial = 11", [900001, 900002]),
+    ("dpd_commercial = 011", [900003]),
+    ("dpd_commercial != 11", [900003]),
+    ("dpd_commercial_flag = red", [900001, 900004]),
+    ("dpd_commercial_flag != RED", [900002, 900003]),
+])
+def test_simah_filters_compare_text(store, text, expected):
+    from credit_risk_agent.projection import parse_filters, filter_rows, select_year_rows
+
+    rows = filter_rows(store, select_year_rows(store, "latest"), parse_filters([text]))
+    assert [store.value(row, "organization_id") for row in rows] == expected
+
+
+@pytest.mark.parametrize("page, page_size, bounds", [
+    (1, None, (0, None)),
+    (3, None, (0, None)),
+    (1, 10, (0, 10)),
+    (3, 10, (20, 10)),
+    ("2", "5", (5, 5)),
+])
+def test_page_bounds(page, page_size, bounds):
+    from credit_risk_agent.projection import page_bounds
+
+    assert page_bounds(page, page_size) == bounds
+
+
+@pytest.mark.parametrize("page, page_size", [(0, 10), (-1, 10), (1, 0), (1, -5), (0, None)])
+def test_page_bounds_rejects(page, page_size):
+    from credit_risk_agent.projection import page_bounds
+
+    with pytest.raises(ValueError, match="at least 1"):
+        page_bounds(page, page_size)
+
+
+def test_page_beyond_the_last_one_is_empty(store):
+    import numpy as np
+    from credit_risk_agent.projection import page_bounds, page_info
+
+    offset, limit = page_bounds(4, 2)
+    rows = np.arange(len(store))
+    assert offset == 6 and len(rows[offset:offset + limit]) == 0
+    assert page_info(4, 2, len(rows)) == {"page": 4, "page_size": 2, "total_records": 6, "total_pages": 3}
+    assert page_info(1, 2, 0)["total_pages"] == 0
+
+
+@pytest.mark.parametrize("fields", [
+    ["dscr"],
+    ["dscr", "revenue", "dscr", "year"],
+    ["dpd_commercial", "dpd_commercial_flag", "court_cases_consumer_flag"],
+    ["trends", "revenue_cagr"],
+    ["nitaqatColor", "industry"],
+    ["qawaem", "commercial", "consumer", "bms", "trends"],
+    ["companyName"],
+])
+def test_store_projection_matches_projected_records(make_store, fields):
+    import numpy as np
+    from credit_risk_agent.projection import project_records, project_store_records
+
+    store = make_store([
+        company(900001, [statement(2023), statement(2022)], bms={"nitaqatColor": "Green", "industry": "Retail"}),
+        company(900002, [statement(2023)], bms={"industry": "Mining"}),
+    ])
+    for rows in (np.arange(len(store)), np.array([2, 0])):
+        assert project_store_records(store, rows, fields) == project_records(store.to_records(rows), fields)
+
+
+def test_store_projection_rejects_unknown_fields(make_store):
+    import numpy as np
+    from credit_risk_agent.projection import project_store_records
+
+    store = make_store([company(900001, [statement(2023)])])
+    with pytest.raises(ValueError, match="Unknown field 'dscrr'"):
+        project_store_records(store, np.arange(len(store)), ["dscrr"])
+    # bms fields are those of the projected companies
+    with pytest.raises(ValueError, match="Unknown field 'numberOfCustomers'"):
+        project_store_records(store, np.arange(len(store)), ["numberOfCustomers"])
@@ -0,0 +1,72 @@
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def reference_dirs(monkeypatch, tmp_path):
+    from credit_risk_agent import reference_data
+
+    for kind in reference_data.REFERENCE_DIRS:
+        directory = tmp_path / kind
+        directory.mkdir()
+        monkeypatch.setitem(reference_data.REFERENCE_DIRS, kind, str(directory))
+    return tmp_path
+
+
+def write(reference_dirs, kind, br, data):
+    (reference_dirs / kind / f"BR{br}.json").write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_missing_files_are_cached_until_they_appear(reference_dirs):
+    from credit_risk_agent.reference_data import ReferenceDataCache
+
+    cache = ReferenceDataCache(check_interval=60)
+    assert cache.get_optional("bms", 7) is None
+    write(reference_dirs, "bms", 7, {"city": "Riyadh"})
+    with pytest.raises(FileNotFoundError):
+        cache.get("bms", 7)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+    cache.check_interval = 0
+    assert cache.get("bms", 7) == {"city": "Riyadh"}
+    assert cache.stats()["reloads"] == 1
+
+
+def test_prefetch_loads_in_parallel(reference_dirs, monkeypatch):
+    from credit_risk_agent import reference_data
+
+    for br in range(20):
+        write(reference_dirs, "bms", br, {"br": br})
+    threads = set()
+    load = reference_data.json.load
+
+    def recording_load(f):
+        threads.add(threading.current_thread().name)
+        return load(f)
+
+    monkeypatch.setattr(reference_data.json, "load", recording_load)
+    cache = reference_data.ReferenceDataCache()
+    assert cache.prefetch(range(25), kinds=["bms"], workers=4) == 20
+    assert all(name.startswith("reference-prefetch") for name in threads) and len(threads) > 1
+
+    monkeypatch.setattr(reference_data.os, "stat", None)  # everything, found or missing, is now served from memory
+    assert cache.get_optional("bms", 3) == {"br": 3}
+    assert cache.get_optional("bms", 22) is None
+
+
+def test_bulk_loads_do_not_evict(reference_dirs):
+    from credit_risk_agent.reference_data import ReferenceDataCache
+
+    for br in range(3):
+        write(reference_dirs, "bms", br, {"br": br})
+    cache = ReferenceDataCache(max_entries=2)
+    cache.get("bms", 0)
+    assert cache.get("bms", 1, evict=False) == {"br": 1}
+    assert cache.get("bms", 2, evict=False) == {"br": 2}
+    assert cache.stats()["entries"] == 2
+
+    cache.get("bms", 2)
+    assert cache.get_optional("bms", 0) == {"br": 0}
+    assert cache.stats()["entries"] == 2
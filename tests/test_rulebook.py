@@ -0,0 +1,142 @@
+import math
+
+import pytest
+
+from conftest import flat_record
+
+# Meets every rule of the rulebook
+PASSING = {
+    "revenue": 2_000_000,
+    "operatingProfit": 100_000,
+    "dscr": 2.0,
+    "gearingRatio": 1.0,
+    "leverageRatio": 1.0,
+    "currentRatio": 2.0,
+    "externalDebtSales": 0.1,
+    "totalEquity": 200_000,
+}
+
+
+def record(organization_id, year, flags=None, **qawaem):
+    return flat_record(organization_id, year, dict(PASSING, **qawaem), flags)
+
+
+def evaluate(companies):
+    from credit_risk_agent.columnar_store import CompanyYearStore
+    from credit_risk_agent.rulebook import evaluate_rulebook_columns
+
+    store = CompanyYearStore.from_companies(companies)
+    return store, evaluate_rulebook_columns(store)
+
+
+def latest_met(records, rule):
+    """Whether `rule` is met on the first (latest) record of a single company."""
+    from credit_risk_agent.rulebook import RULE_NAMES
+
+    _, evaluation = evaluate([records])
+    return bool(evaluation["met"][0, RULE_NAMES.index(rule)])
+
+
+def test_passing_company_meets_every_rule():
+    from credit_risk_agent.rulebook import RULE_NAMES
+
+    _, evaluation = evaluate([[record(1, 2023), record(1, 2022)]])
+    assert evaluation["met"][0].tolist() == [True] * len(RULE_NAMES)
+    assert evaluation["percentage_met"][0] == 100
+    assert evaluation["recommended"][0]
+
+
+# (rule, field, just below, at, just above, met below / at / above)
+THRESHOLD_CASES = [
+    ("Revenue > SAR 1,000,000", "revenue", 999_999, 1_000_000, 1_000_001, (False, False, True)),
+    ("Operating Profit > 0", "operatingProfit", -0.01, 0, 0.01, (False, False, True)),
+    ("DSCR ≥ 1.5", "dscr", 1.49, 1.5, 1.51, (False, True, True)),
+    ("Gearing Ratio ≤ 1.7", "gearingRatio", 1.69, 1.7, 1.71, (True, True, False)),
+    ("Leverage Ratio (Asset Heavy) ≤ 2.0", "leverageRatio", 1.99, 2.0, 2.01, (True, True, False)),
+    ("Current Ratio ≥ 1.2", "currentRatio", 1.19, 1.2, 1.21, (False, True, True)),
+    ("External Debt / Sales < 50%", "externalDebtSales", 0.49, 0.5, 0.51, (True, False, False)),
+    ("Total Equity > SAR 100,000", "totalEquity", 99_999, 100_000, 100_001, (False, False, True)),
+]
+
+
+def test_threshold_cases_cover_every_financial_rule():
+    from credit_risk_agent.rulebook import FINANCIAL_RULES
+
+    assert [(case[0], case[1]) for case in THRESHOLD_CASES] == [(rule[0], rule[1]) for rule in FINANCIAL_RULES]
+
+
+@pytest.mark.parametrize("rule, field, below, at, above, expected", THRESHOLD_CASES, ids=[case[1] for case in THRESHOLD_CASES])
+def test_financial_rule_thresholds(rule, field, below, at, above, expected):
+    met = tuple(latest_met([record(1, 2023, **{field: value}), record(1, 2022)], rule) for value in (below, at, above))
+    assert met == expected
+
+
+@pytest.mark.parametrize("missing", [None, math.nan, "n/a"])
+@pytest.mark.parametrize("rule, field", [case[:2] for case in THRESHOLD_CASES], ids=[case[1] for case in THRESHOLD_CASES])
+def test_missing_inputs_violate_the_rule(rule, field, missing):
+    assert not latest_met([record(1, 2023, **{field: missing}), record(1, 2022)], rule)
+
+
+@pytest.mark.parametrize("years, expected", [
+    ([2023], False),
+    ([2023, 2022], True),
+    ([2023, 2022, 2021], True),
+    # A restated year is still one fiscal year
+    ([2023, 2023], False),
+])
+def test_years_of_data_rule(years, expected):
+    from credit_risk_agent.rulebook import RULE_NAMES, YEARS_OF_DATA_RULE
+
+    _, evaluation = evaluate([[record(1, year) for year in years]])
+    # Counted per company, so every year of the company gets the same result
+    assert evaluation["met"][:, RULE_NAMES.index(YEARS_OF_DATA_RULE)].tolist() == [expected] * len(years)
+
+
+CREDIT_HISTORY_CASES = [
+    (rule, field) for rule, fields in [
+        ("Credit History: No 30+ dpd", ["dpd_commercial", "dpd_consumer"]),
+        ("Credit History: ≤ 5 bounced cheques ≤ 250K", ["bounced_cheque_commercial", "bounced_cheque_consumer"]),
+        ("Credit History: No unsettled defaults or court cases", [
+            "unsettled_commercial", "court_cases_commercial", "unsettled_consumer", "court_cases_consumer",
+        ]),
+    ] for field in fields
+]
+
+
+def test_credit_history_cases_cover_every_rule():
+    from credit_risk_agent.rulebook import CREDIT_HISTORY_RULES
+
+    assert CREDIT_HISTORY_CASES == [(rule, field) for rule, fields in CREDIT_HISTORY_RULES for field in fields]
+
+
+@pytest.mark.parametrize("rule, field", CREDIT_HISTORY_CASES, ids=[case[1] for case in CREDIT_HISTORY_CASES])
+@pytest.mark.parametrize("flag, violated", [("GREEN", False), ("AMBER", False), (None, False), ("RED", True)])
+def test_credit_history_rules(rule, field, flag, violated):
+    from credit_risk_agent.rulebook import RULE_NAMES
+
+    flags = {field: flag}
+    _, evaluation = evaluate([[record(1, 2023, flags), record(1, 2022, flags)]])
+    met = evaluation["met"][0]
+
+    assert met[RULE_NAMES.index(rule)] == (not violated)
+    assert evaluation["credit_history_violated"][0] == violated
+    # A credit history violation blocks the recommendation whatever the percentage
+    assert evaluation["recommended"][0] == (not violated)
+    assert all(ok for name, ok in zip(RULE_NAMES, met) if name != rule)
+
+
+@pytest.mark.parametrize("failing, expected", [
+    # 12 rules: 7 met is 58.33%, 8 met is 66.67%
+    (["revenue", "operatingProfit", "dscr", "gearingRatio", "leverageRatio"], False),
+    (["revenue", "operatingProfit", "dscr", "gearingRatio"], True),
+])
+def test_recommendation_threshold(failing, expected):
+    from credit_risk_agent.rulebook import evaluate_rulebook, RECOMMENDED, NOT_RECOMMENDED
+
+    failed = {"revenue": 0, "operatingProfit": -1, "dscr": 0, "gearingRatio": 5, "leverageRatio": 5}
+    store, _ = evaluate([[record(1, 2023, **{field: failed[field] for field in failing}), record(1, 2022)]])
+    result, = evaluate_rulebook(store)
+
+    assert result["year"] == 2023
+    assert result["rules_violated_count"] == len(failing)
+    assert result["recommendation"] == (RECOMMENDED if expected else NOT_RECOMMENDED)
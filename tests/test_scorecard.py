@@ -0,0 +1,221 @@
+import os
+import math
+from datetime import date
+
+import pytest
+
+from conftest import ROOT, flat_record
+
+AS_OF = date(2026, 10, 18)
+
+# Scores nothing special: a company-year of the baseline statement fields
+BASE = {"revenue": 2_000_000, "netProfit": 200_000, "totalEquity": 1_000_000}
+
+
+def evaluate(companies, as_of=AS_OF):
+    from credit_risk_agent.columnar_store import CompanyYearStore
+    from credit_risk_agent.scorecard import evaluate_scorecard_columns
+
+    store = CompanyYearStore.from_companies(companies)
+    return store, evaluate_scorecard_columns(store, as_of)
+
+
+def criterion_scores(criterion, companies):
+    """The score of `criterion` for the first row of every company (None when not scored)."""
+    from credit_risk_agent.scorecard import CRITERIA_NAMES
+
+    store, evaluation = evaluate(companies)
+    scores = evaluation["scores"][store.row_start, CRITERIA_NAMES.index(criterion)]
+    return [None if math.isnan(score) else float(score) for score in scores]
+
+
+# (criterion, [(value, score)]): both sides of every band edge
+NUMERIC_CASES = [
+    ("Revenue Growth", [(-10.01, -2), (-10, -1), (-0.01, -1), (0, 1), (4.99, 1), (5, 3), (29.99, 3), (30, 4)]),
+    ("GPM Growth", [(2.99, 0.75), (3, 0), (3.01, 0)]),
+    ("NPM", [(-0.01, -6), (0, -0.75), (4.99, -0.75), (5, 1.5), (14.99, 1.5), (15, 3)]),
+    ("NPM Growth", [(-20.01, -3), (-20, -1.5), (-0.01, -1.5), (0, 0.75), (2.99, 0.75), (3, 2.25), (19.99, 2.25), (20, 3)]),
+    ("Cash Flow From Operations", [(-0.01, -2), (0, 2), (0.01, 2)]),
+    ("Current Ratio", [(0.99, -2), (1, 1.5), (3.99, 1.5), (4, 2)]),
+    ("Leverage Ratio", [(0.99, -2), (1, 1), (1.99, 1), (2, 2)]),
+    ("Interest Coverage", [(0.99, -2), (1, 1.5), (3.99, 1.5), (4, 2)]),
+    ("DSCR", [(0.99, -2), (1, 1), (1.99, 1), (2, 2)]),
+    ("Days Sales Outstanding", [(119.99, 2), (120, 0), (179.99, 0), (180, -1), (269.99, -1), (270, -2)]),
+    # Fraction bands include their upper edge
+    ("Receivable Percentage Sales", [(0.5, 2), (0.51, 0), (0.7, 0), (0.71, -1), (1.0, -1), (1.01, -2)]),
+    ("External Debt Sales Ratio", [(0.25, 2), (0.26, 0), (0.5, 0), (0.51, -1)]),
+    ("Type of Customer (number of customers)", [(5, 1.25), (6, 3.75), (20, 3.75), (21, 5)]),
+]
+
+
+def test_numeric_cases_cover_every_criterion():
+    from credit_risk_agent.scorecard import NUMERIC_CRITERIA
+
+    assert [case[0] for case in NUMERIC_CASES] == [criterion[0] for criterion in NUMERIC_CRITERIA]
+
+
+@pytest.mark.parametrize("criterion, cases", NUMERIC_CASES, ids=[case[0] for case in NUMERIC_CASES])
+def test_numeric_bands(criterion, cases):
+    from credit_risk_agent.scorecard import NUMERIC_CRITERIA
+
+    _, block, field, _, _, _ = next(c for c in NUMERIC_CRITERIA if c[0] == criterion)
+    values = [value for value, _ in cases] + [None]
+    # Single-year companies, so the growth criteria score the financialSpreading value
+    companies = [
+        [flat_record(i, 2023, dict(BASE, **{field: value}) if block == "qawaem" else BASE, bms={field: value} if block == "bms" else None)]
+        for i, value in enumerate(values)
+    ]
+    assert criterion_scores(criterion, companies) == [score for _, score in cases] + [None]
+
+
+# (criterion, [(value, score)]): None where no keyword matches
+CATEGORICAL_CASES = [
+    ("Nitaqat Color", [("Platinum", 2), ("Red", -4), ("أصفر", -2), ("Low Green", 0), ("Blue", None)]),
+    # The first keyword found wins
+    ("Market", [("Local Market", 3), ("Exports excluding GCC", 1.5), ("Local market, exports >25%", -1.5)]),
+    ("Industry", [
+        ("Information & Communication", 7), ("Mining & Quarrying", 6), ("Retail Trade", 5),
+        ("Manufacturing", 3.5), ("Water Supply", 2), ("Construction", None),
+    ]),
+    ("Inventory Liquid Management", [("Concerning", -3), ("N.A.", 3), ("Uncertain", 1.5), ("Ready for sale", 3)]),
+    ("Access to Additional Fund", [("No access", 0), ("Proven access to FI", 1), ("Proven support from shareholders", 2)]),
+    ("Control over cash flow", [("Full control", 1.25), ("Controlled by third party", 1.05), ("Controlled by client", 1.01), ("No control", 1)]),
+    ("Relationship with Lendo", [("No relationship", 1), ("Frequent PDs", 0.75), ("Some PDs", 1.05), ("Timely repayments", 1.15)]),
+    # Yes / no criteria match the whole value
+    ("Change in Ownership", [("No", 1), (" YES ", 0.9), ("Not known", None)]),
+    ("Change in Management", [("no", 1), ("yes", 0.9), ("yes, in 2022", None)]),
+    ("Breach in Financial Covenants", [("No", 1), ("Yes", 0.9)]),
+    ("Delayed AFS", [("No", 1), ("Yes", 0.9)]),
+]
+
+
+def test_categorical_cases_cover_every_criterion():
+    from credit_risk_agent.scorecard import CATEGORICAL_CRITERIA
+
+    assert [case[0] for case in CATEGORICAL_CASES] == [criterion[0] for criterion in CATEGORICAL_CRITERIA]
+
+
+@pytest.mark.parametrize("criterion, cases", CATEGORICAL_CASES, ids=[case[0] for case in CATEGORICAL_CASES])
+def test_categorical_keywords(criterion, cases):
+    from credit_risk_agent.scorecard import CATEGORICAL_CRITERIA
+
+    field = next(c[2] for c in CATEGORICAL_CRITERIA if c[0] == criterion)
+    values = [value for value, _ in cases] + [None]
+    companies = [[flat_record(i, 2023, BASE, bms={field: value})] for i, value in enumerate(values)]
+    assert criterion_scores(criterion, companies) == [score for _, score in cases] + [None]
+
+
+def test_growth_is_computed_from_the_prior_year():
+    from credit_risk_agent.scorecard import GROWTH_TREND_FIELDS
+
+    assert GROWTH_TREND_FIELDS == {
+        "revenueGrowth": "revenue",
+        "grossProfitMarginGrowth": "grossProfitMargin",
+        "netProfitMarginGrowth": "netProfitMargin",
+    }
+    # financialSpreading growth that contradicts the statements, and would score differently
+    spreading = {"revenueGrowth": -15, "grossProfitMarginGrowth": 0, "netProfitMarginGrowth": 5}
+    companies = [[
+        flat_record(1, 2023, dict(BASE, revenue=2_400_000, grossProfitMargin=31, netProfitMargin=8, **spreading)),
+        flat_record(1, 2022, dict(BASE, revenue=2_000_000, grossProfitMargin=30, netProfitMargin=10, **spreading)),
+    ]]
+
+    # 2023: +20% revenue, +3.33% GPM, -20% NPM
+    assert criterion_scores("Revenue Growth", companies) == [3]
+    assert criterion_scores("GPM Growth", companies) == [0]
+    assert criterion_scores("NPM Growth", companies) == [-1.5]
+
+
+@pytest.mark.parametrize("years, prior", [
+    # No prior fiscal year: the year before is missing, or a gap of two years
+    ([2023], {}),
+    ([2023, 2021], {}),
+    # A zero prior value has no growth
+    ([2023, 2022], {"revenue": 0, "grossProfitMargin": 0, "netProfitMargin": 0}),
+])
+def test_growth_falls_back_to_financial_spreading(years, prior):
+    spreading = {"revenueGrowth": -15, "grossProfitMarginGrowth": 0, "netProfitMarginGrowth": 5}
+    latest = dict(BASE, revenue=2_400_000, grossProfitMargin=31, netProfitMargin=8, **spreading)
+    companies = [[flat_record(1, years[0], latest)] + [flat_record(1, year, dict(latest, **prior)) for year in years[1:]]]
+
+    assert criterion_scores("Revenue Growth", companies) == [-2]
+    assert criterion_scores("GPM Growth", companies) == [0.75]
+    assert criterion_scores("NPM Growth", companies) == [2.25]
+
+
+@pytest.mark.parametrize("flags, value, score", [
+    ({}, "Bounced GREEN", 3),
+    ({"court_cases_commercial": "RED"}, "Bounced GREEN", 3),
+    ({"bounced_cheque_commercial": "AMBER"}, "Bounced GREEN", 3),
+    ({"bounced_cheque_commercial": "RED"}, "Bounced RED, Court GREEN", -1.5),
+    ({"bounced_cheque_consumer": "RED"}, "Bounced RED, Court GREEN", -1.5),
+    ({"bounced_cheque_commercial": "RED", "court_cases_commercial": "RED"}, "Bounced RED, Court RED", 3),
+    ({"bounced_cheque_commercial": "RED", "court_cases_consumer": "RED"}, "Bounced RED, Court RED", 3),
+    ({"bounced_cheque_consumer": "RED", "court_cases_commercial": "RED"}, "Bounced RED, Court RED", 3),
+])
+def test_bounced_cheques_with_court_cases(flags, value, score):
+    from credit_risk_agent.scorecard import CRITERIA_NAMES, BOUNCED_CHEQUES_CRITERION
+
+    _, evaluation = evaluate([[flat_record(1, 2023, BASE, flags)]])
+    column = CRITERIA_NAMES.index(BOUNCED_CHEQUES_CRITERION)
+
+    assert evaluation["values"][column][0] == value
+    assert evaluation["scores"][0, column] == score
+
+
+@pytest.mark.parametrize("flags, score", [
+    ({}, 7),
+    ({"dpd_consumer": "AMBER"}, 0),
+    ({"unsettled_commercial": "RED"}, 0),
+    ({"court_cases_consumer": None}, 0),
+])
+def test_all_flags_green(flags, score):
+    assert criterion_scores("All flags are green", [[flat_record(1, 2023, BASE, flags)]]) == [score]
+
+
+@pytest.mark.parametrize("started, score", [
+    # < 3 years, unless NPM grew; 3 to < 10 years; 10 years and more
+    ("2024-01-01", -1),
+    ("2023-01-01", 3),
+    ("2016-01-01", 4),
+    ("unknown", None),
+])
+def test_years_in_business(started, score):
+    assert criterion_scores("Years in Business", [[flat_record(1, 2023, BASE, bms={"yearsInBusiness": started})]]) == [score]
+
+
+def test_young_business_with_npm_growth():
+    from credit_risk_agent.scorecard import YOUNG_BUSINESS_NPM_GROWTH_SCORE
+
+    bms = {"yearsInBusiness": "2025-01-01"}
+    companies = [
+        [flat_record(1, 2023, dict(BASE, netProfitMarginGrowth=0.5), bms=bms)],
+        [flat_record(2, 2023, dict(BASE, netProfitMarginGrowth=0), bms=bms)],
+    ]
+    assert criterion_scores("Years in Business", companies) == [YOUNG_BUSINESS_NPM_GROWTH_SCORE, -1]
+
+
+@pytest.mark.parametrize("total, grade", [
+    (-5, "R"), (39.99, "R"), (40, "D"), (49.99, "D"), (50, "C"), (60, "B"), (70, "A"), (89.99, "A"), (90, "A+"),
+])
+def test_grade_edges(total, grade):
+    import numpy as np
+    from credit_risk_agent.scorecard import assign_grades
+
+    assert assign_grades(np.array([total], dtype=np.float64))[0] == grade
+
+
+def test_sample_company_scores_match_their_baseline(tmp_path, monkeypatch):
+    from credit_risk_agent import data_provider
+    from credit_risk_agent.scorecard import evaluate_scorecard
+
+    monkeypatch.setattr(data_provider, "QAWAEM_DELTAS_PATH", str(tmp_path / "qawaem_deltas.jsonl"))
+    snapshot = data_provider.build_snapshot(os.path.join(ROOT, "qawaem_data.json"))
+    results = evaluate_scorecard(snapshot.store, as_of=AS_OF)
+
+    assert {result["organization_id"]: (result["year"], result["total_score"], result["grade"]) for result in results} == {
+        1742: (2023, 26.75, "R"),
+        1901: (2023, 33.0, "R"),
+        2140: (2023, 38.0, "R"),
+        4560: (2023, 34.0, "R"),
+    }
@@ -0,0 +1,86 @@
+import smtplib
+
+import pytest
+
+
+class FakeSession:
+    def __init__(self, error=None):
+        self.error = error
+        self.closed = False
+
+    def send_message(self, msg):
+        if self.error is not None:
+            raise self.error
+        return {}
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    from credit_risk_agent.smtp_pool import SMTPPool
+
+    pool = SMTPPool(username=None, max_size=1)
+    pool.sessions = []
+
+    def connect():
+        pool.sessions.append(FakeSession())
+        pool.connects += 1
+        return pool.sessions[-1]
+
+    monkeypatch.setattr(pool, "_connect", connect)
+    return pool
+
+
+@pytest.mark.parametrize("error, dropped", [
+    (smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), True),
+    (ConnectionResetError("Connection reset by peer"), True),
+    (TimeoutError("timed out"), True),
+    (smtplib.SMTPResponseException(421, b"Service not available"), True),
+    (smtplib.SMTPRecipientsRefused({"b@example.com": (550, b"User unknown")}), False),
+    (smtplib.SMTPDataError(554, b"Message rejected"), False),
+    (smtplib.SMTPSenderRefused(553, b"Sender rejected", "a@example.com"), False),
+    (ValueError("caller error"), False),
+])
+def test_session_is_closed_only_when_dropped(pool, error, dropped):
+    with pytest.raises(type(error)):
+        with pool.session():
+            raise error
+
+    session, = pool.sessions
+    assert session.closed == dropped
+    assert pool.stats()["idle"] == (0 if dropped else 1)
+
+    # A session that is still usable is reused
+    with pool.session() as reused:
+        pass
+    assert (reused is session) == (not dropped)
+    assert pool.connects == (2 if dropped else 1)
+
+
+def test_refused_recipients_keep_the_session(pool):
+    refused = smtplib.SMTPRecipientsRefused({"b@example.com": (550, b"User unknown")})
+
+    with pool.session() as session:
+        session.error = refused
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send_message(None)
+
+    session.error = None
+    assert pool.send_message(None) == {}
+    assert pool.connects == 1 and pool.reuses == 2
+
+
+def test_dropped_session_is_resent_once(pool):
+    with pool.session() as session:
+        session.error = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+    assert pool.send_message(None) == {}
+    assert session.closed and pool.connects == 2
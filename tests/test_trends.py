@@ -0,0 +1,86 @@
+from conftest import company, statement
+
+
+def zero_statement(year):
+    return {
+        "year": year,
+        "totalEquity": 0,
+        "profitAndLoss": {"netProfit": 0, "totalRevenue": 0, "operatingProfitLoss": 0},
+        "cashflow": {"netCashFlowsFromUsedInOperatingActivities": 0},
+        "ratios": {"financialSpreading": {}},
+    }
+
+
+def trends(store, organization_id):
+    company_position = list(store.organization_id).index(organization_id)
+    return {int(store.year[row]): store.trend_record(row) for row in store.company_rows(company_position)}
+
+
+def test_growth_against_the_prior_year(make_store):
+    store = make_store([company(900001, [statement(2023, revenue=3_000_000), statement(2022), statement(2020)])])
+    by_year = trends(store, 900001)
+
+    assert store.year_count[0] == 3
+    assert by_year[2023]["previous_year"] == 2022
+    assert by_year[2023]["revenue_yoy_growth"] == 50
+    assert by_year[2022]["previous_year"] is None and by_year[2022]["revenue_yoy_growth"] is None
+
+
+def test_placeholder_years_are_not_data(make_store):
+    store = make_store([
+        company(900001, [statement(2023), zero_statement(2022), statement(2021)]),
+        company(900002, [statement(2023), {"year": 2022}]),
+        company(900003, [zero_statement(2024), statement(2023, revenue=3_000_000), statement(2022)]),
+    ])
+
+    assert list(store.year_count) == [2, 1, 2]
+
+    first = trends(store, 900001)
+    assert first[2023]["previous_year"] is None and first[2023]["revenue_yoy_growth"] is None
+    assert first[2022]["previous_year"] is None and first[2022]["revenue_yoy_growth"] is None
+    assert trends(store, 900002)[2023]["revenue_yoy_growth"] is None
+
+    # A placeholder newest year is not the latest year
+    third = trends(store, 900003)
+    assert third[2023]["previous_year"] == 2022 and third[2023]["revenue_yoy_growth"] == 50
+    assert third[2024]["latest_year"] == 2023 and third[2024]["revenue_yoy_growth"] is None
+    rows = store.company_rows(2)
+    assert [int(store.year[row]) for row in rows[store.is_latest[rows]]] == [2023]
+
+
+def test_cagr_skips_placeholder_years(make_store):
+    store = make_store([
+        company(900001, [statement(2023, revenue=4_000_000), statement(2021, revenue=1_000_000), zero_statement(2020)]),
+        company(900002, [zero_statement(2024), statement(2023, revenue=4_000_000), statement(2021, revenue=1_000_000)]),
+        # Without any year with data, the known years are still the earliest and latest
+        company(900003, [zero_statement(2023), zero_statement(2022)]),
+    ])
+
+    for organization_id in (900001, 900002):
+        by_year = trends(store, organization_id)
+        assert by_year[2023]["latest_year"] == 2023
+        assert by_year[2023]["revenue_cagr"] == 100
+
+    placeholders = trends(store, 900003)
+    assert placeholders[2022]["latest_year"] == 2023 and placeholders[2023]["revenue_cagr"] is None
+    assert store.year_count[2] == 0 and list(store.is_latest[store.company_rows(2)]) == [True, False]
+
+
+def test_placeholder_newest_year_is_not_evaluated(make_store):
+    from credit_risk_agent.rulebook import evaluate_rulebook
+    from credit_risk_agent.scorecard import evaluate_scorecard
+
+    store = make_store([company(900001, [zero_statement(2024), statement(2023), statement(2022)])])
+
+    assert [result["year"] for result in evaluate_rulebook(store)] == [2023]
+    assert [result["year"] for result in evaluate_scorecard(store)] == [2023]
+
+
+def test_placeholder_years_do_not_meet_the_two_years_rule(make_store):
+    from credit_risk_agent.rulebook import evaluate_rulebook
+
+    store = make_store([company(900001, [statement(2023), zero_statement(2022)]), company(900002, [statement(2023), statement(2022)])])
+    results = {result["organization_id"]: result for result in evaluate_rulebook(store)}
+
+    assert any("2 years" in rule for rule in results[900001]["rules_violated"])
+    assert not any("2 years" in rule for rule in results[900002]["rules_violated"])
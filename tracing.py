@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import bisect
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional
+
+# OpenTelemetry API modules, imported with the first span (ADK has loaded them by then; the agent import hasn't)
+trace = None
+otel_context = None
+
+logger = logging.getLogger(__name__)
+
+# Spans are appended to this file as OTLP/JSON lines (one ExportTraceServiceRequest per line, as read by the
+# OpenTelemetry collector's otlpjsonfile receiver). Unset: spans only go to the exporters configured for ADK, if any.
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+# service.name of the spans, when no tracer provider has been configured before
+TRACE_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "credit-risk-agent")
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket takes everything above the last
+LATENCY_BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+class LatencyHistogram:
+    """Bucketed latencies of one operation, with count, sum, min/max and estimated quantiles."""
+
+    def __init__(self, bounds_ms: List[float] = LATENCY_BUCKETS_MS):
+        self.bounds_ms = list(bounds_ms)
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds_ms, ms)] += 1
+            self.count += 1
+            self.errors += bool(error)
+            self.sum_ms += ms
+            self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+            self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimates a quantile (0..1) in ms, interpolating linearly within its bucket."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for i, count in enumerate(self.counts):
+                if count and seen + count >= rank:
+                    low = self.bounds_ms[i - 1] if i else 0.0
+                    high = self.bounds_ms[i] if i < len(self.bounds_ms) else self.max_ms
+                    low, high = max(low, self.min_ms), min(high, self.max_ms)
+                    return low + (high - low) * (rank - seen) / count
+                seen += count
+            return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the histogram as a dict; "buckets" holds [upper bound in ms, cumulative count] pairs."""
+        quantiles = {f"p{int(q * 100)}_ms": self.quantile(q) for q in (0.5, 0.9, 0.99)}
+        with self._lock:
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.bounds_ms + [float("inf")], self.counts):
+                cumulative += count
+                buckets.append([bound, cumulative])
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "sum_ms": self.sum_ms,
+                "mean_ms": self.sum_ms / self.count if self.count else None,
+                "min_ms": self.min_ms,
+                "max_ms": self.max_ms,
+                **quantiles,
+                "buckets": buckets,
+            }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def record_duration(name: str, seconds: float, error: bool = False) -> None:
+    """Records one latency of an operation in its in-process histogram."""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, LatencyHistogram())
+    histogram.record(seconds, error)
+
+
+def latency_histograms() -> Dict[str, Dict[str, Any]]:
+    """Returns a snapshot of every latency histogram, by operation (span) name."""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}
+
+
+def reset_latency_histograms() -> None:
+    with _histograms_lock:
+        _histograms.clear()
+
+
+# --- Span export ---
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Any) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in (attributes or {}).items()]
+
+
+def _otlp_span(span) -> Dict[str, Any]:
+    context = span.get_span_context()
+    return {
+        "traceId": format(context.trace_id, "032x"),
+        "spanId": format(context.span_id, "016x"),
+        "parentSpanId": format(span.parent.span_id, "016x") if span.parent else "",
+        "name": span.name,
+        # OTLP numbers span kinds from 1 (INTERNAL), the Python API from 0
+        "kind": span.kind.value + 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": _otlp_attributes(span.attributes),
+        "events": [
+            {"timeUnixNano": str(event.timestamp), "name": event.name, "attributes": _otlp_attributes(event.attributes)}
+            for event in span.events
+        ],
+        "status": {"code": span.status.status_code.value, "message": span.status.description or ""},
+    }
+
+
+class OTLPJsonFileExporter:
+    """
+    Span exporter appending OTLP/JSON export requests to a file, one per line.
+
+    Implements the `SpanExporter` interface of the OpenTelemetry SDK, to be
+    used with a `BatchSpanProcessor`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> Any:
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        scopes: Dict[str, List[Dict[str, Any]]] = {}
+        for span in spans:
+            scope = span.instrumentation_scope.name if span.instrumentation_scope else ""
+            scopes.setdefault(scope, []).append(_otlp_span(span))
+        resource = spans[0].resource.attributes if spans else {}
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes(resource)},
+                "scopeSpans": [{"scope": {"name": scope}, "spans": scope_spans} for scope, scope_spans in scopes.items()],
+            }]
+        }
+
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        except OSError:
+            logger.exception("Writing spans to %s failed", self.path)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """
+    Returns the OpenTelemetry tracer of the agent (None without opentelemetry).
+
+    With TRACE_FILE set, the file exporter is added to the tracer provider
+    configured for ADK, or to a new one if there is none yet.
+    """
+    global _tracer, trace, otel_context
+
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                try:
+                    from opentelemetry import trace, context as otel_context
+                except ImportError:
+                    _tracer = False
+                    return None
+
+                if TRACE_FILE:
+                    from opentelemetry.sdk.resources import Resource
+                    from opentelemetry.sdk.trace import TracerProvider
+                    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                    provider = trace.get_tracer_provider()
+                    if not hasattr(provider, "add_span_processor"):
+                        provider = TracerProvider(resource=Resource.create({"service.name": TRACE_SERVICE_NAME}))
+                        trace.set_tracer_provider(provider)
+                    provider.add_span_processor(BatchSpanProcessor(OTLPJsonFileExporter(TRACE_FILE)))
+                _tracer = trace.get_tracer(__name__)
+    return _tracer or None
+
+
+def force_flush() -> None:
+    """Exports the spans still buffered (e.g. before a benchmark process exits)."""
+    if trace is not None and hasattr(trace.get_tracer_provider(), "force_flush"):
+        trace.get_tracer_provider().force_flush()
+
+
+# --- Instrumentation ---
+
+def capture_context() -> Any:
+    """Returns the current trace context, to parent spans started later on another thread."""
+    return otel_context.get_current() if get_tracer() is not None else None
+
+
+def annotate(**attributes: Any) -> None:
+    """Sets attributes on the current span (None values are skipped)."""
+    if get_tracer() is not None:
+        trace.get_current_span().set_attributes({key: value for key, value in attributes.items() if value is not None})
+
+
+@contextmanager
+def span(name: str, parent: Any = None, **attributes: Any) -> Iterator[Any]:
+    """
+    Traces a block as a span and records its latency in the histogram of `name`.
+
+    Args:
+        name: Span (and histogram) name, e.g. "smtp.send".
+        parent: Trace context from `capture_context`, for work continued on another thread.
+        attributes: Span attributes (None values are skipped).
+
+    Yields:
+        The OpenTelemetry span, or None without opentelemetry.
+    """
+    tracer = get_tracer()
+    start = time.perf_counter()
+    error = False
+    try:
+        if tracer is None:
+            yield None
+        else:
+            attributes = {key: value for key, value in attributes.items() if value is not None}
+            with tracer.start_as_current_span(name, context=parent, attributes=attributes) as current:
+                yield current
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record_duration(name, time.perf_counter() - start, error)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator tracing every call of a function as a span (named after the function by default)."""
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StageTimer:
+    """
+    Times interleaved stages of a streaming pipeline (e.g. parse -> profile ->
+    flatten, one company at a time), where the stages can't be separate spans.
+
+    Time is charged to the innermost running stage only. `record` adds each
+    stage's total to its latency histogram and to the current span.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._stack: List[str] = []
+        self._mark = 0.0
+
+    def _switch(self, enter: Optional[str]) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            stage = self._stack[-1]
+            self.totals[stage] = self.totals.get(stage, 0.0) + now - self._mark
+        if enter is None:
+            self._stack.pop()
+        else:
+            self._stack.append(enter)
+        self._mark = now
+
+    def iterate(self, stage: str, iterable: Iterable) -> Iterator:
+        """Yields the items of `iterable`, charging the time spent producing them to `stage`."""
+        iterator = iter(iterable)
+        while True:
+            self._switch(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._switch(None)
+            yield item
+
+    def record(self) -> None:
+        for stage, seconds in self.totals.items():
+            record_duration(stage, seconds)
+        annotate(**{f"{stage}.ms": round(seconds * 1000, 3) for stage, seconds in self.totals.items()})